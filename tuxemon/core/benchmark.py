@@ -0,0 +1,403 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.benchmark Headless game loop benchmark.
+#
+"""Runs the game without a window or sound for a fixed number of frames and reports how long
+each frame took. Input comes from a script of key presses instead of the keyboard, and every
+frame advances the game by the same amount of time, so two runs of the same scenario do the
+same work and can be compared between commits.
+
+To run a scenario from the game's directory and print the results as JSON:
+
+`python -m core.benchmark walk_route1`
+
+`python -m core.benchmark battle --frames 900 --output battle.json`
+
+"""
+
+import json
+import logging
+import os
+import platform
+import random
+import sys
+
+# The dummy drivers must be chosen before PyGame opens the display or the mixer.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from . import prepare, tools
+from .components import profiler
+
+# Not every platform can tell us how much memory we used.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("core.benchmark successfully imported")
+
+# Every frame advances the game by this many seconds.
+TIME_STEP = 1 / 60.
+
+# Key names that can be used in scenario scripts.
+KEYS = {"up": pygame.K_UP,
+        "down": pygame.K_DOWN,
+        "left": pygame.K_LEFT,
+        "right": pygame.K_RIGHT,
+        "enter": pygame.K_RETURN,
+        "escape": pygame.K_ESCAPE}
+
+
+def press(frame, key):
+    """Returns the script entries for tapping a key.
+
+    :param frame: The frame to press the key on.
+    :param key: The name of the key in KEYS.
+
+    :type frame: Integer
+    :type key: String
+
+    :rtype: List
+    :returns: A list of (frame, event type, key) script entries.
+
+    """
+    return [(frame, pygame.KEYDOWN, key), (frame + 1, pygame.KEYUP, key)]
+
+
+def hold(frame, key, frames):
+    """Returns the script entries for holding a key down.
+
+    :param frame: The frame to press the key on.
+    :param key: The name of the key in KEYS.
+    :param frames: How many frames to hold the key for.
+
+    :type frame: Integer
+    :type key: String
+    :type frames: Integer
+
+    :rtype: List
+    :returns: A list of (frame, event type, key) script entries.
+
+    """
+    return [(frame, pygame.KEYDOWN, key), (frame + frames, pygame.KEYUP, key)]
+
+
+def walk_route1_script():
+    """Walks the same loop around route 1 twice.
+
+    :rtype: List
+    :returns: The script entries.
+
+    """
+    script = []
+    frame = 10
+    for key, frames in (("left", 150), ("up", 60), ("right", 150), ("down", 60)) * 2:
+        script += hold(frame, key, frames)
+        frame += frames + 10
+    return script
+
+
+def battle_script():
+    """Repeatedly chooses "Fight" and the first technique until the battle is over.
+
+    :rtype: List
+    :returns: The script entries.
+
+    """
+    script = []
+    for frame in range(120, 3000, 60):
+        script += press(frame, "enter")
+        script += press(frame + 15, "enter")
+    return script
+
+
+def menus_script():
+    """Opens the main menu and every menu in it, then closes them again. The "EXIT" item
+    is skipped since it would quit the game.
+
+    :rtype: List
+    :returns: The script entries.
+
+    """
+    script = []
+    frame = 10
+
+    # Menus that open their own window are closed with escape, which brings the main menu
+    # back. The rest show the "not implemented" window, which is closed with enter. Either
+    # way the main menu is still open afterwards, so it is closed before the next item.
+    items = (("JOURNAL", "enter"), ("TUXEMON", "escape"), ("BAG", "escape"),
+             ("PLAYER", "enter"), ("SAVE", "escape"), ("LOAD", "enter"),
+             ("OPTIONS", "enter"))
+    for index, (name, close) in enumerate(items):
+        script += press(frame, "escape")
+        frame += 30
+
+        # The main menu remembers the last item selected.
+        if index:
+            script += press(frame, "down")
+            frame += 10
+
+        script += press(frame, "enter")
+        frame += 60
+        script += press(frame, close)
+        frame += 30
+        script += press(frame, "escape")
+        frame += 30
+
+    return script
+
+
+# The stock scenarios. Each one starts on a map at a tile position, runs any event actions
+# to set the game up, and then plays back its input script.
+SCENARIOS = {
+    "walk_route1": {"map": "route1.tmx",
+                    "position": [47, 11],
+                    "frames": 1200,
+                    "actions": [],
+                    "script": walk_route1_script},
+    "battle": {"map": "route1.tmx",
+               "position": [47, 11],
+               "frames": 1800,
+               "actions": [("add_monster", "Bamboon,10"),
+                           ("start_battle", "1")],
+               "script": battle_script},
+    "menus": {"map": "bedroom_test.tmx",
+              "position": [3, 3],
+              "frames": 1200,
+              "actions": [("add_monster", "Bamboon,10"),
+                          ("add_item", "Potion")],
+              "script": menus_script},
+}
+
+
+class HeadlessControl(tools.Control):
+    """A game controller that plays back a script of key presses instead of reading them
+    from the keyboard. Each scripted event is passed to the current state's get_event
+    method on the frame it is scheduled for.
+
+    :param caption: The window caption to use for the game itself.
+    :param script: A list of (frame, event type, key name) entries.
+
+    :type caption: String
+    :type script: List
+
+    """
+    def __init__(self, caption, script):
+        tools.Control.__init__(self, caption)
+        self.frame = 0
+        self.script = {}
+        for frame, event_type, key in script:
+            self.script.setdefault(frame, []).append(
+                pygame.event.Event(event_type, key=KEYS[key], mod=0))
+
+
+    def event_loop(self):
+        """Processes any real events, then passes this frame's scripted key presses to the
+        current state.
+
+        :param None:
+
+        :rtype: None
+        :returns: None
+
+        """
+        tools.Control.event_loop(self)
+
+        for event in self.script.get(self.frame, []):
+            if event.type == pygame.KEYDOWN:
+                self.keys[event.key] = 1
+            else:
+                self.keys[event.key] = 0
+            self.state.get_event(event)
+
+
+
+def peak_memory():
+    """Returns the most memory this process has used so far.
+
+    :rtype: Integer or None
+    :returns: The peak resident set size in kilobytes, or None if it isn't available.
+
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Mac OS reports bytes instead of kilobytes.
+    if sys.platform == "darwin":
+        peak /= 1024
+    return peak
+
+
+def distribution(timings):
+    """Summarizes a list of frame times.
+
+    :param timings: Frame times in seconds.
+
+    :type timings: List
+
+    :rtype: Dictionary
+    :returns: The min, mean, median, p95, p99 and max in milliseconds.
+
+    """
+    ordered = sorted(timings)
+    count = len(ordered)
+    if not count:
+        return {}
+
+    def percentile(fraction):
+        return ordered[min(count - 1, int(count * fraction))] * 1000.
+
+    return {"count": count,
+            "min": ordered[0] * 1000.,
+            "mean": sum(ordered) * 1000. / count,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": ordered[-1] * 1000.}
+
+
+def run(name, frames=None, seed=0, time_step=TIME_STEP):
+    """Boots the game headless, runs a scenario and returns its results.
+
+    :param name: The name of the scenario in SCENARIOS.
+    :param frames: The number of frames to run. Uses the scenario's default if None.
+    :param seed: The seed for the random number generator.
+    :param time_step: The number of seconds each frame advances the game.
+
+    :type name: String
+    :type frames: Integer
+    :type seed: Integer
+    :type time_step: Float
+
+    :rtype: Dictionary
+    :returns: The scenario settings, frame time distribution, per-phase figures and peak
+        memory, ready to be written as JSON.
+
+    **Examples:**
+
+    >>> results = run("walk_route1", frames=300)
+    >>> results["frame_time"]["p95"]
+    4.21
+
+    """
+    from .states import world, combat
+
+    scenario = SCENARIOS[name]
+    frames = frames or scenario["frames"]
+    random.seed(seed)
+
+    # Start on the scenario's map instead of the configured one.
+    prepare.CONFIG.starting_map = scenario["map"]
+    prepare.CONFIG.starting_position = list(scenario["position"])
+    prepare.init()
+
+    game = HeadlessControl(prepare.ORIGINAL_CAPTION, scenario["script"]())
+    game.player1 = prepare.player1
+    game.fixed_time_delta = time_step
+    state_dict = {"WORLD": world.World(game),
+                  "COMBAT": combat.Combat(game)}
+    game.setup_states(state_dict, "WORLD")
+
+    for action in scenario["actions"]:
+        game.event_engine.execute_action([action], game)
+
+    # Only time the frames of the scenario itself.
+    game.profiler.reset()
+    timings = []
+    for game.frame in range(frames):
+        start = profiler.timer()
+        game.main_loop()
+        timings.append(profiler.timer() - start)
+        if game.done:
+            break
+
+    results = {"scenario": name,
+               "map": scenario["map"],
+               "frames": len(timings),
+               "time_step": time_step,
+               "seed": seed,
+               "python": platform.python_version(),
+               "pygame": pygame.version.ver,
+               "frame_time": distribution(timings),
+               "phases": game.profiler.summary(),
+               "peak_memory_kb": peak_memory()}
+
+    pygame.quit()
+    return results
+
+
+def main(args):
+    """Runs a scenario from the command line and writes its results as JSON.
+
+    :param args: The command line arguments, without the program name.
+
+    :type args: List
+
+    :rtype: Integer
+    :returns: The exit status.
+
+    """
+    usage = ("Usage: python -m core.benchmark <scenario> [--frames N] [--seed N] "
+             "[--output FILE]\nScenarios: " + ", ".join(sorted(SCENARIOS)))
+
+    if not args or args[0] not in SCENARIOS:
+        print usage
+        return 1
+
+    name = args[0]
+    options = {"--frames": None, "--seed": "0", "--output": None}
+    remaining = args[1:]
+    while remaining:
+        if remaining[0] not in options or len(remaining) < 2:
+            print usage
+            return 1
+        options[remaining[0]] = remaining[1]
+        remaining = remaining[2:]
+
+    frames = int(options["--frames"]) if options["--frames"] else None
+    results = run(name, frames=frames, seed=int(options["--seed"]))
+    output = json.dumps(results, indent=4, sort_keys=True)
+
+    if options["--output"]:
+        with open(options["--output"], "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print output
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
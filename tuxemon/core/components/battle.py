@@ -0,0 +1,897 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.battle Battle rules without any display.
+#
+#
+
+import collections
+import logging
+import random
+import sys
+import timeit
+
+# NumPy lets whole grids of battles be resolved at once, but is not available on every
+# platform we support. The batch functions fall back to plain Python lists without it.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.battle successfully imported")
+
+# How much health a poisoned monster loses at the start of each of its turns.
+POISON_DAMAGE = 10
+
+# The most turns a simulated battle may last before it is called a draw.
+MAX_TURNS = 200
+
+# Technique categories as numbers, which the batch functions compare far faster than names.
+OTHER = 0
+PHYSICAL = 1
+SPECIAL = 2
+CATEGORY_CODES = {"physical": PHYSICAL, "special": SPECIAL}
+
+# How many hits batch_damage works on at a time, so that its working arrays stay in the
+# processor's cache.
+BATCH_CHUNK = 16384
+
+# How many times faster than damage() batch_damage should be on a million hits.
+BATCH_SPEEDUP_TARGET = 100
+
+# The kinds of battle event.
+TECHNIQUE = "technique"     # A monster used a technique. The value is the technique.
+ITEM = "item"               # A player used an item. The value is the item's name.
+SWITCH = "switch"           # A monster was sent out. The value is None.
+HP = "hp"                   # A monster's health changed. The value is (before, after).
+STATUS = "status"           # A monster's status changed, such as being poisoned.
+POISON = "poison"           # A monster took poison damage. The value is the damage.
+FAINT = "faint"             # A monster fainted. The value is None.
+EXPERIENCE = "experience"   # A monster gained experience. The value is the amount.
+END = "end"                 # The battle is over. The side is the winner.
+
+# Something that happened during a battle, in the order it happened.
+Event = collections.namedtuple("Event", ("kind", "side", "monster", "value"))
+
+
+def damage(level, power, attack, defense):
+    """Calculates the damage of a single hit, based upon the original Pokemon battle damage
+    formula. core.components.monster.Technique.damage uses this, and :func:`batch_damage`
+    does the same sums in the same order, so both give the same damage.
+
+    :param level: The level of the monster using the technique.
+    :param power: The power of the technique.
+    :param attack: The attack, or special attack, of the monster using the technique.
+    :param defense: The defense, or special defense, of the target. Must not be 0.
+
+    :type level: Integer
+    :type power: Integer
+    :type attack: Integer
+    :type defense: Integer
+
+    :rtype: Integer
+    :returns: The health the target loses.
+
+    **Examples:**
+
+    >>> damage(10, 25, 60, 7)
+    12
+
+    """
+    level_modifier = ((2 * level) / 7.)
+    attack_modifier = attack * power
+    return int(((level_modifier * attack_modifier) / float(defense)) / 50.)
+
+
+class Side(object):
+    """One of the two players in a battle, with their party of monsters, the monster they
+    currently have out and what they have decided to do this turn.
+
+    :param name: The name of the side, such as "player" or "opponent".
+    :param monsters: The party of core.components.monster.Monster objects. The list is
+        shared, not copied.
+    :param decide: A function that takes the battle and this side and returns the side's
+        action for the turn. Sides without one have their action set from outside, such as
+        from the combat menus.
+    :param inventory: The player's inventory, which items are used from.
+    :param experience: Whether this side's monsters gain experience when they make an
+        opposing monster faint.
+
+    :type name: String
+    :type monsters: List
+    :type decide: Function
+    :type inventory: Dictionary
+    :type experience: Boolean
+
+    **Examples:**
+
+    Actions are dictionaries, as they are in the combat state:
+
+    >>> side.action = {'technique': 0}
+    >>> side.action = {'item': {'name': "Potion", 'target': side.monster}}
+    >>> side.action = {'switch': side.monsters[1]}
+
+    """
+    def __init__(self, name, monsters, decide=None, inventory=None, experience=False):
+        self.name = name
+        self.monsters = monsters
+        self.decide = decide
+        self.inventory = inventory
+        self.experience = experience
+        self.action = None
+
+        # The first monster that can still fight is sent out first.
+        able = self.able()
+        self.monster = able[0] if able else None
+
+
+    def __repr__(self):
+        return "<Side %s>" % self.name
+
+
+    def able(self):
+        """Returns the monsters in this side's party that haven't fainted.
+
+        :param: None
+
+        :rtype: List
+        :returns: The monsters that can still fight.
+
+        """
+        return [monster for monster in self.monsters if monster.status != "FNT"]
+
+
+    def acting(self):
+        """Returns the monster that will be out when this side acts this turn, which is the
+        monster being switched to if the side is switching. A switch takes effect as soon as
+        it is chosen, as it does on the combat screen, so this is the monster that is
+        attacked, poisoned or fainted until the switch itself is resolved.
+
+        :param: None
+
+        :rtype: core.components.monster.Monster
+        :returns: The monster.
+
+        """
+        if self.action and 'switch' in self.action:
+            return self.action['switch']
+        return self.monster
+
+
+
+class Battle(object):
+    """Resolves the turns of a battle between two sides: their turn order, techniques,
+    items, switching, poison and fainting. Nothing here draws or plays anything. Every
+    method that changes the battle returns the events it caused, so the combat state can
+    show them and a simulation can simply ignore them.
+
+    :param player: The first side. It goes first when both monsters are as fast.
+    :param opponent: The second side.
+    :param game: The main game object, which is only needed to use items.
+
+    :type player: core.components.battle.Side
+    :type opponent: core.components.battle.Side
+    :type game: core.tools.Control
+
+    **Examples:**
+
+    >>> battle = Battle(Side("player", party, first_technique, experience=True),
+    ...                 Side("opponent", wild, random_technique))
+    >>> battle.run()
+    <Side player>
+    >>> battle.turn
+    4
+
+    """
+    def __init__(self, player, opponent, game=None):
+        self.sides = (player, opponent)
+        self.game = game
+        self.turn = 0
+        self.winner = None
+        self.over = False
+
+
+    def other(self, side):
+        """Returns the side opposing a given side.
+
+        :param side: One of the sides in this battle.
+
+        :type side: core.components.battle.Side
+
+        :rtype: core.components.battle.Side
+        :returns: The other side.
+
+        """
+        if side is self.sides[0]:
+            return self.sides[1]
+        return self.sides[0]
+
+
+    def decide(self):
+        """Asks every side that hasn't chosen an action yet and has a decision function what
+        it will do this turn.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        for side in self.sides:
+            if side.action is None and side.decide is not None:
+                side.action = side.decide(self, side)
+
+
+    def turn_order(self):
+        """Returns the sides in the order they act this turn. The side whose monster is
+        fastest goes first.
+
+        :param: None
+
+        :rtype: List
+        :returns: Both sides.
+
+        """
+        first, second = self.sides
+        if second.acting().speed > first.acting().speed:
+            return [second, first]
+        return [first, second]
+
+
+    def status_check(self, side):
+        """Resolves the effects of a side's monster's status at the start of its turn. A
+        poisoned monster takes poison damage from its second poisoned turn onwards.
+
+        :param side: The side whose turn is starting.
+
+        :type side: core.components.battle.Side
+
+        :rtype: List
+        :returns: The events that happened.
+
+        """
+        events = []
+        monster = side.acting()
+        if self.over or monster is None or monster.status == "FNT":
+            return events
+
+        if monster.status == "Poisoned":
+            if monster.status_turn >= 1:
+                before = monster.current_hp
+                monster.current_hp -= POISON_DAMAGE
+                events.append(Event(POISON, side, monster, POISON_DAMAGE))
+                events.append(Event(HP, side, monster, (before, monster.current_hp)))
+
+            # Keep track of how many turns this monster has been poisoned.
+            monster.status_turn += 1
+
+        self.check_faint(side, events)
+        return events
+
+
+    def perform_action(self, side):
+        """Carries out the action a side has chosen, then clears it. A side whose monster
+        has fainted, or that acts after the battle is over, does nothing.
+
+        :param side: The side that is acting.
+
+        :type side: core.components.battle.Side
+
+        :rtype: List
+        :returns: The events that happened.
+
+        """
+        events = []
+        action, side.action = side.action, None
+        if self.over or not action:
+            return events
+
+        if 'switch' in action:
+            side.monster = action['switch']
+
+            # A monster that was knocked out before it could be sent out isn't shown.
+            if side.monster.status != "FNT":
+                events.append(Event(SWITCH, side, side.monster, None))
+            return events
+
+        user = side.monster
+        if user is None or user.status == "FNT":
+            return events
+
+        opponent = self.other(side)
+        target = opponent.acting()
+        watched = ((side, user), (opponent, target))
+        before = [(monster.current_hp, monster.status) for s, monster in watched]
+
+        if 'technique' in action:
+            technique = user.moves[action['technique']]
+            events.append(Event(TECHNIQUE, side, user, technique))
+            technique.use(user=user, target=target)
+
+        elif 'item' in action:
+            name = action['item']['name']
+            events.append(Event(ITEM, side, user, name))
+            side.inventory[name]['item'].use(action['item'].get('target', user), self.game)
+
+        for (s, monster), (hp, status) in zip(watched, before):
+            if monster.current_hp != hp:
+                events.append(Event(HP, s, monster, (hp, monster.current_hp)))
+            if monster.status != status:
+                events.append(Event(STATUS, s, monster, monster.status))
+
+        # The target is checked first so that if both monsters faint, the user's side is
+        # the one whose defeat is decided last.
+        self.check_faint(opponent, events)
+        self.check_faint(side, events)
+        return events
+
+
+    def check_faint(self, side, events):
+        """Makes a side's monster faint if it has no health left, gives the monster that
+        defeated it experience and ends the battle if the side has no monsters left.
+
+        :param side: The side to check.
+        :param events: The list to add any events to.
+
+        :type side: core.components.battle.Side
+        :type events: List
+
+        :rtype: None
+        :returns: None
+
+        """
+        monster = side.acting()
+        if monster is None or monster.current_hp > 0 or monster.status == "FNT":
+            return
+
+        monster.current_hp = 0
+        monster.status = 'FNT'
+        events.append(Event(FAINT, side, monster, None))
+
+        opponent = self.other(side)
+        victor = opponent.acting()
+        if opponent.experience and victor is not None and victor.status != "FNT":
+            experience = (monster.experience_give_modifier * monster.level) ** 3
+            victor.give_experience(experience)
+            events.append(Event(EXPERIENCE, opponent, victor, experience))
+
+        if not side.able():
+            self.over = True
+            self.winner = opponent
+            events.append(Event(END, opponent, victor, None))
+
+
+    def replace_fainted(self):
+        """Sends out the next monster that can fight for every side whose monster has
+        fainted. The combat state lets the player choose instead.
+
+        :param: None
+
+        :rtype: List
+        :returns: The events that happened.
+
+        """
+        events = []
+        if self.over:
+            return events
+
+        for side in self.sides:
+            if side.monster is None or side.monster.status == "FNT":
+                able = side.able()
+                if able:
+                    side.monster = able[0]
+                    events.append(Event(SWITCH, side, side.monster, None))
+        return events
+
+
+    def resolve_turn(self):
+        """Plays a whole turn: asks the sides for their actions, then resolves each side's
+        status and action in turn order and sends out replacements for fainted monsters.
+
+        :param: None
+
+        :rtype: List
+        :returns: The events that happened.
+
+        """
+        self.decide()
+        self.turn += 1
+
+        events = []
+        for side in self.turn_order():
+            events += self.status_check(side)
+            events += self.perform_action(side)
+
+        events += self.replace_fainted()
+        return events
+
+
+    def run(self, max_turns=MAX_TURNS):
+        """Plays turns until one side has no monsters left.
+
+        :param max_turns: The most turns to play before giving up.
+
+        :type max_turns: Integer
+
+        :rtype: core.components.battle.Side or None
+        :returns: The winning side, or None if the battle didn't finish.
+
+        """
+        while not self.over and self.turn < max_turns:
+            self.resolve_turn()
+        return self.winner
+
+
+
+def first_technique(battle, side):
+    """A decision function that always uses the monster's first technique, like the
+    opponent AI in core.components.ai.
+
+    :param battle: The battle being fought.
+    :param side: The side deciding.
+
+    :type battle: core.components.battle.Battle
+    :type side: core.components.battle.Side
+
+    :rtype: Dictionary
+    :returns: The action.
+
+    """
+    return {'technique': 0}
+
+
+def random_technique(battle, side):
+    """A decision function that uses one of the monster's techniques at random.
+
+    :param battle: The battle being fought.
+    :param side: The side deciding.
+
+    :type battle: core.components.battle.Battle
+    :type side: core.components.battle.Side
+
+    :rtype: Dictionary
+    :returns: The action.
+
+    """
+    return {'technique': random.randrange(len(side.monster.moves))}
+
+
+def simulate(player, opponent, count=1000, seed=0):
+    """Fights the same two parties against each other a number of times, each time with
+    fresh copies of the monsters, and counts how often each side wins.
+
+    :param player: A function that returns a new side for the first player.
+    :param opponent: A function that returns a new side for the second player.
+    :param count: How many battles to fight.
+    :param seed: The seed for the random number generator.
+
+    :type player: Function
+    :type opponent: Function
+    :type count: Integer
+    :type seed: Integer
+
+    :rtype: Dictionary
+    :returns: The number of "player", "opponent" and "draw" results, the mean number of
+        "turns" and the "battles_per_second".
+
+    """
+    random.seed(seed)
+    results = {"player": 0, "opponent": 0, "draw": 0}
+    turns = 0
+
+    start = timeit.default_timer()
+    for index in range(count):
+        battle = Battle(player(), opponent())
+        winner = battle.run()
+        turns += battle.turn
+        if winner is None:
+            results["draw"] += 1
+        elif winner is battle.sides[0]:
+            results["player"] += 1
+        else:
+            results["opponent"] += 1
+    elapsed = timeit.default_timer() - start
+
+    results["turns"] = turns / float(max(count, 1))
+    results["battles_per_second"] = count / max(elapsed, 1e-9)
+    return results
+
+
+def category_codes(categories):
+    """Converts technique category names into the numbers :func:`batch_damage` takes. This
+    only needs doing once for a grid of hits, such as once per technique.
+
+    :param categories: The categories of the techniques, such as "physical" or "special".
+
+    :type categories: List
+
+    :rtype: numpy.ndarray or List
+    :returns: PHYSICAL, SPECIAL or OTHER for each category.
+
+    **Examples:**
+
+    >>> category_codes(["physical", "special", "status"])
+    array([1, 2, 0], dtype=int8)
+
+    """
+    codes = [CATEGORY_CODES.get(category, OTHER) for category in categories]
+    if numpy is None:
+        return codes
+    return numpy.array(codes, dtype=numpy.int8)
+
+
+def batch_damage(levels, powers, categories, attacks, defenses, special_attacks,
+                 special_defenses):
+    """Calculates the damage of many hits at once, such as every technique used by every
+    species at every level. Each argument holds one value per hit. Physical techniques use
+    the attack and defense stats and special techniques use the special ones, as
+    core.components.monster.Technique.damage does. Techniques of any other category do
+    no damage.
+
+    With NumPy the sums are done on whole arrays, which is far faster than calling
+    :func:`damage` for each hit but gives exactly the same results. Stats in 32 bit
+    integer arrays are the quickest to work with. Without NumPy, each hit is calculated
+    with :func:`damage`.
+
+    :param levels: The levels of the monsters using the techniques.
+    :param powers: The powers of the techniques.
+    :param categories: The categories of the techniques, from :func:`category_codes`.
+    :param attacks: The attack stats of the monsters using the techniques.
+    :param defenses: The defense stats of the targets. Must not be 0.
+    :param special_attacks: The special attack stats of the monsters using the techniques.
+    :param special_defenses: The special defense stats of the targets. Must not be 0.
+
+    :type levels: numpy.ndarray or List
+    :type powers: numpy.ndarray or List
+    :type categories: numpy.ndarray or List
+    :type attacks: numpy.ndarray or List
+    :type defenses: numpy.ndarray or List
+    :type special_attacks: numpy.ndarray or List
+    :type special_defenses: numpy.ndarray or List
+
+    :rtype: numpy.ndarray or List
+    :returns: The health each target loses.
+
+    **Examples:**
+
+    >>> batch_damage([10, 10], [25, 25], category_codes(["physical", "special"]),
+    ...              [60, 60], [7, 7], [20, 20], [10, 10])
+    array([12,  2])
+
+    """
+    if numpy is None:
+        hits = zip(levels, powers, categories, attacks, defenses, special_attacks,
+                   special_defenses)
+        results = []
+        for level, power, category, attack, defense, special_attack, special_defense in hits:
+            if category == PHYSICAL:
+                results.append(damage(level, power, attack, defense))
+            elif category == SPECIAL:
+                results.append(damage(level, power, special_attack, special_defense))
+            else:
+                results.append(0)
+        return results
+
+    categories = numpy.asarray(categories, dtype=numpy.int8)
+    levels, powers, attacks, defenses, special_attacks, special_defenses = [
+        numpy.asarray(values) for values in
+        (levels, powers, attacks, defenses, special_attacks, special_defenses)]
+
+    count = len(categories)
+    results = numpy.empty(count, dtype=numpy.int64)
+
+    # Working arrays for one chunk of hits, which are reused for every chunk.
+    size = min(BATCH_CHUNK, count)
+    special = numpy.empty(size, dtype=bool)
+    buffers = [numpy.empty(size, dtype=numpy.float64) for index in range(5)]
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, count, BATCH_CHUNK):
+            stop = min(start + BATCH_CHUNK, count)
+            length = stop - start
+            chosen, attack, defense, work, result = [buffer[:length] for buffer in buffers]
+
+            # Pick the special stats of special techniques by adding the difference between
+            # the stats times 1, or times 0 for every other technique. The stats are whole
+            # numbers, so this gives exactly the stat that was picked.
+            numpy.equal(categories[start:stop], SPECIAL, out=special[:length])
+            numpy.copyto(chosen, special[:length].view(numpy.int8))
+            numpy.copyto(attack, attacks[start:stop])
+            numpy.copyto(work, special_attacks[start:stop])
+            work -= attack
+            work *= chosen
+            attack += work
+            numpy.copyto(defense, defenses[start:stop])
+            numpy.copyto(work, special_defenses[start:stop])
+            work -= defense
+            work *= chosen
+            defense += work
+
+            # Every operation matches one in damage(), in the same order and with the same
+            # 64 bit floats. Products of whole numbers are exact in a float, so multiplying
+            # the attack and power as floats gives the same number as multiplying them as
+            # integers first.
+            numpy.copyto(work, powers[start:stop])
+            attack *= work
+            numpy.copyto(result, levels[start:stop])
+            result *= 2
+            result /= 7.
+            result *= attack
+            result /= defense
+            result /= 50.
+
+            # Converting to integers truncates towards zero as int() does.
+            numpy.copyto(results[start:stop], result, casting="unsafe")
+
+        # Only keep the damage of techniques that do damage, which also hides the result of
+        # dividing by a 0 defense that those techniques may have been given.
+        other = (categories != PHYSICAL) & (categories != SPECIAL)
+        if other.any():
+            results[other] = 0
+
+    return results
+
+
+def batch_poison(current_hp, status_turn, poisoned):
+    """Resolves the start of turn status check for many monsters at once, as
+    :meth:`Battle.status_check` does for one. Poisoned monsters take poison damage from
+    their second poisoned turn onwards, and monsters with no health left faint.
+
+    :param current_hp: The health of each monster. They must not have fainted already.
+    :param status_turn: How many turns each monster has had its status for.
+    :param poisoned: Whether each monster is poisoned.
+
+    :type current_hp: numpy.ndarray or List
+    :type status_turn: numpy.ndarray or List
+    :type poisoned: numpy.ndarray or List
+
+    :rtype: Tuple
+    :returns: The monsters' new health, new status turns and whether each one fainted.
+
+    **Examples:**
+
+    >>> batch_poison([50, 50, 5], [0, 1, 1], [True, True, True])
+    (array([50, 40,  0]), array([1, 2, 2]), array([False, False,  True]))
+
+    """
+    if numpy is None:
+        hp_after, turns_after, fainted = [], [], []
+        for hp, turn, poison in zip(current_hp, status_turn, poisoned):
+            if poison:
+                if turn >= 1:
+                    hp -= POISON_DAMAGE
+                turn += 1
+            hp_after.append(max(hp, 0))
+            turns_after.append(turn)
+            fainted.append(hp <= 0)
+        return hp_after, turns_after, fainted
+
+    poisoned = numpy.asarray(poisoned, dtype=bool)
+    status_turn = numpy.asarray(status_turn, dtype=numpy.int64)
+    current_hp = numpy.asarray(current_hp, dtype=numpy.int64) - \
+        POISON_DAMAGE * (poisoned & (status_turn >= 1))
+    fainted = current_hp <= 0
+    return numpy.maximum(current_hp, 0), status_turn + poisoned, fainted
+
+
+def technique_damage(count, seed=0):
+    """Checks :func:`batch_damage` against core.components.monster.Technique.damage, the
+    way the game calculates damage one hit at a time, and times that scalar path. Monsters
+    can only be loaded when PyGame is installed.
+
+    :param count: How many hits to time the scalar path for.
+    :param seed: The seed for the random number generator.
+
+    :type count: Integer
+    :type seed: Integer
+
+    :rtype: Tuple or None
+    :returns: The seconds Technique.damage takes for the given number of hits and the
+        number of sample hits where the two paths disagree, or None if the monster module
+        can't be imported.
+
+    """
+    try:
+        from core.components import monster
+    except ImportError:
+        return None
+
+    rand = random.Random(seed)
+    user = monster.Monster()
+    user.load_from_db("Bamboon")
+    target = monster.Monster()
+    target.load_from_db("Bigfin")
+    techniques = [monster.Technique("Pound"), monster.Technique("Poison Sting")]
+
+    # Random stats are given to the monsters before each hit, and the health the target
+    # loses is compared against the batch results.
+    hits = []
+    lost = []
+    for index in range(min(count, 10000)):
+        technique = rand.choice(techniques)
+        user.level = rand.randint(0, 100)
+        user.attack = rand.randint(0, 999)
+        user.special_attack = rand.randint(0, 999)
+        target.defense = rand.randint(1, 999)
+        target.special_defense = rand.randint(1, 999)
+        target.current_hp = 0
+        technique.damage(user, target)
+        lost.append(-target.current_hp)
+        hits.append((user.level, technique.power,
+                     CATEGORY_CODES.get(technique.category, OTHER), user.attack,
+                     target.defense, user.special_attack, target.special_defense))
+    results = batch_damage(*[list(column) for column in zip(*hits)])
+    mismatches = sum(1 for a, b in zip(lost, results) if a != int(b))
+
+    # Timing every hit of a large batch would take a while, so part of it is timed and
+    # scaled up.
+    timed = min(count, 100000)
+    technique = techniques[0]
+    start = timeit.default_timer()
+    for index in range(timed):
+        technique.damage(user, target)
+    seconds = (timeit.default_timer() - start) * count / float(max(timed, 1))
+    return seconds, mismatches
+
+
+def check_batch(count=1000000, seed=0):
+    """Checks that :func:`batch_damage` and :func:`batch_poison` give exactly the same
+    results as :func:`damage` and :meth:`Battle.status_check` for a large number of random
+    stats, and times both ways of calculating damage.
+
+    :param count: How many random hits and status checks to compare.
+    :param seed: The seed for the random number generator.
+
+    :type count: Integer
+    :type seed: Integer
+
+    :rtype: Dictionary
+    :returns: The number of "damage_mismatches", "technique_mismatches" and
+        "poison_mismatches", the seconds the batch and both scalar paths take, the
+        "damage_speedup" over calling damage() in a loop, the "technique_speedup" over
+        Technique.damage, and whether the damage speedup "meets_target" of
+        BATCH_SPEEDUP_TARGET.
+
+    """
+    rand = random.Random(seed)
+    levels = [rand.randint(0, 100) for index in range(count)]
+    powers = [rand.randint(0, 250) for index in range(count)]
+    categories = [rand.choice(("physical", "special")) for index in range(count)]
+    attacks = [rand.randint(0, 999) for index in range(count)]
+    defenses = [rand.randint(1, 999) for index in range(count)]
+    special_attacks = [rand.randint(0, 999) for index in range(count)]
+    special_defenses = [rand.randint(1, 999) for index in range(count)]
+
+    # Every hit is worked out the way Technique.damage does it.
+    start = timeit.default_timer()
+    expected = []
+    for index in range(count):
+        if categories[index] == "physical":
+            expected.append(damage(levels[index], powers[index], attacks[index],
+                                   defenses[index]))
+        elif categories[index] == "special":
+            expected.append(damage(levels[index], powers[index], special_attacks[index],
+                                   special_defenses[index]))
+    scalar_seconds = timeit.default_timer() - start
+
+    # The categories are converted once, before the timing starts, as they would be for a
+    # grid of hits. The quickest of a few runs is kept so that other processes on the
+    # machine don't skew the result.
+    arguments = [levels, powers, category_codes(categories), attacks, defenses,
+                 special_attacks, special_defenses]
+    if numpy is not None:
+        for index in (0, 1, 3, 4, 5, 6):
+            arguments[index] = numpy.asarray(arguments[index], dtype=numpy.int32)
+    batch_seconds = None
+    for attempt in range(3):
+        start = timeit.default_timer()
+        results = batch_damage(*arguments)
+        elapsed = timeit.default_timer() - start
+        if batch_seconds is None or elapsed < batch_seconds:
+            batch_seconds = elapsed
+    damage_mismatches = sum(1 for a, b in zip(expected, results) if a != int(b))
+    damage_speedup = scalar_seconds / max(batch_seconds, 1e-9)
+
+    technique = technique_damage(count, seed)
+    if technique is None:
+        technique_seconds = technique_mismatches = technique_speedup = None
+    else:
+        technique_seconds, technique_mismatches = technique
+        technique_speedup = technique_seconds / max(batch_seconds, 1e-9)
+
+    # Each status check is compared against a battle between two single monster parties.
+    class Fighter(object):
+        __slots__ = ("current_hp", "status", "status_turn", "experience_give_modifier",
+                     "level")
+
+    poison_count = min(count, 10000)
+    current_hp = [rand.randint(1, 60) for index in range(poison_count)]
+    status_turn = [rand.randint(0, 3) for index in range(poison_count)]
+    poisoned = [rand.random() < 0.5 for index in range(poison_count)]
+    hp_after, turns_after, fainted = batch_poison(current_hp, status_turn, poisoned)
+
+    poison_mismatches = 0
+    for index in range(poison_count):
+        fighter = Fighter()
+        fighter.current_hp = current_hp[index]
+        fighter.status = "Poisoned" if poisoned[index] else "Normal"
+        fighter.status_turn = status_turn[index]
+        side = Side("player", [fighter])
+        battle = Battle(side, Side("opponent", []))
+        battle.status_check(side)
+        if (fighter.current_hp, fighter.status_turn, fighter.status == "FNT") != \
+                (hp_after[index], turns_after[index], fainted[index]):
+            poison_mismatches += 1
+
+    return {"count": count,
+            "numpy": numpy is not None,
+            "damage_mismatches": damage_mismatches,
+            "technique_mismatches": technique_mismatches,
+            "poison_mismatches": poison_mismatches,
+            "damage_seconds": scalar_seconds,
+            "technique_seconds": technique_seconds,
+            "batch_seconds": batch_seconds,
+            "damage_speedup": damage_speedup,
+            "technique_speedup": technique_speedup,
+            "speedup_target": BATCH_SPEEDUP_TARGET,
+            "meets_target": damage_speedup >= BATCH_SPEEDUP_TARGET}
+
+
+if __name__ == "__main__":
+    usage = "Usage: python -m core.components.battle [simulate|check] [count]"
+    command = sys.argv[1] if len(sys.argv) > 1 else "simulate"
+    if command not in ("simulate", "check"):
+        print usage
+        sys.exit(1)
+
+    if command == "check":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+        results = check_batch(count)
+        for key in sorted(results):
+            print "%-20s %s" % (key, results[key])
+        sys.exit(1 if results["damage_mismatches"] or results["technique_mismatches"] or
+                 results["poison_mismatches"] else 0)
+
+    from core.components import monster
+
+    def party(*names):
+        monsters = []
+        for name in names:
+            tuxemon = monster.Monster()
+            tuxemon.load_from_db(name)
+            tuxemon.set_level(10)
+            monsters.append(tuxemon)
+        return monsters
+
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    results = simulate(lambda: Side("player", party("Bamboon", "Rockitten"), random_technique),
+                       lambda: Side("opponent", party("Bigfin", "Fruitera"), random_technique),
+                       count)
+    for key in sorted(results):
+        print "%-20s %s" % (key, results[key])
@@ -169,6 +169,41 @@ class CommandLine(cmd.Cmd):
         code.interact(local=locals())
 
 
+    def do_stats(self, line):
+        """Shows the event engine's statistics of which conditions, map events and actions
+        take the most time. "stats on" and "stats off" start and stop recording, "stats reset"
+        clears what has been recorded, and "stats dump <file>" writes it all as JSON.
+
+        :param line: The rest of the command line after "stats".
+
+        :rtype: None
+        :returns: None
+
+        """
+
+        metrics = self.app.event_engine.metrics
+        args = line.split()
+        command = args[0] if args else ""
+
+        if command == "on":
+            metrics.enabled = True
+        elif command == "off":
+            metrics.enabled = False
+        elif command == "reset":
+            metrics.reset()
+        elif command == "dump":
+            if len(args) > 1:
+                metrics.dump(args[1])
+            else:
+                metrics.dump()
+        elif command:
+            print 'Unknown stats command "%s". Use on, off, reset or dump.' % command
+        else:
+            if not metrics.enabled:
+                print 'Event metrics are off. Type "stats on" to start recording.'
+            print metrics.report()
+
+
     def postcmd(self, stop, line):
         """If the application has exited, exit here as well.
 
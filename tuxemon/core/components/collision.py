@@ -0,0 +1,181 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.collision Tile collision grid.
+#
+#
+
+import logging
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.collision successfully imported")
+
+# Bits stored for each tile in the grid. The rest of the byte counts how many characters
+# are standing on the tile.
+STATIC = 1
+OCCUPANT = 2
+
+
+class CollisionGrid(object):
+    """Keeps track of which tiles of a map can't be walked through. Each tile is a single byte
+    in a grid the size of the map, marking the map's own collision tiles along with any NPCs
+    that are standing there. NPCs are only updated when they move onto a new tile, so
+    checking a tile never needs to build anything.
+
+    The grid can be used in place of a set of (x, y) tile positions, so
+    core.components.player.Player.collision_check can test tiles with "in".
+
+    :param size: The [width, height] of the map in tiles.
+    :param tiles: The (x, y) positions of the map's collision tiles.
+
+    :type size: Tuple
+    :type tiles: Set
+
+    **Examples:**
+
+    >>> grid = CollisionGrid((20, 20), set([(0, 2), (0, 3)]))
+    >>> (0, 2) in grid
+    True
+    >>> grid.place(npc, 5, 5)
+    >>> (5, 5) in grid
+    True
+
+    """
+    def __init__(self, size, tiles):
+        self.width = int(size[0])
+        self.height = int(size[1])
+        self.cells = bytearray(self.width * self.height)
+
+        # Collision tiles that were defined outside of the map's bounds, and how many
+        # characters are standing on each tile outside of the map.
+        self.outside = set()
+        self.outside_occupants = {}
+
+        # The tile each character was last placed on.
+        # >>> self.occupants
+        # {<core.components.player.Npc object at 0x7f3c>: (5, 5)}
+        self.occupants = {}
+
+        for x, y in tiles:
+            if 0 <= x < self.width and 0 <= y < self.height:
+                self.cells[x * self.height + y] |= STATIC
+            else:
+                self.outside.add((x, y))
+
+
+    def __contains__(self, tile_pos):
+        x, y = tile_pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.cells[x * self.height + y] != 0
+        return tile_pos in self.outside or tile_pos in self.outside_occupants
+
+
+    def place(self, occupant, x, y):
+        """Moves a character to the given tile. Nothing changes if the character is already
+        on that tile.
+
+        :param occupant: The character standing on the tile.
+        :param x: The x position of the tile.
+        :param y: The y position of the tile.
+
+        :type occupant: core.components.player.Player
+        :type x: Integer
+        :type y: Integer
+
+        :rtype: None
+        :returns: None
+
+        """
+        previous = self.occupants.get(occupant)
+        if previous is not None:
+            if previous[0] == x and previous[1] == y:
+                return
+            self.update(previous, -OCCUPANT)
+
+        tile_pos = (x, y)
+        self.occupants[occupant] = tile_pos
+        self.update(tile_pos, OCCUPANT)
+
+
+    def remove(self, occupant):
+        """Removes a character from the tile it was standing on.
+
+        :param occupant: The character to remove.
+
+        :type occupant: core.components.player.Player
+
+        :rtype: None
+        :returns: None
+
+        """
+        tile_pos = self.occupants.pop(occupant, None)
+        if tile_pos is not None:
+            self.update(tile_pos, -OCCUPANT)
+
+
+    def update(self, tile_pos, amount):
+        """Adds to the number of characters standing on a tile.
+
+        :param tile_pos: The (x, y) position of the tile.
+        :param amount: OCCUPANT to add a character, or -OCCUPANT to remove one.
+
+        :type tile_pos: Tuple
+        :type amount: Integer
+
+        :rtype: None
+        :returns: None
+
+        """
+        x, y = tile_pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.cells[x * self.height + y] += amount
+            return
+
+        count = self.outside_occupants.get(tile_pos, 0) + amount / OCCUPANT
+        if count > 0:
+            self.outside_occupants[tile_pos] = count
+        else:
+            self.outside_occupants.pop(tile_pos, None)
+
+
+    def tiles(self):
+        """Returns the positions of all the map's own collision tiles. This is used to draw
+        the collision map for debugging.
+
+        :param: None
+
+        :rtype: List
+        :returns: A list of (x, y) tile positions.
+
+        """
+        tiles = list(self.outside)
+        for index, cell in enumerate(self.cells):
+            if cell & STATIC:
+                tiles.append((index // self.height, index % self.height))
+        return tiles
+
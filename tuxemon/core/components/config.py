@@ -57,6 +57,9 @@ class Config(object):
         self.starting_position = [int(self.config.get("game", "starting_position_x")), 
                                   int(self.config.get("game", "starting_position_y"))]
         self.cli = int(self.config.get("game", "cli_enabled"))
+        self.map_cache_size = int(self.config.get("game", "map_cache_size"))
+        self.event_metrics = int(self.config.get("game", "event_metrics"))
+        self.database = self.config.get("game", "database")
 
         self.player_animation_speed = float(self.config.get("player", "animation_speed"))
 
@@ -29,36 +29,200 @@
 #
 #
 
+import collections
+import ConfigParser
 import logging
 import json
+import operator
 import pygame
 import os
 import random
 import sys
+import threading
 
+from . import config
+from . import db_compiler
 from . import player
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
 logger.debug("core.db successfully imported")
 
 
+# The tables in the database. Each one is a directory of JSON files under resources/db/.
+TABLES = ("item", "monster", "npc", "technique", "encounter")
+
+# The database backends that can be chosen with the "database" option in tuxemon.cfg.
+BACKENDS = ("json", "sqlite")
+
+# The types of field value that can be compared in a query. Lists and dictionaries are
+# never compared, so every backend gives the same answer.
+SCALARS = (basestring, int, long, float)
+
+
+def scalar(compare):
+    """Returns a query operator that only matches fields holding a string or a number."""
+    return lambda field, value: isinstance(field, SCALARS) and compare(field, value)
+
+
+# How each query operator compares a field of a record with a value. The comparisons only
+# match string and number fields. "contains" checks whether a list field, such as a
+# monster's types, includes the value.
+OPERATORS = {"=": scalar(operator.eq),
+             "!=": scalar(operator.ne),
+             "<": scalar(operator.lt),
+             "<=": scalar(operator.le),
+             ">": scalar(operator.gt),
+             ">=": scalar(operator.ge),
+             "contains": lambda field, value: isinstance(field, tuple) and value in field}
+
+
+class Record(dict):
+    """A read-only record from the database. Records are shared by everything that looks
+    them up, so changing one would change it for the whole game. Use dict(record) to get a
+    copy that can be changed.
+
+    """
+    def read_only(self, *args, **kwargs):
+        raise TypeError("Database records are read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = read_only
+
+    def __reduce__(self):
+        return (Record, (dict(self),))
+
+
+def freeze(value):
+    """Makes a decoded JSON value read-only by turning its lists into tuples and its
+    objects into records.
+
+    :param value: A value decoded from JSON.
+    :type value: Object
+
+    :rtype: Object
+    :returns: The value with lists replaced by tuples and dicts by records.
+
+    """
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict) and not isinstance(value, Record):
+        return Record((key, freeze(item)) for key, item in value.items())
+    return value
+
+
+def decode_record(pairs):
+    """Builds a read-only record from the key/value pairs of a JSON object."""
+    return Record((key, freeze(value)) for key, value in pairs)
+
+
+
+class TableView(collections.Mapping):
+    """A read-only view of one table of the database, mapping record ids to records.
+
+    :param records: The table's records by id.
+    :type records: Dictionary
+
+    """
+    def __init__(self, records):
+        self.records = records
+
+
+    def __getitem__(self, id):
+        return self.records[id]
+
+
+    def __iter__(self):
+        return iter(self.records)
+
+
+    def __len__(self):
+        return len(self.records)
+
+
+    def __contains__(self, id):
+        return id in self.records
+
+
+
+class LazyTables(collections.Mapping):
+    """The tables of a database by name. A table is loaded from disk the first time it is
+    used, so JSONDatabase.database["monster"] keeps working without loading everything up
+    front.
+
+    :param database: The database the tables belong to.
+    :type database: core.components.db.JSONDatabase
+
+    """
+    def __init__(self, database):
+        self.owner = database
+
+
+    def __getitem__(self, table):
+        if table not in TABLES:
+            raise KeyError(table)
+        return self.owner.table(table)
+
+
+    def __iter__(self):
+        return iter(TABLES)
+
+
+    def __len__(self):
+        return len(TABLES)
+
+
+
 class JSONDatabase(object):
     """Handles connecting to the game database for resources such as monsters,
     stats, etc.
 
+    Each table is loaded from disk the first time it is used and then kept in memory, along
+    with an index of its records by name. The records are read-only. Use
+    :func:`get_database` to share one database across the whole game instead of loading
+    the files again.
+
+    Tables are read from the compiled bundle made by :mod:`core.components.db_compiler`
+    when it is up to date, which is compiled first if any JSON file has changed. The JSON
+    files are only read one by one if the bundle can't be written.
+
+    :param path: The directory of the JSON files.
+    :param bundle: Whether to use the compiled bundle.
+
+    :type path: String
+    :type bundle: Boolean
+
+    **Examples:**
+
+    >>> database = get_database()
+    >>> database.lookup("Bamboon")["id"]
+    1
+    >>> database.database["monster"][1]["name"]
+    u'Bamboon'
+
     """  
 
-    def __init__(self):
-        self.path = "resources/db/"
-        self.database = {"item": {},
-                         "monster": {},
-                         "npc": {},
-                         "technique": {},
-                         "encounter": {}}
+    def __init__(self, path="resources/db/", bundle=True):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # The compiled bundle, which is opened the first time a table is needed. False
+        # if it isn't being used.
+        self.bundle = None if bundle else False
+
+        # The records of each loaded table by id, and the id of each record by name.
+        # >>> self.tables
+        # {'monster': {1: {u'id': 1, u'name': u'Bulbatux', ...}}}
+        # >>> self.names
+        # {'monster': {u'Bulbatux': 1}}
+        self.tables = {}
+        self.views = {}
+        self.names = {}
+
+        self.database = LazyTables(self)
 
 
     def load(self, directory="all"):
-        """Loads all data from JSON files located under our data path.
+        """Loads all data from JSON files located under our data path. Tables that are
+        already loaded are not read again.
 
         :param directory: The directory under resources/db/ to load. Defaults
             to "all".
@@ -69,13 +233,53 @@ class JSONDatabase(object):
         """
 
         if directory == "all":
-            self.load_json("item")
-            self.load_json("monster")
-            self.load_json("technique")
-            self.load_json("npc")
-            self.load_json("encounter")
+            for table in TABLES:
+                self.table(table)
         else:
-            self.load_json(directory)
+            self.table(directory)
+
+
+    def table(self, table):
+        """Returns a table of the database, loading it from disk first if it hasn't been
+        loaded yet. This is safe to call from more than one thread.
+
+        :param table: The name of the table, such as "monster".
+        :type table: String
+
+        :rtype: core.components.db.TableView
+        :returns: A read-only mapping of record ids to records.
+
+        """
+        view = self.views.get(table)
+        if view is not None:
+            return view
+
+        with self.lock:
+            if table not in self.views:
+                if self.bundle is None:
+                    self.bundle = db_compiler.load(self.path, TABLES) or False
+
+                if self.bundle and table in self.bundle:
+                    self.load_bundle(table)
+                else:
+                    self.load_json(table)
+            return self.views[table]
+
+
+    def load_bundle(self, table):
+        """Loads the index of a table from the compiled bundle. Its records are only
+        decoded as they are looked up.
+
+        :param table: The name of the table.
+        :type table: String
+
+        :returns: None
+
+        """
+        records = self.bundle.table(table, freeze)
+        self.tables[table] = records
+        self.names[table] = self.bundle.names(table)
+        self.views[table] = TableView(records)
 
 
     def load_json(self, directory):
@@ -88,6 +292,8 @@ class JSONDatabase(object):
 
         """
 
+        records = {}
+        names = {}
         for json_item in os.listdir(self.path + directory):
 
             # Only load .json files.
@@ -95,14 +301,21 @@ class JSONDatabase(object):
                 continue
 
             # Load our json as a dictionary.
-            file = open(self.path + directory + "/" + json_item, 'r')
-            item = json.load(file)
+            with open(self.path + directory + "/" + json_item, 'r') as file:
+                item = json.load(file, object_pairs_hook=decode_record)
 
-            if item['id'] not in self.database[directory]:
-                self.database[directory][item['id']] = item
+            if item['id'] not in records:
+                records[item['id']] = item
             else:
                 raise Exception("Error: Item with this id was already loaded.")
-            file.close()
+
+            if 'name' in item:
+                names.setdefault(item['name'], item['id'])
+
+        logger.debug("Loaded %d records from the %s table" % (len(records), directory))
+        self.tables[directory] = records
+        self.names[directory] = names
+        self.views[directory] = TableView(records)
 
 
     def lookup(self, name, table="monster"):
@@ -119,12 +332,91 @@ class JSONDatabase(object):
 
         """
 
-        if name in self.database[table]:
-            return self.database[table][name]
+        records = self.table(table)
+        if name in records:
+            return records[name]
+
+        id = self.names[table].get(name)
+        if id is not None:
+            return records[id]
+
+
+    def query(self, table, *conditions):
+        """Finds every record in a table that matches all of the given conditions. Each
+        condition compares a top level field of the record with a value, and records that
+        don't have the field never match. The comparison operators only match fields that
+        hold a string or a number, so ("types", "!=", "fire") matches nothing, and
+        "contains" only matches list fields.
+
+        :param table: The table to search, such as "monster".
+        :param conditions: (field, operator, value) tuples, where operator is one of "=",
+            "!=", "<", "<=", ">", ">=" or "contains".
+
+        :type table: String
+        :type conditions: Tuple
+
+        :rtype: List
+        :returns: The matching records, ordered by id.
+
+        **Examples:**
+
+        >>> [m["name"] for m in database.query("monster", ("types", "contains", "water"),
+        ...                                    ("speed_base", ">", 5))]
+        [u'Bigfin', u'Djinnbo']
+
+        """
+        tests = []
+        for field, name, value in conditions:
+            if name not in OPERATORS:
+                raise ValueError("Unknown query operator \"%s\"" % name)
+            tests.append((field, OPERATORS[name], value))
+
+        records = self.table(table)
+        results = []
+        for id in sorted(records):
+            record = records[id]
+            for field, compare, value in tests:
+                if field not in record or not compare(record[field], value):
+                    break
+            else:
+                results.append(record)
+        return results
+
+
+    def learnable_techniques(self, level, monster=None):
+        """Finds the techniques that can be learned by a given level, from the movesets
+        of every monster or of one monster.
 
-        for id, item in self.database[table].items():
-            if item['name'] == name:
-                return item
+        :param level: The highest level to learn a technique at.
+        :param monster: The name or id of a monster, or None for every monster.
+
+        :type level: Integer
+        :type monster: String or Integer
+
+        :rtype: List
+        :returns: The technique records, ordered by id.
+
+        **Examples:**
+
+        >>> [t["name"] for t in database.learnable_techniques(20, "Bamboon")]
+        [u'Pound', u'Poison Sting']
+
+        """
+        if monster is None:
+            monsters = self.table("monster").values()
+        else:
+            monsters = [self.lookup(monster)]
+
+        ids = set()
+        for record in monsters:
+            if record is None:
+                continue
+            for move in record.get("moveset", ()):
+                if move["level_learned"] <= level:
+                    ids.add(move["technique_id"])
+
+        techniques = self.table("technique")
+        return [techniques[id] for id in sorted(ids) if id in techniques]
 
 
     def lookup_by_id(self, id, table="monster"):
@@ -139,7 +431,7 @@ class JSONDatabase(object):
 
         """
         logger.warning("lookup_by_id is deprecated. Use JSONDatabase.database")
-        self.lookup(id, table)
+        return self.lookup(id, table)
 
 
     def lookup_sprite(self, monster_id, table="sprite"):
@@ -164,6 +456,69 @@ class JSONDatabase(object):
 
 
 
+# The database shared by the whole game.
+_database = None
+_database_lock = threading.Lock()
+
+
+def create_database(backend="json", path="resources/db/"):
+    """Creates a database with the given backend. The "sqlite" backend needs Python's
+    sqlite3 module, and the JSON backend is used instead if it isn't available.
+
+    :param backend: One of BACKENDS.
+    :param path: The directory of the JSON files.
+
+    :type backend: String
+    :type path: String
+
+    :rtype: core.components.db.JSONDatabase
+    :returns: The new database.
+
+    """
+    if backend not in BACKENDS:
+        logger.warning("Unknown database backend \"%s\", using json" % backend)
+    elif backend == "sqlite":
+        from . import db_sqlite
+        if db_sqlite.sqlite3 is not None:
+            return db_sqlite.SQLiteDatabase(path)
+        logger.warning("The sqlite3 module isn't available, using the json database")
+
+    return JSONDatabase(path)
+
+
+def get_database(backend=None):
+    """Returns the database shared by the whole game, creating it the first time. Its
+    tables are loaded as they are used.
+
+    :param backend: The backend to create the database with. Defaults to the "database"
+        option in tuxemon.cfg. Ignored once the database has been created.
+
+    :type backend: String
+
+    :rtype: core.components.db.JSONDatabase
+    :returns: The shared database.
+
+    **Examples:**
+
+    >>> encounters = get_database().table("encounter")
+
+    """
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                # The database is first needed while core.prepare is still being imported,
+                # so the config is read here instead of using prepare.CONFIG.
+                if backend is None:
+                    try:
+                        backend = config.Config().database
+                    except ConfigParser.Error:
+                        backend = "json"
+                _database = create_database(backend)
+    return _database
+
+
+
 if __name__ == "__main__":
 
     import pprint
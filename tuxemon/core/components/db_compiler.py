@@ -0,0 +1,474 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+#
+# core.components.db_compiler Compiled database bundle.
+#
+#
+"""Compiles the JSON database under resources/db/ into a single binary bundle so the game
+doesn't have to open and parse one small file for every monster, technique and item.
+
+The bundle is written next to the database directory as "resources/db.bundle". It holds
+every record of every table, along with each table's index of records by id and by name.
+It is opened with mmap and only the index is read up front. Each record is decoded the
+first time it is looked up. The bundle is rebuilt whenever a JSON file is added, removed or
+changed, and the database falls back to the JSON files if the bundle can't be written.
+
+To build the bundle ahead of time, or to compare load times for 10000 generated records,
+run this module from the game's directory:
+
+    python -m core.components.db_compiler compile
+    python -m core.components.db_compiler benchmark
+
+"""
+
+import collections
+import json
+import logging
+import marshal
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.db_compiler successfully imported")
+
+# Bundles start with this header, followed by the length of the index. The version must be
+# increased whenever the layout of the bundle changes so that old bundles are rebuilt.
+MAGIC = "TUXDB"
+VERSION = 1
+HEADER = struct.Struct("<I")
+
+# The extension of the bundle, which is named after the database directory.
+EXTENSION = ".bundle"
+
+# The types given to generated monsters in turn.
+GENERATED_TYPES = ("wood", "water", "earth", "fire", "metal")
+
+
+def bundle_filename(path):
+    """Returns the path of the bundle for a database directory.
+
+    :param path: The database directory.
+
+    :type path: String
+
+    :rtype: String
+    :returns: The path to the bundle.
+
+    **Examples:**
+
+    >>> bundle_filename("resources/db/")
+    'resources/db.bundle'
+
+    """
+    return os.path.normpath(path) + EXTENSION
+
+
+def sources(path, tables):
+    """Returns the modification time of every JSON file in the database. If any of them
+    change, the bundle needs to be compiled again.
+
+    :param path: The database directory.
+    :param tables: The names of the tables, which are the directories under path.
+
+    :type path: String
+    :type tables: Tuple
+
+    :rtype: Dictionary
+    :returns: The modification time of each JSON file by name, for each table.
+
+    """
+    files = {}
+    for table in tables:
+        directory = os.path.join(path, table)
+        files[table] = {}
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                files[table][name] = os.path.getmtime(os.path.join(directory, name))
+    return files
+
+
+
+class BundleTable(collections.Mapping):
+    """A read-only table in a bundle, mapping record ids to records. A record is decoded
+    from the bundle the first time it is looked up and then kept.
+
+    :param contents: The bundle's memory map.
+    :param start: Where the records start in the bundle.
+    :param offsets: The (offset, length) of each record by id.
+    :param decode: Called with each record after it is read, to make it read-only.
+
+    :type contents: mmap.mmap
+    :type start: Integer
+    :type offsets: Dictionary
+    :type decode: Function
+
+    """
+    def __init__(self, contents, start, offsets, decode):
+        self.contents = contents
+        self.start = start
+        self.offsets = offsets
+        self.decode = decode
+        self.records = {}
+
+
+    def __getitem__(self, id):
+        record = self.records.get(id)
+        if record is None:
+            offset, length = self.offsets[id]
+            offset += self.start
+            record = self.decode(marshal.loads(self.contents[offset:offset + length]))
+            self.records[id] = record
+        return record
+
+
+    def __iter__(self):
+        return iter(self.offsets)
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def __contains__(self, id):
+        return id in self.offsets
+
+
+
+class Bundle(object):
+    """An open database bundle.
+
+    :param contents: The bundle's memory map.
+    :param start: Where the records start in the bundle.
+    :param index: The bundle's index, from :func:`compile`.
+
+    :type contents: mmap.mmap
+    :type start: Integer
+    :type index: Dictionary
+
+    **Examples:**
+
+    >>> bundle = read("resources/db/", ("monster",))
+    >>> monsters = bundle.table("monster", dict)
+    >>> monsters[bundle.names("monster")["Bamboon"]]["id"]
+    1
+
+    """
+    def __init__(self, contents, start, index):
+        self.contents = contents
+        self.start = start
+        self.index = index
+
+
+    def __contains__(self, table):
+        return table in self.index["tables"]
+
+
+    def table(self, table, decode):
+        """Returns a table of the bundle.
+
+        :param table: The name of the table.
+        :param decode: Called with each record after it is read.
+
+        :type table: String
+        :type decode: Function
+
+        :rtype: core.components.db_compiler.BundleTable
+        :returns: The table's records by id.
+
+        """
+        return BundleTable(self.contents, self.start,
+                           self.index["tables"][table]["offsets"], decode)
+
+
+    def names(self, table):
+        """Returns the id of each record in a table by name.
+
+        :param table: The name of the table.
+
+        :type table: String
+
+        :rtype: Dictionary
+        :returns: The record ids by name.
+
+        """
+        return self.index["tables"][table]["names"]
+
+
+
+def compile(path, tables):
+    """Reads every JSON file in the database and writes them all to the bundle. Failing to
+    write it is not an error, the database will just be loaded from the JSON files.
+
+    :param path: The database directory.
+    :param tables: The names of the tables to put in the bundle.
+
+    :type path: String
+    :type tables: Tuple
+
+    :rtype: Boolean
+    :returns: True if the bundle was written.
+
+    """
+    filename = bundle_filename(path)
+    files = sources(path, tables)
+    index = {"version": VERSION, "sources": files, "tables": {}}
+    records = []
+    size = 0
+
+    try:
+        for table in tables:
+            offsets = {}
+            names = {}
+            for name in sorted(files[table]):
+                with open(os.path.join(path, table, name), "r") as json_file:
+                    record = json.load(json_file)
+
+                if record["id"] in offsets:
+                    raise ValueError("Item with id %s was already loaded" % record["id"])
+
+                data = marshal.dumps(record)
+                offsets[record["id"]] = (size, len(data))
+                records.append(data)
+                size += len(data)
+
+                if "name" in record:
+                    names.setdefault(record["name"], record["id"])
+
+            index["tables"][table] = {"offsets": offsets, "names": names}
+
+        data = marshal.dumps(index)
+        temporary = filename + ".tmp"
+        with open(temporary, "wb") as bundle_file:
+            bundle_file.write(MAGIC)
+            bundle_file.write(HEADER.pack(len(data)))
+            bundle_file.write(data)
+            for data in records:
+                bundle_file.write(data)
+
+        # Windows won't rename over an existing file.
+        if os.name == "nt" and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(temporary, filename)
+    except (IOError, OSError, ValueError, KeyError) as e:
+        logger.warning("Unable to compile database " + path + ": " + str(e))
+        return False
+
+    logger.debug("Compiled %d database records into %s" % (len(records), filename))
+    return True
+
+
+def read(path, tables):
+    """Opens the bundle of a database if it exists and is up to date.
+
+    :param path: The database directory.
+    :param tables: The names of the tables that must be in the bundle.
+
+    :type path: String
+    :type tables: Tuple
+
+    :rtype: core.components.db_compiler.Bundle or None
+    :returns: The open bundle, or None if the database needs to be compiled.
+
+    """
+    filename = bundle_filename(path)
+    try:
+        with open(filename, "rb") as bundle_file:
+            contents = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, ValueError):
+        return None
+
+    start = len(MAGIC) + HEADER.size
+    if contents[:len(MAGIC)] != MAGIC or len(contents) < start:
+        contents.close()
+        return None
+
+    try:
+        length, = HEADER.unpack(contents[len(MAGIC):start])
+        index = marshal.loads(contents[start:start + length])
+    except (EOFError, ValueError, TypeError, struct.error):
+        logger.warning("Database bundle " + filename + " is damaged")
+        contents.close()
+        return None
+
+    if not isinstance(index, dict) or index.get("version") != VERSION or \
+            index.get("sources") != sources(path, tables):
+        contents.close()
+        return None
+
+    return Bundle(contents, start + length, index)
+
+
+def load(path, tables):
+    """Opens the bundle of a database, compiling it first if it is missing or out of date.
+
+    :param path: The database directory.
+    :param tables: The names of the tables to put in the bundle.
+
+    :type path: String
+    :type tables: Tuple
+
+    :rtype: core.components.db_compiler.Bundle or None
+    :returns: The open bundle, or None if it couldn't be compiled.
+
+    """
+    bundle = read(path, tables)
+    if bundle is None and compile(path, tables):
+        bundle = read(path, tables)
+    return bundle
+
+
+def generate(count):
+    """Writes a database of generated monsters to a temporary directory, for benchmarks.
+    Each monster is a copy of Bamboon with its own id, name, type, speed and moveset, and
+    the game's techniques are copied alongside them.
+
+    :param count: The number of monster records to generate.
+
+    :type count: Integer
+
+    :rtype: String
+    :returns: The path of the database, which the caller should remove.
+
+    """
+    with open("resources/db/monster/bamboon.json") as json_file:
+        template = json.load(json_file)
+
+    # The database expects its path to end with a slash.
+    path = os.path.join(tempfile.mkdtemp(prefix="tuxemon-db-"), "")
+    shutil.copytree("resources/db/technique", os.path.join(path, "technique"))
+    os.mkdir(os.path.join(path, "monster"))
+    for id in range(1, count + 1):
+        record = dict(template, id=id, name="Monster %d" % id,
+                      types=[GENERATED_TYPES[id % len(GENERATED_TYPES)]],
+                      speed_base=id % 100,
+                      moveset=[{"level_learned": id % 50, "technique_id": 1 + id % 2}])
+        with open(os.path.join(path, "monster", "%d.json" % id), "w") as json_file:
+            json.dump(record, json_file)
+
+    return path
+
+
+def remove(path):
+    """Removes a database made by :func:`generate`, along with its bundle.
+
+    :param path: The path of the database.
+
+    :type path: String
+
+    :rtype: None
+    :returns: None
+
+    """
+    shutil.rmtree(path, ignore_errors=True)
+    if os.path.exists(bundle_filename(path)):
+        os.remove(bundle_filename(path))
+
+
+def timed(function):
+    """Calls a function and times how long it took, for benchmarks.
+
+    :param function: The function to call.
+
+    :type function: Function
+
+    :rtype: Tuple
+    :returns: The function's return value and the time it took in milliseconds.
+
+    """
+    start = time.time()
+    result = function()
+    return result, (time.time() - start) * 1000
+
+
+def benchmark(count=10000):
+    """Generates a database of monsters and times loading it from its JSON files and from
+    its bundle.
+
+    :param count: The number of monster records to generate.
+
+    :type count: Integer
+
+    :rtype: None
+    :returns: None
+
+    """
+    from core.components import db
+
+    path = generate(count)
+    try:
+        def lookups(database):
+            for id in range(1, count + 1, 100):
+                database.lookup("Monster %d" % id)
+
+        database = db.JSONDatabase(path, bundle=False)
+        _, json_load = timed(lambda: database.table("monster"))
+        _, json_lookup = timed(lambda: lookups(database))
+
+        _, compiling = timed(lambda: compile(path, db.TABLES))
+
+        database = db.JSONDatabase(path)
+        _, bundle_load = timed(lambda: database.table("monster"))
+        _, bundle_lookup = timed(lambda: lookups(database))
+        _, bundle_all = timed(lambda: [database.table("monster")[id] for id in
+                                       database.table("monster")])
+
+        print "%d records, %d bytes bundled" % (
+            count, os.path.getsize(bundle_filename(path)))
+        print "%-40s %10s" % ("Step", "Time (ms)")
+        print "%-40s %10.1f" % ("Load JSON files", json_load)
+        print "%-40s %10.1f" % ("Look up 1% of records (JSON)", json_lookup)
+        print "%-40s %10.1f" % ("Compile bundle", compiling)
+        print "%-40s %10.1f" % ("Open bundle", bundle_load)
+        print "%-40s %10.1f" % ("Look up 1% of records (bundle)", bundle_lookup)
+        print "%-40s %10.1f" % ("Decode the rest of the records (bundle)", bundle_all)
+    finally:
+        remove(path)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "benchmark"
+
+    if command == "compile":
+        from core.components import db
+        if read("resources/db/", db.TABLES) is not None:
+            print "Up to date " + bundle_filename("resources/db/")
+        elif compile("resources/db/", db.TABLES):
+            print "Compiled " + bundle_filename("resources/db/")
+    elif command == "benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        benchmark(count)
+    else:
+        print "Usage: python -m core.components.db_compiler [compile|benchmark [records]]"
@@ -0,0 +1,462 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+#
+# core.components.db_sqlite SQLite database backend.
+#
+#
+"""A database backend that keeps the records of resources/db/ in an SQLite file, so that
+queries such as "every wood monster faster than 50" or "every technique learnable by level
+20" use indexes instead of going through every record.
+
+The SQLite file is built from the JSON files as "resources/db.sqlite" and is rebuilt
+whenever a JSON file is added, removed or changed. Choose this backend by setting
+"database = sqlite" in tuxemon.cfg. It answers the same lookups and queries as the JSON
+backend.
+
+To compare how long queries take with each backend on 10000 generated monsters, run this
+module from the game's directory:
+
+    python -m core.components.db_sqlite benchmark
+
+"""
+
+import collections
+import json
+import logging
+import os
+import sys
+import threading
+
+from core.components import db
+from core.components import db_compiler
+
+# SQLite is left out of some Python builds, such as the one on Android.
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.db_sqlite successfully imported")
+
+# The version must be increased whenever the schema changes so that old files are rebuilt.
+VERSION = 1
+
+# The extension of the SQLite file, which is named after the database directory.
+EXTENSION = ".sqlite"
+
+# Every top level field of a record whose value is a string or a number is copied into the
+# "fields" table so it can be queried, and so is each item of a list of them, with "item"
+# set to 1. Monster movesets are copied into their own table.
+SCHEMA = """
+CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE records (tbl TEXT, id, name, data TEXT, PRIMARY KEY (tbl, id));
+CREATE INDEX records_name ON records (tbl, name, id);
+CREATE TABLE fields (tbl TEXT, id, field TEXT, item INTEGER, value);
+CREATE INDEX fields_value ON fields (tbl, field, item, value);
+CREATE TABLE moveset (monster_id, technique_id, level_learned);
+CREATE INDEX moveset_level ON moveset (level_learned, monster_id);
+"""
+
+# The SQL comparison for each query operator other than "contains".
+COMPARISONS = {"=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+
+def sqlite_filename(path):
+    """Returns the path of the SQLite file for a database directory.
+
+    :param path: The database directory.
+
+    :type path: String
+
+    :rtype: String
+    :returns: The path to the SQLite file.
+
+    **Examples:**
+
+    >>> sqlite_filename("resources/db/")
+    'resources/db.sqlite'
+
+    """
+    return os.path.normpath(path) + EXTENSION
+
+
+def field_rows(table, record):
+    """Returns the rows of the "fields" table for a record.
+
+    :param table: The name of the record's table.
+    :param record: The record, as decoded from JSON.
+
+    :type table: String
+    :type record: Dictionary
+
+    :rtype: List
+    :returns: (tbl, id, field, item, value) tuples.
+
+    """
+    rows = []
+    for field, value in record.items():
+        if isinstance(value, db.SCALARS):
+            rows.append((table, record["id"], field, 0, value))
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, db.SCALARS):
+                    rows.append((table, record["id"], field, 1, item))
+    return rows
+
+
+def compile(path, tables):
+    """Builds the SQLite file of a database from its JSON files. Failing to build it is not
+    an error, the JSON backend is used instead.
+
+    :param path: The database directory.
+    :param tables: The names of the tables to put in the file.
+
+    :type path: String
+    :type tables: Tuple
+
+    :rtype: Boolean
+    :returns: True if the file was written.
+
+    """
+    filename = sqlite_filename(path)
+    files = db_compiler.sources(path, tables)
+    temporary = filename + ".tmp"
+
+    try:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+        connection = sqlite3.connect(temporary)
+        try:
+            connection.executescript(SCHEMA)
+            for table in tables:
+                for name in sorted(files[table]):
+                    with open(os.path.join(path, table, name), "r") as json_file:
+                        data = json_file.read()
+                    record = json.loads(data)
+
+                    connection.execute("INSERT INTO records VALUES (?, ?, ?, ?)",
+                                       (table, record["id"], record.get("name"), data))
+                    connection.executemany("INSERT INTO fields VALUES (?, ?, ?, ?, ?)",
+                                           field_rows(table, record))
+                    if table == "monster":
+                        connection.executemany(
+                            "INSERT INTO moveset VALUES (?, ?, ?)",
+                            [(record["id"], move["technique_id"], move["level_learned"])
+                             for move in record.get("moveset", ())])
+
+            connection.execute("ANALYZE")
+            connection.executemany("INSERT INTO info VALUES (?, ?)",
+                                   [("version", str(VERSION)),
+                                    ("sources", json.dumps(files, sort_keys=True))])
+            connection.commit()
+        finally:
+            connection.close()
+
+        # Windows won't rename over an existing file.
+        if os.name == "nt" and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(temporary, filename)
+    except (IOError, OSError, ValueError, KeyError, sqlite3.Error) as e:
+        logger.warning("Unable to build SQLite database for " + path + ": " + str(e))
+        return False
+
+    logger.debug("Built SQLite database " + filename)
+    return True
+
+
+def connect(path, tables):
+    """Opens the SQLite file of a database, building it first if it is missing or out of
+    date.
+
+    :param path: The database directory.
+    :param tables: The names of the tables to put in the file.
+
+    :type path: String
+    :type tables: Tuple
+
+    :rtype: sqlite3.Connection or None
+    :returns: The open connection, or None if the file couldn't be built.
+
+    """
+    filename = sqlite_filename(path)
+    for attempt in range(2):
+        if os.path.exists(filename):
+            try:
+                # The connection is shared by threads, which take turns using it.
+                connection = sqlite3.connect(filename, check_same_thread=False)
+                info = dict(connection.execute("SELECT key, value FROM info"))
+                if info.get("version") == str(VERSION) and \
+                        json.loads(info.get("sources", "null")) == \
+                        db_compiler.sources(path, tables):
+                    return connection
+                connection.close()
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning("SQLite database " + filename + " is damaged: " + str(e))
+
+        if attempt == 0 and not compile(path, tables):
+            break
+
+    return None
+
+
+
+class SQLiteTable(collections.Mapping):
+    """A read-only table of the SQLite database, mapping record ids to records. A record
+    is read the first time it is looked up and then kept.
+
+    :param database: The database the table belongs to.
+    :param table: The name of the table.
+
+    :type database: core.components.db_sqlite.SQLiteDatabase
+    :type table: String
+
+    """
+    def __init__(self, database, table):
+        self.owner = database
+        self.table = table
+        self.records = {}
+
+
+    def __getitem__(self, id):
+        record = self.records.get(id)
+        if record is None:
+            rows = self.owner.execute("SELECT data FROM records WHERE tbl = ? AND id = ?",
+                                      (self.table, id))
+            if not rows:
+                raise KeyError(id)
+            record = json.loads(rows[0][0], object_pairs_hook=db.decode_record)
+            self.records[id] = record
+        return record
+
+
+    def __iter__(self):
+        rows = self.owner.execute("SELECT id FROM records WHERE tbl = ? ORDER BY id",
+                                  (self.table,))
+        return iter([row[0] for row in rows])
+
+
+    def __len__(self):
+        return self.owner.execute("SELECT COUNT(*) FROM records WHERE tbl = ?",
+                                  (self.table,))[0][0]
+
+
+    def __contains__(self, id):
+        return id in self.records or bool(self.owner.execute(
+            "SELECT 1 FROM records WHERE tbl = ? AND id = ?", (self.table, id)))
+
+
+
+class SQLiteDatabase(db.JSONDatabase):
+    """A database that looks records up in an SQLite file built from the JSON files. It
+    works like :class:`core.components.db.JSONDatabase`, but its queries are answered by
+    SQLite using the indexes on record names, fields and monster movesets.
+
+    If the SQLite file can't be built, the JSON files are read instead.
+
+    :param path: The directory of the JSON files.
+
+    :type path: String
+
+    **Examples:**
+
+    >>> database = SQLiteDatabase()
+    >>> [m["name"] for m in database.query("monster", ("types", "contains", "water"))]
+    [u'Bigfin', u'Djinnbo']
+
+    """
+    def __init__(self, path="resources/db/"):
+        db.JSONDatabase.__init__(self, path)
+
+        # The connection to the SQLite file, which is opened the first time a table is
+        # needed. False if the JSON files are being used instead.
+        self.connection = None
+        self.connection_lock = threading.Lock()
+
+
+    def table(self, table):
+        view = self.views.get(table)
+        if view is not None:
+            return view
+
+        with self.lock:
+            if self.connection is None:
+                self.connection = connect(self.path, db.TABLES) or False
+
+            if self.connection and table not in self.views:
+                records = SQLiteTable(self, table)
+                self.tables[table] = records
+                self.views[table] = db.TableView(records)
+
+        if not self.connection:
+            return db.JSONDatabase.table(self, table)
+        return self.views[table]
+
+    table.__doc__ = db.JSONDatabase.table.__doc__
+
+
+    def execute(self, sql, parameters=()):
+        """Runs an SQL statement on the SQLite file.
+
+        :param sql: The statement.
+        :param parameters: The values of its "?" placeholders.
+
+        :type sql: String
+        :type parameters: Tuple
+
+        :rtype: List
+        :returns: The rows it returned.
+
+        """
+        with self.connection_lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+
+    def lookup(self, name, table="monster"):
+        records = self.table(table)
+        if not self.connection:
+            return db.JSONDatabase.lookup(self, name, table)
+
+        if name in records:
+            return records[name]
+
+        rows = self.execute("SELECT MIN(id) FROM records WHERE tbl = ? AND name = ?",
+                            (table, name))
+        if rows[0][0] is not None:
+            return records[rows[0][0]]
+
+    lookup.__doc__ = db.JSONDatabase.lookup.__doc__
+
+
+    def query(self, table, *conditions):
+        records = self.table(table)
+        if not self.connection:
+            return db.JSONDatabase.query(self, table, *conditions)
+
+        sql = ["SELECT id FROM records WHERE tbl = ?"]
+        parameters = [table]
+        for field, name, value in conditions:
+            if name == "contains":
+                sql.append("AND id IN (SELECT id FROM fields WHERE tbl = ? AND field = ? "
+                           "AND item = 1 AND value = ?)")
+            elif name in COMPARISONS:
+                sql.append("AND id IN (SELECT id FROM fields WHERE tbl = ? AND field = ? "
+                           "AND item = 0 AND value %s ?)" % COMPARISONS[name])
+            else:
+                raise ValueError("Unknown query operator \"%s\"" % name)
+            parameters += [table, field, value]
+        sql.append("ORDER BY id")
+
+        return [records[row[0]] for row in self.execute(" ".join(sql), parameters)]
+
+    query.__doc__ = db.JSONDatabase.query.__doc__
+
+
+    def learnable_techniques(self, level, monster=None):
+        techniques = self.table("technique")
+        if not self.connection:
+            return db.JSONDatabase.learnable_techniques(self, level, monster)
+
+        sql = "SELECT DISTINCT technique_id FROM moveset WHERE level_learned <= ?"
+        parameters = [level]
+        if monster is not None:
+            record = self.lookup(monster)
+            if record is None:
+                return []
+            sql += " AND monster_id = ?"
+            parameters.append(record["id"])
+
+        rows = self.execute(sql + " ORDER BY technique_id", parameters)
+        return [techniques[row[0]] for row in rows if row[0] in techniques]
+
+    learnable_techniques.__doc__ = db.JSONDatabase.learnable_techniques.__doc__
+
+
+
+def benchmark(count=10000):
+    """Generates a database of monsters and times the same lookups and queries with the
+    JSON backend and with the SQLite backend.
+
+    :param count: The number of monster records to generate.
+
+    :type count: Integer
+
+    :rtype: None
+    :returns: None
+
+    """
+    path = db_compiler.generate(count)
+    try:
+        def lookups(database):
+            for id in range(1, count + 1, 100):
+                database.lookup("Monster %d" % id)
+
+        def queries(database):
+            for type in db_compiler.GENERATED_TYPES:
+                database.query("monster", ("types", "contains", type),
+                               ("speed_base", ">", 50))
+
+        def learnable(database):
+            for level in range(0, 50, 10):
+                database.learnable_techniques(level)
+
+        results = []
+        for database in (db.JSONDatabase(path, bundle=False), SQLiteDatabase(path)):
+            row = [database.__class__.__name__]
+            for function in (lambda: database.table("monster"),
+                             lambda: lookups(database),
+                             lambda: queries(database),
+                             lambda: queries(database),
+                             lambda: learnable(database)):
+                row.append(db_compiler.timed(function)[1])
+            results.append(row)
+
+        print "%d generated monsters, times in ms" % count
+        print "Opening the SQLite backend includes building its file from the JSON files."
+        print "%-16s %10s %10s %12s %12s %12s" % (
+            "Backend", "Open", "Lookups", "Query cold", "Query warm", "Learnable")
+        for row in results:
+            print "%-16s %10.1f %10.1f %12.1f %12.1f %12.1f" % tuple(row)
+    finally:
+        db_compiler.remove(path)
+        if os.path.exists(sqlite_filename(path)):
+            os.remove(sqlite_filename(path))
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "benchmark"
+
+    if sqlite3 is None:
+        print "The sqlite3 module isn't available."
+    elif command == "benchmark":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        benchmark(count)
+    else:
+        print "Usage: python -m core.components.db_sqlite [benchmark [records]]"
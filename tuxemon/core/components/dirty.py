@@ -0,0 +1,189 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.dirty Dirty rectangle tracking for display updates.
+#
+#
+
+import logging
+import pygame
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.dirty successfully imported")
+
+
+class DirtyRects(object):
+    """Keeps track of which parts of the screen changed during a frame so that only those
+    areas need to be sent to the display with pygame.display.update.
+
+    States, menus and UI elements report what they draw each frame with :meth:`track`,
+    along with a signature describing how they look. An element whose position or
+    signature changed since the last frame, or that stopped being drawn, marks its old
+    and new areas as dirty. Anything else that changes the screen, such as scrolling the
+    map or a fullscreen transition, should call :meth:`invalidate` to request a full
+    update.
+
+    :param screen_rect: The rectangle of the display surface.
+    :param threshold: When the dirty area covers more than this fraction of the screen,
+        a full update is done instead.
+
+    :type screen_rect: pygame.Rect
+    :type threshold: Float
+
+    **Examples:**
+
+    >>> dirty_rects = DirtyRects(screen.get_rect())
+    >>> dirty_rects.track("dialog", (20, 500, 300, 100), ("Hello!",))
+    >>> pygame.display.update(dirty_rects.end_frame())
+
+    """
+    def __init__(self, screen_rect, threshold=0.5):
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.threshold = threshold
+
+        # Start with a full update so the first frame is drawn completely.
+        self.full_update = True
+        self.rects = []
+
+        # Tracked elements from the last frame and the current frame.
+        # >>> self.current
+        # {'player': (<rect(608, 328, 80, 160)>, [('down', False)])}
+        self.previous = {}
+        self.current = {}
+
+
+    def add(self, rect):
+        """Marks an area of the screen as changed for this frame.
+
+        :param rect: The area of the screen that changed.
+
+        :type rect: pygame.Rect or Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.rects.append(pygame.Rect(rect))
+
+
+    def invalidate(self):
+        """Requests that the whole screen is updated at the end of this frame.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.full_update = True
+
+
+    def track(self, key, rect, signature=None):
+        """Reports an element that was drawn this frame. If the same key is tracked more
+        than once in a frame, the areas and signatures are combined.
+
+        :param key: A unique, hashable name for the element being drawn.
+        :param rect: The area of the screen the element was drawn to.
+        :param signature: A hashable value that changes whenever the element would look
+            different. If None, the element is considered changed every frame.
+
+        :type key: Any
+        :type rect: pygame.Rect or Tuple
+        :type signature: Any
+
+        :rtype: None
+        :returns: None
+
+        """
+        rect = pygame.Rect(rect)
+
+        if key in self.current:
+            last_rect, signatures = self.current[key]
+            rect = last_rect.union(rect)
+            if signatures is not None and signature is not None:
+                signatures.append(signature)
+            else:
+                signatures = None
+        elif signature is not None:
+            signatures = [signature]
+        else:
+            signatures = None
+
+        self.current[key] = (rect, signatures)
+
+
+    def end_frame(self):
+        """Finishes the current frame and returns the areas of the screen that need to
+        be updated.
+
+        :param: None
+
+        :rtype: List or None
+        :returns: A list of pygame.Rect objects to pass to pygame.display.update, or None
+            if the whole screen should be updated.
+
+        """
+        rects = self.rects
+        full_update = self.full_update
+
+        # Compare what was drawn this frame against the last one.
+        for key, (rect, signatures) in self.current.items():
+            previous = self.previous.get(key)
+            if previous is None:
+                rects.append(rect)
+            elif signatures is None or previous != (rect, signatures):
+                rects.append(rect)
+                rects.append(previous[0])
+
+        # Elements that are no longer drawn leave their old area behind.
+        for key, (rect, signatures) in self.previous.items():
+            if key not in self.current:
+                rects.append(rect)
+
+        self.previous = self.current
+        self.current = {}
+        self.rects = []
+        self.full_update = False
+
+        if full_update:
+            return None
+
+        # Clip the areas to the screen and fall back to a full update if most of the
+        # screen changed anyway.
+        dirty = []
+        area = 0
+        for rect in rects:
+            rect = rect.clip(self.screen_rect)
+            if rect.width and rect.height:
+                dirty.append(rect)
+                area += rect.width * rect.height
+
+        if area > self.screen_rect.width * self.screen_rect.height * self.threshold:
+            return None
+
+        return dirty
@@ -29,6 +29,8 @@
 #
 #
 
+import copy
+import inspect
 import logging
 import os
 import pygame
@@ -36,6 +38,7 @@ import traceback
 import random
 import re
 import pprint
+import sys
 
 from core.components import map
 from core.components import player
@@ -45,18 +48,65 @@ from core.components import db
 from core.components import monster
 from core.components import ai
 from core.components import plugin
+from core.components import profiler
+from core.components.event import arguments
+from core.components.event import metrics
+from core.components.event import scheduler
 
-# Load all the available conditions and actions as plugins.
-condition_plugins = plugin.load_directory("core/components/event/conditions")
-condition_methods = plugin.get_available_methods(condition_plugins)
-action_plugins = plugin.load_directory("core/components/event/actions")
-action_methods = plugin.get_available_methods(action_plugins)
+# Find all the available conditions and actions. Their plugins are imported when a map
+# first uses them.
+condition_methods = plugin.load_methods("core/components/event/conditions")
+action_methods = plugin.load_methods("core/components/event/actions")
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
 logger.debug("components.event successfully imported")
 
 
+def player_tile(game):
+    tile_pos = game.player1.tile_pos
+    return (round(tile_pos[0]), round(tile_pos[1]))
+
+
+def world_npcs(game):
+    npcs = game.state_dict["WORLD"].npcs
+    return (id(npcs), len(npcs))
+
+
+def player_party(game):
+    monsters = game.player1.monsters
+    return (id(monsters), len(monsters))
+
+
+def game_state(game):
+    world = game.state_dict["WORLD"]
+    return (game.state_name, world.battle_transition_in_progress,
+            world.start_battle_transition, world.next)
+
+
+# The inputs that event conditions can declare with core.components.plugin.depends_on. Each
+# one returns a value that changes whenever the input changes.
+INPUTS = {"player_tile": player_tile,
+          "facing": lambda game: game.player1.facing,
+          "variables": lambda game: game.player1.game_variables,
+          "keys": lambda game: game.keys,
+          "npcs": world_npcs,
+          "party": player_party,
+          "game_state": game_state}
+
+# Used to tell a condition that hasn't been checked yet apart from one that returned None.
+UNCHECKED = object()
+
+# The number of conditions to check between each time the conditions of every event are
+# put back in order of their cost and pass rate.
+REORDER_INTERVAL = 1000
+
+# Only every this many checks of each type of condition are timed for reordering, since
+# reading the timer can cost more than a cheap condition. Every check still counts towards
+# the condition's pass rate, and every check is timed while the event metrics are enabled.
+CONDITION_TIMING_INTERVAL = 16
+
+
 class EventEngine(object):
     """A class for the event engine. The event engine checks to see if a group of conditions have
     been met and then executes a set of actions.
@@ -68,10 +118,179 @@ class EventEngine(object):
         self.conditions = condition_methods
         self.actions = action_methods
 
+        # Runs actions that take more than one frame.
+        self.scheduler = scheduler.ActionScheduler()
+
+        # Statistics for finding slow map scripts. Nothing is recorded until enabled.
+        self.metrics = metrics.EventMetrics()
+
+        # The events list the index below was built for.
+        self.indexed_events = None
+        self.indexed_length = 0
+
+        # Events that can't run unless the player is inside a "player_at" area, by tile,
+        # and every other event. Each list holds event indexes in map order.
+        self.spatial_index = {}
+        self.unindexed = []
+        self.candidates = {}
+
+        # Cached condition results by (event index, condition index), and cached results
+        # of whole events whose conditions are all declared. Both are dropped when one of
+        # their inputs changes.
+        self.condition_results = {}
+        self.event_results = {}
+        self.dependents = {}
+        self.event_dependents = {}
+        self.declared_events = set()
+
+        # The last value of each input, to see what changed since the last check.
+        self.input_values = {}
+
+        # State that conditions like "player_moved" keep between checks, by condition id.
+        # A new list is made each time the player enters a map, so nothing is kept from
+        # maps the player has left.
+        # >>> self.condition_state
+        # [None, [240, 160], None]
+        self.condition_state = []
+
+        # How many times each type of condition has been checked, how long the timed checks
+        # took in total, how many checks returned True and how many were timed. These are
+        # kept for the whole game.
+        # >>> self.condition_stats
+        # {'variable_set': [120, 0.00004, 12, 8], 'facing_npc': [40, 0.0002, 1, 3]}
+        self.condition_stats = {}
+        self.checks_since_reorder = 0
+
+        # The order to check each event's conditions in, by event index. Events that aren't
+        # listed check their conditions in map order.
+        self.condition_order = {}
+
+
+    def condition_inputs(self, condition):
+        """Returns the inputs a condition has declared it depends on.
+
+        :param condition: A condition dictionary from a map event.
+
+        :type condition: Dictionary
+
+        :rtype: frozenset or None
+        :returns: The names of the condition's inputs, or None if it has to be checked every
+            time.
+
+        """
+        inputs = self.conditions[condition['type']].get('inputs')
+        if inputs is None:
+            return None
+
+        for name in inputs:
+            if name not in INPUTS:
+                logger.warning("Unknown input \"%s\" for condition %s" % (name, condition['type']))
+                return None
+        return inputs
+
+
+    def build_index(self, events):
+        """Indexes the events of a map so that only the events that could run are checked.
+
+        An event whose conditions start with side effect free conditions followed by an "is
+        player_at" condition can't run while the player is outside of that area, so it is
+        indexed by every tile in the area. Skipping it never skips a condition with side
+        effects, so the events that run are the same as checking every event in order.
+
+        :param events: The list of events from the current map.
+
+        :type events: List
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.indexed_events = events
+        self.indexed_length = len(events)
+        self.spatial_index = {}
+        self.unindexed = []
+        self.candidates = {}
+        self.condition_results = {}
+        self.event_results = {}
+        self.dependents = {}
+        self.event_dependents = {}
+        self.declared_events = set()
+        self.condition_state = [None] * sum(len(e['conds']) for e in events)
+        self.reorder_conditions(events)
+
+        for index, e in enumerate(events):
+            area = None
+            declared = True
+            side_effect_free = True
+
+            for cond_index, cond in enumerate(e['conds']):
+                if not self.conditions[cond['type']].get('side_effect_free'):
+                    side_effect_free = False
+
+                if (area is None and side_effect_free and cond['type'] == 'player_at'
+                        and cond['operator'] == 'is'):
+                    area = cond
+
+                inputs = self.condition_inputs(cond)
+                if inputs is None:
+                    declared = False
+                    continue
+
+                for name in inputs:
+                    self.dependents.setdefault(name, []).append((index, cond_index))
+                    self.event_dependents.setdefault(name, set()).add(index)
+
+            if declared:
+                self.declared_events.add(index)
+
+            if area is None:
+                self.unindexed.append(index)
+                continue
+
+            for x in range(area['x'], area['x'] + area['width']):
+                for y in range(area['y'], area['y'] + area['height']):
+                    self.spatial_index.setdefault((x, y), []).append(index)
+
+        logger.debug("Indexed %d events, %d by player position" % (
+            len(events), len(events) - len(self.unindexed)))
+
+
+    def update_inputs(self, game):
+        """Checks which condition inputs have changed since the last check and forgets any
+        cached results that depend on them.
+
+        :param game: The main game object that contains all the game's variables.
+
+        :type game: core.tools.Control
+
+        :rtype: None
+        :returns: None
+
+        """
+        for name, get_input in INPUTS.items():
+            if name not in self.dependents:
+                continue
+
+            value = get_input(game)
+            if name in self.input_values and value == self.input_values[name]:
+                continue
+
+            # Keep a copy so that changes to a list or dictionary in place are noticed.
+            self.input_values[name] = copy.copy(value)
+            for key in self.dependents[name]:
+                self.condition_results.pop(key, None)
+            for index in self.event_dependents[name]:
+                self.event_results.pop(index, None)
+
 
     def check_conditions(self, game):
         """Checks a list of conditions to see if any of them have been met.
 
+        Events are checked in the same order as the map lists them. Only events that could
+        run from the player's current tile are checked, and conditions that declared their
+        inputs with core.components.plugin.depends_on reuse their last result until one of
+        those inputs changes.
+
         :param game: The main game object that contains all the game's variables.
         :param game.event_conditions: The multi-dimensional list of conditions to check for. See
             :py:func:`core.components.map.Map.loadevents` to see the format of the list.
@@ -84,39 +303,372 @@ class EventEngine(object):
         
         """
 
-        for e in game.events:
-            should_run = True
-            
-            # If any conditions fail, the event should not be run
-            for cond in e['conds']:
-                # Conditions have so-called "operators".  If a condition's operator == "is" then
-                # the condition should be processed as usual.
-                # However, if the condition != "is", the result should be inverted.
-                # The following line implements this.
-                # I am not satisfied with the clarity of this line, so if anyone can express this better,
-                # please change it.
-                check_condition = condition_methods[cond['type']]['method']
-                should_run = (check_condition(game, cond) == (cond['operator'] == 'is'))
-                if not should_run:
-                    break
-            
+        # Index the events whenever we load a new map.
+        events = game.events
+        if events is not self.indexed_events or len(events) != self.indexed_length:
+            self.build_index(events)
+            self.input_values = {}
+
+        self.update_inputs(game)
+
+        # Get the events that could run from the player's tile.
+        tile = player_tile(game)
+        candidates = self.tile_candidates(tile)
+
+        position = 0
+        while position < len(candidates):
+            index = candidates[position]
+            position += 1
+            e = events[index]
+
+            # Don't start an event again while its actions from last time are still running.
+            if self.scheduler.tasks and self.scheduler.running(e):
+                continue
+
+            should_run = self.event_results.get(index)
+            if should_run is None:
+                if self.metrics.enabled:
+                    start = profiler.timer()
+                    should_run = self.check_event(game, index, e)
+                    self.metrics.record_event(self.event_key(e, index),
+                                              profiler.timer() - start, should_run)
+                else:
+                    should_run = self.check_event(game, index, e)
+
+                if index in self.declared_events:
+                    self.event_results[index] = should_run
+
             if should_run:
-                self.execute_action(e['acts'], game)
-                
-        
-    def execute_action(self, action_list, game):
+                self.execute_action(e['acts'], game, e)
+
+                # The actions may have changed what later conditions depend on. If they moved
+                # the player, carry on with the later events that could run from the new tile.
+                self.update_inputs(game)
+                new_tile = player_tile(game)
+                if new_tile != tile:
+                    tile = new_tile
+                    candidates = [i for i in self.tile_candidates(tile) if i > index]
+                    position = 0
+
+        # Every so often, put the conditions that are cheap and likely to fail first.
+        if self.checks_since_reorder >= REORDER_INTERVAL:
+            self.reorder_conditions(events)
+
+
+    def event_key(self, e, index):
+        """Returns the name that an event's statistics are kept under.
+
+        :param e: The event.
+        :param index: The index of the event in the map's list of events.
+
+        :type e: Dictionary
+        :type index: Integer
+
+        :rtype: String
+        :returns: The map's file name and the event's id, such as "bedroom_test.tmx#3".
+
+        """
+        filename = "unknown"
+        if self.current_map is not None:
+            filename = os.path.basename(self.current_map.filename)
+        return "%s#%s" % (filename, e.get('id', index))
+
+
+    def tile_candidates(self, tile):
+        """Returns the events that could run while the player is on a given tile.
+
+        :param tile: The (x, y) position of the player's tile.
+
+        :type tile: Tuple
+
+        :rtype: List
+        :returns: The indexes of the events, in map order.
+
+        """
+        candidates = self.candidates.get(tile)
+        if candidates is None:
+            candidates = sorted(self.unindexed + self.spatial_index.get(tile, []))
+            self.candidates[tile] = candidates
+        return candidates
+
+
+    def check_event(self, game, index, e):
+        """Checks whether all of an event's conditions are met, stopping at the first one that
+        fails. The conditions are checked in the order chosen by :meth:`reorder_conditions`.
+
+        :param game: The main game object that contains all the game's variables.
+        :param index: The index of the event in the map's list of events.
+        :param e: The event to check.
+
+        :type game: core.tools.Control
+        :type index: Integer
+        :type e: Dictionary
+
+        :rtype: Boolean
+        :returns: True if the event's actions should run.
+
+        """
+        conds = e['conds']
+        order = self.condition_order.get(index)
+        if order is None:
+            order = range(len(conds))
+
+        for cond_index in order:
+            cond = conds[cond_index]
+
+            # Conditions have so-called "operators".  If a condition's operator == "is" then
+            # the condition should be processed as usual.
+            # However, if the condition != "is", the result should be inverted.
+            result = self.condition_results.get((index, cond_index), UNCHECKED)
+            if result is UNCHECKED:
+                check_condition = self.conditions[cond['type']]['method']
+                stats = self.condition_stats.get(cond['type'])
+                if self.metrics.enabled or stats is None or \
+                        stats[0] % CONDITION_TIMING_INTERVAL == 0:
+                    start = profiler.timer()
+                    result = check_condition(game, cond)
+                    seconds = profiler.timer() - start
+                    if self.metrics.enabled:
+                        self.metrics.record_condition(cond['type'], seconds, result)
+                else:
+                    result = check_condition(game, cond)
+                    seconds = None
+                self.record_condition(cond['type'], seconds, result)
+
+                if self.conditions[cond['type']].get('inputs') is not None:
+                    self.condition_results[(index, cond_index)] = result
+
+            if not (result == (cond['operator'] == 'is')):
+                return False
+
+        return True
+
+
+    def record_condition(self, type, seconds, result):
+        """Adds a condition check to the statistics of its condition type.
+
+        :param type: The type of condition that was checked.
+        :param seconds: How long the check took, or None if it wasn't timed.
+        :param result: What the condition's method returned.
+
+        :type type: String
+        :type seconds: Float or None
+        :type result: Boolean
+
+        :rtype: None
+        :returns: None
+
+        """
+        stats = self.condition_stats.get(type)
+        if stats is None:
+            stats = self.condition_stats[type] = [0, 0.0, 0, 0]
+
+        stats[0] += 1
+        if seconds is not None:
+            stats[1] += seconds
+            stats[3] += 1
+        if result:
+            stats[2] += 1
+        self.checks_since_reorder += 1
+
+
+    def condition_rank(self, condition, default_cost):
+        """Returns how early a condition should be checked. A condition that is cheap to
+        check and that often fails should come first, since it saves checking the rest of
+        the event's conditions.
+
+        :param condition: A condition dictionary from a map event.
+        :param default_cost: The cost to assume for condition types that haven't been
+            checked yet.
+
+        :type condition: Dictionary
+        :type default_cost: Float
+
+        :rtype: Float
+        :returns: The expected time spent on the condition for each time it fails. Lower
+            ranks are checked first.
+
+        """
+        count, seconds, true_count, timed_count = self.condition_stats.get(
+            condition['type'], (0, 0.0, 0, 0))
+
+        # Start from even odds so that a condition isn't judged on a couple of checks.
+        pass_rate = (true_count + 1.) / (count + 2.)
+        if condition['operator'] != 'is':
+            pass_rate = 1. - pass_rate
+
+        cost = seconds / timed_count if timed_count else default_cost
+        return cost / (1. - pass_rate)
+
+
+    def reorder_conditions(self, events):
+        """Chooses the order to check each event's conditions in from the statistics
+        collected so far.
+
+        Only conditions whose methods are side effect free are moved, and they are never
+        moved past a condition that has side effects. A condition like "player_moved" that
+        updates its state every time it is checked is still checked exactly when it would
+        have been in map order.
+
+        :param events: The list of events from the current map.
+
+        :type events: List
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.condition_order = {}
+        self.checks_since_reorder = 0
+
+        total_timed = sum(stats[3] for stats in self.condition_stats.values())
+        total_seconds = sum(stats[1] for stats in self.condition_stats.values())
+        default_cost = total_seconds / total_timed if total_timed else 0.
+
+        for index, e in enumerate(events):
+            order = []
+            segment = []
+            for cond_index, cond in enumerate(e['conds']):
+                if self.conditions[cond['type']].get('side_effect_free'):
+                    segment.append(cond_index)
+                    continue
+
+                # Conditions with side effects stay where they are.
+                order += self.sort_segment(e['conds'], segment, default_cost)
+                order.append(cond_index)
+                segment = []
+            order += self.sort_segment(e['conds'], segment, default_cost)
+
+            if order != range(len(e['conds'])):
+                self.condition_order[index] = order
+
+
+    def sort_segment(self, conds, segment, default_cost):
+        """Sorts a run of side effect free conditions by their rank. Conditions with the same
+        rank keep their map order.
+
+        :param conds: The event's conditions.
+        :param segment: The indexes of the conditions to sort.
+        :param default_cost: The cost to assume for condition types that haven't been
+            checked yet.
+
+        :type conds: List
+        :type segment: List
+        :type default_cost: Float
+
+        :rtype: List
+        :returns: The sorted condition indexes.
+
+        """
+        return sorted(segment, key=lambda i: self.condition_rank(conds[i], default_cost))
+
+
+    def compile_events(self, events):
+        """Parses the parameters of every condition and action in a map's events with the
+        signatures of their plugin methods. This is done once when a map is loaded, so that
+        a mistake in a map's events is found straight away and the methods don't parse their
+        parameters every time they are called.
+
+        :param events: The events of a map. See :py:func:`core.components.map.Map.load` for
+            the format of the list.
+
+        :type events: List
+
+        :rtype: List
+        :returns: A new list of events. Each event and condition gets an integer "id" that
+            is unique within the map, each condition has its argument values in an "args"
+            tuple, and each action is a (type, parameters, args) tuple.
+
+        **Examples:**
+
+        >>> engine.compile_events(current_map.events)[0]
+        {'acts': [('teleport', 'bedroom_test.tmx,3,3', ('bedroom_test.tmx', 3, 3))],
+         'conds': [{'args': (), 'id': 0, 'operator': 'is', 'parameters': '',
+                    'type': 'player_at', ...}],
+         'id': 0}
+
+        """
+        compiled = []
+        cond_id = 0
+        for event_id, e in enumerate(events):
+            conds = []
+            for cond in e['conds']:
+                cond = dict(cond)
+                cond['id'] = cond_id
+                cond['args'] = arguments.parse(self.conditions, cond['type'],
+                                               cond['parameters'])
+                conds.append(cond)
+                cond_id += 1
+
+            acts = [self.compile_action(action) for action in e['acts']]
+            compiled.append({'id': event_id, 'conds': conds, 'acts': acts})
+
+        return compiled
+
+
+    def compile_action(self, action):
+        """Parses the parameters of a single action.
+
+        :param action: A [type, parameters] list or tuple.
+
+        :type action: List
+
+        :rtype: Tuple
+        :returns: A (type, parameters, args) tuple.
+
+        **Examples:**
+
+        >>> engine.compile_action(("fadeout_music", "1000"))
+        ('fadeout_music', '1000', (1000,))
+
+        """
+        parameters = action[1] if len(action) > 1 else ""
+        return (action[0], parameters,
+                arguments.parse(self.actions, action[0], parameters))
+
+
+    def update(self, game, time_delta):
+        """Resumes any actions that are running over more than one frame. See
+        :class:`core.components.event.scheduler.ActionScheduler`.
+
+        :param game: The main game object that contains all the game's variables.
+        :param time_delta: The game time in seconds since the last frame.
+
+        :type game: core.tools.Control
+        :type time_delta: Float
+
+        :rtype: None
+        :returns: None
+
+        """
+        if self.scheduler.tasks:
+            self.scheduler.update(game, time_delta)
+
+
+    def execute_action(self, action_list, game, key=None):
         """Executes a particular action in a list of actions.
+
+        Actions run one after another. An action whose method is a generator may yield to
+        finish in a later frame, and the actions after it wait until it is done. See
+        :mod:`core.components.event.scheduler` for what actions can yield.
         
         :param action_list: A list of actions fetched from the database. 
         :param game: The main game object that contains all the game's variables.
+        :param key: What started the actions, usually the map event. The event won't be
+            started again while its actions are running.
         
         :type action_list: List
         :type game: core.tools.Control
+        :type key: Object
 
         Here is an example of what an action list might look like:
 
         >>> action_list
-        [(u'teleport', u'example.map,1,1', 1, 1), (u'teleport', u'test.map,4,3', 2, 2)]
+        [('teleport', 'example.map,1,1', ('example.map', 1, 1)),
+         ('teleport', 'test.map,4,3', ('test.map', 4, 3))]
+
+        Actions that haven't been through :meth:`compile_events`, such as ("add_item",
+        "Potion"), have their parameters parsed before they run.
     
         :rtype: None
         :returns: None
@@ -124,16 +676,85 @@ class EventEngine(object):
         """
         
         logger.debug("Executing Action")
+        self.scheduler.start(game, self.run_actions(action_list, game), key)
+
+
+    def run_actions(self, action_list, game):
+        """A generator that runs a list of actions in order, passing on anything that the
+        actions yield to the scheduler.
+
+        :param action_list: A list of actions fetched from the database.
+        :param game: The main game object that contains all the game's variables.
+
+        :type action_list: List
+        :type game: core.tools.Control
+
+        :rtype: Generator
+        :returns: A generator for :class:`core.components.event.scheduler.ActionScheduler`.
+
+        """
 
         # Loop through the list of actions and execute them
         for action in action_list:
             
             # Call the method listed and return the modified event data
+            recording = self.metrics.enabled
+            if recording:
+                start = profiler.timer()
             try:
-                action_methods[action[0]]["method"](game, action)
+                if len(action) < 3:
+                    action = self.compile_action(action)
+                result = action_methods[action[0]]["method"](game, action)
                 #getattr( self.action, str(action[0]))(game, action) 
             except Exception, message:
                 error = 'Error: Action method "%s" not implemented' % str(action[0])
                 logger.error(error)
                 logger.error(message)
                 traceback.print_exc()
+                if recording:
+                    self.metrics.record_action(action[0], profiler.timer() - start, message)
+                continue
+
+            if recording:
+                self.metrics.record_action(action[0], profiler.timer() - start)
+
+            if not inspect.isgenerator(result):
+                continue
+
+            # The action takes more than one frame. Hand whatever it yields to the scheduler
+            # and send the answer back, until it is done.
+            value = None
+            error = None
+            while True:
+                recording = self.metrics.enabled
+                if recording:
+                    start = profiler.timer()
+                try:
+                    if error:
+                        instruction = result.throw(*error)
+                    else:
+                        instruction = result.send(value)
+                except StopIteration:
+                    if recording:
+                        self.metrics.record_action(action[0], profiler.timer() - start,
+                                                   resumed=True)
+                    break
+                except Exception, message:
+                    logger.error('Error: Action method "%s" failed' % str(action[0]))
+                    logger.error(message)
+                    traceback.print_exc()
+                    if recording:
+                        self.metrics.record_action(action[0], profiler.timer() - start,
+                                                   message, resumed=True)
+                    break
+
+                if recording:
+                    self.metrics.record_action(action[0], profiler.timer() - start,
+                                               resumed=True)
+
+                # Errors from Load instructions are raised inside the action.
+                error = None
+                try:
+                    value = yield instruction
+                except Exception:
+                    error = sys.exc_info()
@@ -27,6 +27,8 @@
 import logging
 import random
 from yapsy.IPlugin import IPlugin
+from core.components.event import arguments
+from core.components.event import scheduler
 from core.components import ai
 from core.components import db
 from core.components import monster
@@ -44,9 +46,11 @@ except ImportError:
 
 class Combat(IPlugin):
 
+    @arguments.signature(("npc_id", arguments.integer))
     def start_battle(self, game, action):
         """Start a battle and switch to the combat module. The parameters must contain an NPC id
-        in the NPC database.
+        in the NPC database. The databases are loaded in the background and the NPC's
+        monsters are built one per frame, so starting a battle doesn't stall the game.
             
         :param game: The main game object that contains all the game's variables.
         :param action: The action (tuple) retrieved from the database that contains the action's
@@ -70,18 +74,18 @@ class Combat(IPlugin):
         # Don't start a battle if we don't even have monsters in our party yet.
         if len(game.player1.monsters) < 1:
             logger.warning("Cannot start battle, player has no monsters!")
-            return False
+            return
     
         # Start combat
-        npc_id = int(action[1])
+        npc_id = action[2][0]
             
         # Create an NPC object that will be used as our opponent
         npc = player.Npc()
             
         # Look up the NPC's details from our NPC database
-        npcs = db.JSONDatabase()
-        npcs.load("npc")
-        npc_details = npcs.database['npc'][npc_id]
+        database = db.get_database()
+        npcs = yield scheduler.Load(database.table, "npc")
+        npc_details = npcs[npc_id]
     
         # Set the NPC object with the details fetched from the database.
         npc.name = npc_details['name']
@@ -93,12 +97,11 @@ class Combat(IPlugin):
         npc_party = npc_details['monsters']
     
         # Look up the monster's details
-        monsters = db.JSONDatabase()
-        monsters.load("monster")
+        monsters = yield scheduler.Load(database.table, "monster")
     
         # Look up each monster in the NPC's party
         for npc_monster_details in npc_party:
-            results = monsters.database['monster'][npc_monster_details['monster_id']]
+            results = monsters[npc_monster_details['monster_id']]
     
             # Create a monster object for each monster the NPC has in their party.
             current_monster = monster.Monster()
@@ -128,6 +131,7 @@ class Combat(IPlugin):
             
             # Add our monster to the NPC's party
             npc.monsters.append(current_monster)
+            yield
     
         # Add our players and start combat
         game.state_dict["COMBAT"].players.append(game.player1)
@@ -143,6 +147,7 @@ class Combat(IPlugin):
         mixer.music.play(-1)
 
 
+    @arguments.signature(("encounter_id", arguments.integer))
     def random_encounter(self, game, action):
         """Randomly starts a battle with a monster defined in the "encounter" table in the
         "monster.db" database. The chance that this will start a battle depends on the
@@ -175,18 +180,17 @@ class Combat(IPlugin):
                 return False
     
         # Get the parameters to determine what encounter group we'll look up in the database.
-        encounter_id = int(action[1])
+        encounter_id = action[2][0]
     
-        # Look up the encounter details
-        monsters = db.JSONDatabase()
-        monsters.load("encounter")
-        monsters.load("monster")
+        # Look up the encounter details. The shared database only reads the table from disk
+        # the first time.
+        encounter_table = db.get_database().table("encounter")
     
         # Keep an encounter variable that will let us know if we're going to start a battle.
         encounter = None
     
         # Get all the monsters associated with this encounter.
-        encounters = monsters.database['encounter'][encounter_id]['monsters']
+        encounters = encounter_table[encounter_id]['monsters']
     
         for item in encounters:
             # Perform a roll to see if this monster is going to start a battle.
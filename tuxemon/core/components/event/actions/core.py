@@ -26,6 +26,8 @@
 
 import logging
 from yapsy.IPlugin import IPlugin
+from core.components.event import arguments
+from core.components.event import scheduler
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
@@ -33,6 +35,8 @@ logger = logging.getLogger(__name__)
 
 class Core(IPlugin):
 
+    @arguments.signature(("name", arguments.string), ("value", arguments.string),
+                         separator=":")
     def set_variable(self, game, action):
         """Sets the key in the player.game_variables dictionary.
             
@@ -58,15 +62,14 @@ class Core(IPlugin):
         # Get the player object from the game.
         player = game.player1
     
-        # Split the variable into a key: value pair
-        varlist = action[1].split(":")
-        varkey = str(varlist[0])
-        varvalue = str(varlist[1])
+        # Get the key: value pair to set
+        varkey, varvalue = action[2]
     
         # Append the game_variables dictionary with the key: value pair
         player.game_variables[varkey] = varvalue
     
     
+    @arguments.signature(("text", arguments.string))
     def dialog(self, game, action):
         """Opens a dialog window with text
             
@@ -93,7 +96,7 @@ class Core(IPlugin):
     
         """
     
-        text = str(action[1])
+        text = action[2][0]
         text = text.replace("${{name}}", game.player1.name)
         logger.info("Dialog window opened") 
     
@@ -103,6 +106,7 @@ class Core(IPlugin):
             game.state.dialog_window.text = text
     
     
+    @arguments.signature(("duration", arguments.number), ("power", arguments.integer))
     def rumble(self, game, action):
         """Rumbles available controllers with rumble support
 
@@ -128,8 +132,7 @@ class Core(IPlugin):
     
         """
 
-        duration = float(action[1].split(',')[0])
-        power = int(action[1].split(',')[1])
+        duration, power = action[2]
 
         min_power = 0
         max_power = 24576
@@ -141,3 +144,56 @@ class Core(IPlugin):
 
         magnitude = int((power * 0.01) * max_power)
         game.rumble.rumble(-1, length=duration, magnitude=magnitude)
+
+
+    @arguments.signature(("seconds", arguments.number))
+    def wait(self, game, action):
+        """Waits before running the rest of the event's actions. Other events and the rest of
+        the game carry on while the actions are waiting.
+
+        :param game: The main game object that contains all the game's variables.
+        :param action: The action (tuple) retrieved from the database that contains the action's
+            parameters
+
+        :type game: core.tools.Control
+        :type action: Tuple
+
+        :rtype: Generator
+        :returns: A generator for the action scheduler.
+
+        Valid Parameters: seconds
+
+        **Examples:**
+
+        >>> action
+        ('wait', '1.5', (1.5,))
+
+        """
+        yield scheduler.Wait(action[2][0])
+
+
+    @arguments.signature()
+    def wait_for_dialog(self, game, action):
+        """Waits until the player closes the dialog window before running the rest of the
+        event's actions. Use it after a "dialog" action to show several lines of dialog one
+        after another, or to do something once the player has read the text.
+
+        :param game: The main game object that contains all the game's variables.
+        :param action: The action (tuple) retrieved from the database that contains the action's
+            parameters
+
+        :type game: core.tools.Control
+        :type action: Tuple
+
+        :rtype: Generator
+        :returns: A generator for the action scheduler.
+
+        Valid Parameters: None
+
+        **Examples:**
+
+        >>> action
+        ('wait_for_dialog', '', ())
+
+        """
+        yield scheduler.WaitForDialog()
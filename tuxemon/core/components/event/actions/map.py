@@ -25,17 +25,49 @@
 #
 
 import logging
-import os
 import pygame
 import re
 from yapsy.IPlugin import IPlugin
+from core.components import resources
+from core.components.event import arguments
+from core.components.event import scheduler
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
 
 
+def tile_or_player(value):
+    """Map animations are drawn at either an x tile position or the player's position."""
+    if value == "player":
+        return value
+    return int(value)
+
+
+def load_animation_frames(directory, animation_name):
+    """Loads the frame images of a map animation from disk. This runs on a background
+    thread, so the images are not converted for the display yet.
+
+    :param directory: The directory the animation frames are in.
+    :param animation_name: The name of the animation. Frames are named like "grass.001.png".
+
+    :type directory: String
+    :type animation_name: String
+
+    :rtype: List
+    :returns: The frames as pygame surfaces, sorted by filename.
+
+    """
+    frames = []
+    pattern = animation_name + "\.[0-9].*"
+    for animation_frame in resources.index.files(directory):
+        if re.findall(pattern, animation_frame):
+            frames.append(pygame.image.load(directory + "/" + animation_frame))
+    return frames
+
+
 class Map(IPlugin):
 
+    @arguments.signature(("transition_time", arguments.number))
     def screen_transition(self, game, action):
         """Initiates a screen transition
             
@@ -61,9 +93,10 @@ class Map(IPlugin):
         world = game.state_dict["WORLD"]
         if not world.start_transition or not world.start_transition_back:
             world.start_transition = True
-            world.transition_time = float(action[1])
+            world.transition_time = action[2][0]
     
     
+    @arguments.signature()
     def start_cinema_mode(self, game, action):
         """Starts cinema mode by animating moving black bars to narrow the aspect ratio.
     
@@ -82,6 +115,7 @@ class Map(IPlugin):
             game.state_dict["WORLD"].cinema_state = "turning on"
             
             
+    @arguments.signature()
     def stop_cinema_mode(self, game, action):
         """Stops cinema mode by animating moving black bars to back to the normal aspect ratio.
     
@@ -101,8 +135,13 @@ class Map(IPlugin):
             game.state_dict["WORLD"].cinema_state = "turning off"
     
     
+    @arguments.signature(("animation_name", arguments.string), ("duration", arguments.number),
+                         ("loop", arguments.choice("loop", "noloop")),
+                         ("pos_x", tile_or_player),
+                         ("pos_y", arguments.optional(arguments.integer)))
     def play_map_animation(self, game, action):
-        """Plays a map animation at a given position in the world map.
+        """Plays a map animation at a given position in the world map. The first time an
+        animation is played, its frames are loaded in the background.
     
         :param game: The main game object that contains all the game's variables.
         :param action: The action (tuple) retrieved from the database that contains the action's
@@ -127,40 +166,40 @@ class Map(IPlugin):
     
         # ('play_animation', 'grass,1.5,noloop,player', '1', 6)
         # "position" can be either a (x, y) tile coordinate or "player"
-        parameters = action[1].split(",")
-        animation_name = parameters[0]
-        duration = float(parameters[1])
+        animation_name, duration, loop, pos_x, pos_y = action[2]
         directory = "resources/animations/tileset"
-    
-        if parameters[2] == "loop":
-            loop = True
-        elif parameters[2] == "noloop":
-            loop = False
+        loop = loop == "loop"
     
         # Determine the screen position where to draw the animation.
-        if parameters[3] == "player":
+        if pos_x == "player":
             position = (game.player1.tile_pos[0],
                         game.player1.tile_pos[1])
     
         else:
-            position = (int(parameters[3]), int(parameters[4]))
+            position = (pos_x, pos_y)
     
         # Check to see if this animation has already been loaded.
         # If it has, play the animation using the animation's conductor.
         if animation_name in game.animations:
             game.animations[animation_name]["position"] = position
             game.animations[animation_name]["conductor"].play()
-            return True
+            return
     
-        # Loop through our animation resources and find the animation files based on name.
+        # Find and load the animation files based on name without holding up the game.
+        frames = yield scheduler.Load(load_animation_frames, directory, animation_name)
+
+        # Someone else may have loaded the same animation while we were waiting.
+        if animation_name in game.animations:
+            game.animations[animation_name]["position"] = position
+            game.animations[animation_name]["conductor"].play()
+            return
+
         scale = game.state_dict["WORLD"].scale
         images_and_durations = []
-        for animation_frame in os.listdir(directory):
-            pattern = animation_name + "\.[0-9].*"
-            if re.findall(pattern, animation_frame):
-                frame = pygame.image.load(directory + "/" + animation_frame).convert_alpha()
-                frame = pygame.transform.scale(frame, (frame.get_width() * scale, frame.get_height() * scale))
-                images_and_durations.append((frame, duration))
+        for frame in frames:
+            frame = frame.convert_alpha()
+            frame = pygame.transform.scale(frame, (frame.get_width() * scale, frame.get_height() * scale))
+            images_and_durations.append((frame, duration))
     
         # Scale the animations based on our game's scale: game.state_dict["WORLD"].scale
     
@@ -25,12 +25,16 @@
 #
 
 from yapsy.IPlugin import IPlugin
+from core.components.event import arguments
 from core.components import ai
 from core.components import player
 
 
 class Npc(IPlugin):
 
+    @arguments.signature(("name", arguments.string), ("tile_pos_x", arguments.integer),
+                         ("tile_pos_y", arguments.integer), ("animations", arguments.string),
+                         ("behavior", arguments.string))
     def create_npc(self, game, action):
         """Creates an NPC object and adds it to the game's current list of NPC's.
     
@@ -57,12 +61,7 @@ class Npc(IPlugin):
         world = game.state_dict["WORLD"]
     
         # Get the npc's parameters from the action
-        parameters = action[1].split(",")
-        name = str(parameters[0])
-        tile_pos_x = int(parameters[1])
-        tile_pos_y = int(parameters[2])
-        animations = str(parameters[3])
-        behavior = str(parameters[4])
+        name, tile_pos_x, tile_pos_y, animations, behavior = action[2]
     
         # Create a new NPC object
         npc = player.Npc(sprite_name=animations, name=name)
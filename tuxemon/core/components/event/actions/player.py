@@ -28,9 +28,9 @@ print "TRYING THIS SHIT"
 import logging
 import pygame
 from yapsy.IPlugin import IPlugin
+from core.components.event import arguments
 from core.components import item
 from core.components import monster
-from core.components.map import Map
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
@@ -38,6 +38,8 @@ logger = logging.getLogger(__name__)
 
 class Player(IPlugin):
 
+    @arguments.signature(("map_name", arguments.string), ("coordinate_x", arguments.integer),
+                         ("coordinate_y", arguments.integer))
     def teleport(self, game, action):
         """Teleport the player to a particular map and coordinates
         
@@ -65,10 +67,7 @@ class Player(IPlugin):
         world = game.state_dict["WORLD"]
     
         # Get the teleport parameters for the position x,y and the map to load.
-        parameters = action[1].split(",")
-        mapname = str(parameters[0])
-        position_x = int(parameters[1])
-        position_y = int(parameters[2])
+        mapname, position_x, position_y = action[2]
     
         # If we're doing a screen transition with this teleport, set the map name that we'll
         # load during the apex of the transition.
@@ -88,43 +87,19 @@ class Player(IPlugin):
             world.global_x = player.position[0] - (position_x * player.tile_size[0])
             world.global_y = player.position[1] - (position_y * player.tile_size[1]) + player.tile_size[1]
     
-            ### THIS NEEDS TO BE MOVED IN ITS OWN FUNCTION AND IS DUPLICATED IN THE WORLD STATE ###
             if "resources/maps/" + mapname != world.current_map.filename:
-                world.current_map = Map(
-                    "resources/maps/" + mapname)
-                world.event_engine.current_map = Map(
-                    "resources/maps/" + mapname)
-                world.tiles, world.collision_map, world.map_size = world.current_map.loadfile(
-                    world.tile_size)
-                world.game.events = world.current_map.events
+                world.load_map(mapname)
 
                 # Clear out any existing NPCs
                 world.npcs = []
 
-                # Scale the loaded tiles if enabled
-                if world.scale > 1:
-                    x_pos = 0        # Here we need to keep track of the x index of the list
-                    # Loop through each row in the map. Each row is a list of
-                    # Tile objects in that row.
-                    for row in world.tiles:
-                        y_pos = 0       # Here we need to keep track of the y index of the list within the row
-                        # Now loop through each tile in the row and scale it
-                        # accordingly.
-                        for column in row:
-                            if column:
-                                layer_pos = 0
-                                for tile in column:
-                                    tile["surface"] = pygame.transform.scale(
-                                        tile["surface"], (world.tile_size[0], world.tile_size[1]))
-                                    world.tiles[x_pos][y_pos][layer_pos] = tile
-                                    layer_pos += 1
-                            y_pos += 1
-                        x_pos += 1
-
         # Stop the player's movement so they don't continue their move after they teleported.
         player.moving = False
     
     
+    @arguments.signature(("map_name", arguments.string), ("coordinate_x", arguments.integer),
+                         ("coordinate_y", arguments.integer),
+                         ("transition_time", arguments.number))
     def transition_teleport(self, game, action):
         """Combines the "teleport" and "screen_transition" actions to perform a teleport with a
         screen transition. Useful for allowing the player to go to different maps.
@@ -149,25 +124,22 @@ class Player(IPlugin):
         """
             
         # Get the teleport parameters for the position x,y and the map to load.
-        parameters = action[1].split(",")
-        mapname = parameters[0]
-        position_x = parameters[1]
-        position_y = parameters[2]
-        transition_time = parameters[3]
+        mapname, position_x, position_y, transition_time = action[2]
             
         # Start the screen transition
         from core.components.event.actions.map import Map as MapAction
         map_action = MapAction()
         screen_transition = map_action.screen_transition
-        transition_action = (action[0], transition_time)
+        transition_action = (action[0], str(transition_time), (transition_time,))
         screen_transition(game, transition_action)
             
         # Start the teleport. The teleport action will notice a screen transition in progress,
         # and wait until it is done before teleporting.
-        teleport_action = (action[0], action[1])
-        self.teleport(game, action)
+        teleport_action = (action[0], action[1], (mapname, position_x, position_y))
+        self.teleport(game, teleport_action)
     
     
+    @arguments.signature(("monster_name", arguments.string), ("level", arguments.integer))
     def add_monster(self, game, action):
         """Adds a monster to the current player's party if there is room. The action parameter 
         must contain a monster name to look up in the monster database.
@@ -223,16 +195,15 @@ class Player(IPlugin):
     
         """
     
-        parameters = action[1].split(",")
-        monster_name = parameters[0]
-        monster_level = parameters[1]
+        monster_name, monster_level = action[2]
         current_monster = monster.Monster()
         current_monster.load_from_db(monster_name)
-        current_monster.set_level(int(monster_level))
+        current_monster.set_level(monster_level)
     
         game.player1.add_monster(current_monster)
     
     
+    @arguments.signature(("item_name", arguments.string))
     def add_item(self, game, action):
         """Adds an item to the current player's inventory. The action parameter must contain an
         item name to look up in the item database.
@@ -257,7 +228,7 @@ class Player(IPlugin):
         """
     
         player = game.player1
-        item_to_add = item.Item(action[1])
+        item_to_add = item.Item(action[2][0])
             
         # If the item already exists in the player's inventory, add to its quantity, otherwise
         # just add the item.
@@ -267,6 +238,7 @@ class Player(IPlugin):
             player.inventory[item_to_add.name] = {'item': item_to_add, 'quantity': 1}
     
     
+    @arguments.signature(("direction", arguments.direction))
     def player_face(self, game, action):
         """Makes the player face a certain direction.
     
@@ -286,7 +258,7 @@ class Player(IPlugin):
         """
     
         # Get the parameters to determine what direction the player will face.
-        parameters = action[1]
+        parameters = action[2][0]
     
         # If we're doing a transition, only change the player's facing when we've reached the apex
         # of the transition.
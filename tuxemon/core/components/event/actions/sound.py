@@ -26,6 +26,7 @@
 
 import logging
 from yapsy.IPlugin import IPlugin
+from core.components.event import arguments
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
@@ -39,6 +40,7 @@ except ImportError:
 
 class Sound(IPlugin):
 
+    @arguments.signature(("filename", arguments.string))
     def play_sound(self, game, action):
         """Plays a sound from "resources/sounds/"
             
@@ -61,11 +63,12 @@ class Sound(IPlugin):
     
         """ 
             
-        filename = str(action[1])
+        filename = action[2][0]
         sound = mixer.Sound("resources/sounds/" + filename)
         sound.play()
         
     
+    @arguments.signature(("filename", arguments.string))
     def play_music(self, game, action):
         """Plays a music file from "resources/music/"
             
@@ -88,7 +91,7 @@ class Sound(IPlugin):
     
         """
     
-        filename = str(action[1])
+        filename = action[2][0]
         mixer.music.load("resources/music/" + filename)
         mixer.music.play(-1)
     
@@ -97,6 +100,7 @@ class Sound(IPlugin):
         game.current_music["song"] = filename
         
         
+    @arguments.signature()
     def pause_music(self, game, action):
         """Pauses the current music playback
             
@@ -126,6 +130,7 @@ class Sound(IPlugin):
             logger.warning("Music cannot be paused, none is playing.")
     
     
+    @arguments.signature(("time_milliseconds", arguments.integer))
     def fadeout_music(self, game, action):
         """Fades out the music over a set amount of time in milliseconds
             
@@ -148,7 +153,7 @@ class Sound(IPlugin):
     
         """
     
-        time = int(action[1])
+        time = action[2][0]
         mixer.music.fadeout(time)
         if game.current_music["song"]:
             game.current_music["status"] = "stopped"
@@ -0,0 +1,251 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.event.arguments Typed event condition and action arguments.
+#
+#
+
+import logging
+
+import pygame
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.event.arguments successfully imported")
+
+
+class ArgumentError(ValueError):
+    """Raised when the parameters of a condition or action in a map don't match what its
+    plugin method expects.
+
+    """
+    pass
+
+
+# Argument types. Each one takes the parameter text from the map and returns its value,
+# raising a ValueError if the text isn't valid.
+def string(value):
+    return str(value)
+
+
+def integer(value):
+    return int(value)
+
+
+def number(value):
+    return float(value)
+
+
+def key(value):
+    """Converts the name of a pygame key, such as "K_RETURN", to its key code."""
+    code = getattr(pygame, str(value), None)
+    if not str(value).startswith("K_") or not isinstance(code, int):
+        raise ValueError("unknown key \"%s\"" % value)
+    return code
+
+
+def choice(*values):
+    """Returns an argument type that only accepts one of the given words.
+
+    :param values: The accepted words.
+
+    :type values: String
+
+    :rtype: Function
+    :returns: The argument type.
+
+    **Examples:**
+
+    >>> direction = choice("up", "down", "left", "right")
+    >>> direction("up")
+    'up'
+
+    """
+    def convert(value):
+        if value not in values:
+            raise ValueError("expected one of %s, got \"%s\"" % (", ".join(values), value))
+        return str(value)
+    convert.__name__ = "choice"
+    return convert
+
+
+# The directions a character can face.
+direction = choice("up", "down", "left", "right")
+
+
+def optional(convert, default=None):
+    """Returns an argument type for a trailing argument that may be left out of the map.
+
+    :param convert: The argument type to use when the argument is given.
+    :param default: The value to use when it isn't.
+
+    :type convert: Function
+    :type default: Object
+
+    :rtype: Function
+    :returns: The argument type.
+
+    """
+    def convert_optional(value):
+        return convert(value)
+    convert_optional.__name__ = "optional"
+    convert_optional.optional = True
+    convert_optional.default = default
+    return convert_optional
+
+
+class Signature(object):
+    """The names and types of the arguments a condition or action takes, in the order they
+    are written in the map. The map's parameter text is split on the separator, and the last
+    argument gets the rest of the text, so text like dialog can contain the separator.
+
+    :param arguments: (name, type) tuples, where type is one of the argument types in this
+        module or any function that converts a string.
+    :param separator: The character between arguments in the map.
+
+    :type arguments: Tuple
+    :type separator: String
+
+    **Examples:**
+
+    >>> signature = Signature((("check", choice("equals", "less_than")), ("number", integer)))
+    >>> signature.parse("less_than,2")
+    ('less_than', 2)
+
+    """
+    def __init__(self, arguments, separator=","):
+        self.arguments = tuple(arguments)
+        self.separator = separator
+        self.required = len([a for a in self.arguments
+                             if not getattr(a[1], "optional", False)])
+
+
+    def parse(self, text):
+        """Parses the parameter text of a condition or action.
+
+        :param text: The parameters as written in the map.
+
+        :type text: String
+
+        :rtype: Tuple
+        :returns: The converted argument values.
+
+        """
+        text = text or ""
+        if not self.arguments:
+            if text.strip():
+                raise ArgumentError("takes no parameters, got \"%s\"" % text)
+            return ()
+
+        words = text.split(self.separator, len(self.arguments) - 1) if text else []
+        if len(words) < self.required:
+            raise ArgumentError("expects %s, got \"%s\"" % (self.describe(), text))
+
+        values = []
+        for index, (name, convert) in enumerate(self.arguments):
+            if index >= len(words):
+                values.append(convert.default)
+                continue
+
+            try:
+                values.append(convert(words[index].strip()))
+            except ValueError as e:
+                raise ArgumentError("bad value for \"%s\": %s" % (name, e))
+
+        return tuple(values)
+
+
+    def describe(self):
+        """Returns how the arguments are written in a map, for error messages.
+
+        :param: None
+
+        :rtype: String
+        :returns: The argument names joined by the separator, such as "check,number".
+
+        """
+        return self.separator.join(name for name, convert in self.arguments)
+
+
+
+def signature(*arguments, **options):
+    """A decorator for event condition and action methods that declares the arguments they
+    take. The event engine parses every condition and action in a map against its method's
+    signature when the map is loaded, and the methods read the values from the condition's
+    "args" or the action's third item instead of parsing the text themselves.
+
+    :param arguments: (name, type) tuples in the order they are written in the map.
+    :param separator: The character between arguments. Defaults to ",".
+
+    :type arguments: Tuple
+    :type separator: String
+
+    :rtype: Function
+    :returns: A decorator that marks the method.
+
+    **Examples:**
+
+    >>> class Player(IPlugin):
+    ...     @arguments.signature(("map_name", arguments.string), ("x", arguments.integer),
+    ...                          ("y", arguments.integer))
+    ...     def teleport(self, game, action):
+    ...         mapname, position_x, position_y = action[2]
+    """
+    parsed = Signature(arguments, options.get("separator", ","))
+    def decorator(method):
+        method.signature = parsed
+        return method
+    return decorator
+
+
+def parse(methods, type, text):
+    """Parses the parameters of a condition or action with its method's signature.
+
+    :param methods: The condition or action methods from core.components.plugin.
+    :param type: The name of the condition or action.
+    :param text: The parameters as written in the map.
+
+    :type methods: Dictionary
+    :type type: String
+    :type text: String
+
+    :rtype: Tuple
+    :returns: The argument values. Methods without a signature get the text as their only
+        argument.
+
+    """
+    if type not in methods:
+        raise ArgumentError("\"%s\" is not a known condition or action" % type)
+
+    parsed = methods[type].get("signature")
+    if parsed is None:
+        return (text,)
+
+    try:
+        return parsed.parse(text)
+    except ArgumentError as e:
+        raise ArgumentError("%s %s" % (type, e))
@@ -25,10 +25,14 @@
 #
 
 from yapsy.IPlugin import IPlugin
+from core.components import plugin
+from core.components.event import arguments
 
 
 class Combat(IPlugin):
 
+    @plugin.depends_on("game_state")
+    @arguments.signature()
     def combat_started(self, game, condition):
         """Checks to see if combat has been started or not.
             
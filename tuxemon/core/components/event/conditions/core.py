@@ -26,10 +26,14 @@
 
 import pygame
 from yapsy.IPlugin import IPlugin
+from core.components import plugin
+from core.components.event import arguments
 
 
 class Core(IPlugin):
 
+    @plugin.depends_on()
+    @arguments.signature()
     def true(self, game, condition):
         """This function always returns true unless the operator is set to "is_not"
     
@@ -48,6 +52,8 @@ class Core(IPlugin):
         return True
     
     
+    @plugin.depends_on("keys")
+    @arguments.signature(("button", arguments.key))
     def button_pressed(self, game, condition):
         """Checks to see if a particular key was pressed
             
@@ -78,14 +84,17 @@ class Core(IPlugin):
     
         # Get the keys pressed from the game.
         keys_pressed = game.keys
-        button = str(condition["parameters"])
+        button = condition["args"][0]
     
-        if keys_pressed[getattr(pygame, button)]:
+        if keys_pressed[button]:
             return True
         else:
             return False
     
     
+    @plugin.depends_on("variables")
+    @arguments.signature(("name", arguments.string), ("value", arguments.string),
+                         separator=":")
     def variable_set(self, game, condition):
         """Checks to see if a player game variable has been set. This will look for a particular
         key in the player.game_variables dictionary and see if it exists. If it exists, it will 
@@ -122,10 +131,7 @@ class Core(IPlugin):
         # Loop through the player's game variables to see if they have a value that is set.
         for key, value in player.game_variables.items():
     
-            # Split the string by ":" into a list
-            varlist = condition["parameters"].split(":")
-            varkey = varlist[0]
-            varvalue = varlist[1]
+            varkey, varvalue = condition["args"]
     
             # If the variable is set in the game variables, then we've met the condition.
             if (varkey == key) and (varvalue == value):
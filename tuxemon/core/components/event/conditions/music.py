@@ -25,6 +25,8 @@
 #
 
 from yapsy.IPlugin import IPlugin
+from core.components import plugin
+from core.components.event import arguments
 
 # Import the android mixer if on the android platform
 try:
@@ -35,6 +37,8 @@ except ImportError:
 
 class Music(IPlugin):
 
+    @plugin.side_effect_free
+    @arguments.signature(("filename", arguments.string))
     def music_playing(self, game, condition):
         """Checks to see if a particular piece of music is playing or not.
     
@@ -68,7 +72,7 @@ class Music(IPlugin):
                 game.state_name == "COMBAT" or game.state.done):
             return True
     
-        if game.current_music["song"] == condition["parameters"] and mixer.music.get_busy():
+        if game.current_music["song"] == condition["args"][0] and mixer.music.get_busy():
             return True
         else:
             return False
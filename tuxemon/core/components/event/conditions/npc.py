@@ -26,6 +26,8 @@
 
 import logging
 from yapsy.IPlugin import IPlugin
+from core.components import plugin
+from core.components.event import arguments
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
@@ -33,6 +35,8 @@ logger = logging.getLogger(__name__)
 
 class Npc(IPlugin):
 
+    @plugin.depends_on("npcs")
+    @arguments.signature(("npc_name", arguments.string))
     def npc_exists(self, game, condition):
         """Checks to see if a particular NPC object exists in the current list of NPCs.
             
@@ -63,12 +67,14 @@ class Npc(IPlugin):
     
         # Loop through the NPC list and see if the name matches any in the list
         for npc in game.state_dict["WORLD"].npcs:
-            if npc.name == condition["parameters"]:
+            if npc.name == condition["args"][0]:
                 return True
     
         return False
     
     
+    @plugin.side_effect_free
+    @arguments.signature(("npc_name", arguments.string))
     def facing_npc(self, game, condition):
         """Checks to see the player is next to and facing a particular NPC
     
@@ -97,8 +103,9 @@ class Npc(IPlugin):
     
         """
     
-        npc_name = condition["parameters"]
+        npc_name = condition["args"][0]
         npc_location = None
+        npc = None
     
         # First, find the NPC by name
         for item in game.state_dict["WORLD"].npcs:
@@ -26,6 +26,8 @@
 
 import logging
 from yapsy.IPlugin import IPlugin
+from core.components import plugin
+from core.components.event import arguments
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
@@ -33,6 +35,9 @@ logger = logging.getLogger(__name__)
 
 class Player(IPlugin):
 
+    @plugin.depends_on("player_tile")
+    @arguments.signature(("x", arguments.optional(arguments.integer)),
+                         ("y", arguments.optional(arguments.integer)))
     def player_at(self, game, condition):
         """Checks to see if the player is at a current position on the map.
     
@@ -81,6 +86,8 @@ class Player(IPlugin):
             return False
     
     
+    @plugin.depends_on("facing")
+    @arguments.signature(("direction", arguments.direction))
     def player_facing(self, game, condition):
         """Checks to see where the player is facing
     
@@ -111,7 +118,7 @@ class Player(IPlugin):
     
         # Get the player object from the game.
         player = game.player1
-        facing = condition["parameters"]
+        facing = condition["args"][0]
     
         if player.facing == facing:
             return True
@@ -119,6 +126,7 @@ class Player(IPlugin):
             return False
     
     
+    @arguments.signature()
     def player_moved(self, game, condition):
         """Checks to see the player has just moved into this tile. Using this condition will
         prevent a condition like "player_at" from constantly being true every single frame.
@@ -148,23 +156,23 @@ class Player(IPlugin):
     
         """
     
-        # Create a dictionary that will hold our move destinations.
-        if 'move_destination' not in game.event_persist:
-            game.event_persist['move_destination'] = {}
-    
-        if str(condition) not in game.event_persist['move_destination']:
-            game.event_persist['move_destination'][str(condition)] = game.player1.move_destination
+        # Get the move destination from the last time this condition was checked. The
+        # first check on a map only remembers where the player is going.
+        condition_state = game.event_engine.condition_state
+        last_destination = condition_state[condition['id']]
+        if last_destination is None:
+            last_destination = game.player1.move_destination
     
         # Check to see if the player's "move destination" has changed since the last
         # frame. If it has, WE'RE MOVING!
         moved = False
-        if game.player1.move_destination == game.event_persist['move_destination'][str(condition)]:
+        if game.player1.move_destination == last_destination:
             moved = False
         else:
             moved = True
     
         # Update the current player's last move destination.
-        game.event_persist['move_destination'][str(condition)] = game.player1.move_destination
+        condition_state[condition['id']] = game.player1.move_destination
     
         # Check for "is" or "is_not" in the condition.
         if moved:
@@ -173,6 +181,9 @@ class Player(IPlugin):
             return False
     
     
+    @plugin.depends_on("party")
+    @arguments.signature(("check", arguments.choice("equals", "less_than", "greater_than")),
+                         ("party_size", arguments.integer))
     def party_size(self, game, condition):
         """Perform various checks about the player's party size. With this condition you can see if
         the player's party is less than, greater than, or equal to then number you specify.
@@ -204,9 +215,7 @@ class Player(IPlugin):
     
         """
     
-        parameters = condition['parameters'].split(',')
-        check = str(parameters[0])
-        number = int(parameters[1])
+        check, number = condition['args']
         party_size = len(game.player1.monsters)
     
         # Check to see if the player's party size equals this number.
@@ -0,0 +1,248 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.event.metrics Event engine statistics.
+#
+#
+
+import collections
+import json
+import logging
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.event.metrics successfully imported")
+
+# Where the statistics are written when the game exits.
+METRICS_FILE = "event_metrics.json"
+
+
+class EventMetrics(object):
+    """Counts how often the event engine checks each type of condition and each map event,
+    and runs each type of action, along with how long it spent doing so. This shows which
+    map scripts are costing the most frame time.
+
+    The event engine only records anything while the metrics are enabled, and checks the
+    "enabled" attribute before it even reads the clock, so leaving them disabled costs
+    next to nothing.
+
+    :param enabled: Whether to start recording straight away.
+
+    :type enabled: Boolean
+
+    **Examples:**
+
+    >>> metrics = game.event_engine.metrics
+    >>> metrics.enabled = True
+    >>> metrics.summary()["conditions"]["player_at"]
+    {'checks': 5400, 'false': 5388, 'mean_ms': 0.003, 'total_ms': 16.2, 'true': 12}
+
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+
+    def reset(self):
+        """Forgets everything that has been recorded.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        # [checks, times True, seconds] by condition type.
+        self.conditions = {}
+
+        # [checks, runs, seconds] by map event, as "map file#event id".
+        self.events = {}
+
+        # [runs, errors, seconds] by action type.
+        self.actions = {}
+
+        # The most recent action errors, as (action type, message) tuples.
+        self.errors = collections.deque(maxlen=20)
+
+
+    def record_condition(self, type, seconds, result):
+        """Records a single condition check.
+
+        :param type: The type of condition.
+        :param seconds: How long the check took.
+        :param result: What the condition's method returned.
+
+        :type type: String
+        :type seconds: Float
+        :type result: Boolean
+
+        :rtype: None
+        :returns: None
+
+        """
+        stats = self.conditions.get(type)
+        if stats is None:
+            stats = self.conditions[type] = [0, 0, 0.0]
+        stats[0] += 1
+        if result:
+            stats[1] += 1
+        stats[2] += seconds
+
+
+    def record_event(self, key, seconds, ran):
+        """Records the check of all of a map event's conditions.
+
+        :param key: The map event, as "map file#event id".
+        :param seconds: How long checking the event's conditions took.
+        :param ran: Whether the event's actions were started.
+
+        :type key: String
+        :type seconds: Float
+        :type ran: Boolean
+
+        :rtype: None
+        :returns: None
+
+        """
+        stats = self.events.get(key)
+        if stats is None:
+            stats = self.events[key] = [0, 0, 0.0]
+        stats[0] += 1
+        if ran:
+            stats[1] += 1
+        stats[2] += seconds
+
+
+    def record_action(self, type, seconds, error=None, resumed=False):
+        """Records one run of an action. Actions that take more than one frame also record
+        the time taken each time they are resumed.
+
+        :param type: The type of action.
+        :param seconds: How long the action ran for.
+        :param error: The exception the action raised, if any.
+        :param resumed: True if this was an action resuming rather than a new run.
+
+        :type type: String
+        :type seconds: Float
+        :type error: Exception
+        :type resumed: Boolean
+
+        :rtype: None
+        :returns: None
+
+        """
+        stats = self.actions.get(type)
+        if stats is None:
+            stats = self.actions[type] = [0, 0, 0.0]
+        if not resumed:
+            stats[0] += 1
+        stats[2] += seconds
+        if error is not None:
+            stats[1] += 1
+            self.errors.append((type, "%s: %s" % (error.__class__.__name__, error)))
+
+
+    def summary(self):
+        """Returns everything that has been recorded, with times in milliseconds.
+
+        :param: None
+
+        :rtype: Dictionary
+        :returns: The "conditions", "events" and "actions" figures by name, and the most
+            recent action "errors".
+
+        """
+        conditions = {}
+        for type, (checks, true, seconds) in self.conditions.items():
+            conditions[type] = {"checks": checks, "true": true, "false": checks - true,
+                                "total_ms": seconds * 1000.,
+                                "mean_ms": seconds * 1000. / checks}
+
+        events = {}
+        for key, (checks, runs, seconds) in self.events.items():
+            events[key] = {"checks": checks, "runs": runs,
+                           "total_ms": seconds * 1000.,
+                           "mean_ms": seconds * 1000. / checks}
+
+        actions = {}
+        for type, (runs, errors, seconds) in self.actions.items():
+            actions[type] = {"runs": runs, "errors": errors,
+                             "total_ms": seconds * 1000.,
+                             "mean_ms": seconds * 1000. / max(runs, 1)}
+
+        return {"conditions": conditions,
+                "events": events,
+                "actions": actions,
+                "errors": ["%s - %s" % error for error in self.errors]}
+
+
+    def report(self, limit=10):
+        """Formats the figures as a text table, with the costliest entries first.
+
+        :param limit: The most rows to show in each section.
+
+        :type limit: Integer
+
+        :rtype: String
+        :returns: The table.
+
+        """
+        summary = self.summary()
+        lines = []
+        for section, count_name in (("conditions", "checks"), ("events", "checks"),
+                                    ("actions", "runs")):
+            rows = sorted(summary[section].items(), key=lambda item: -item[1]["total_ms"])
+            lines.append("%-32s %8s %10s %10s" % (section, count_name, "total ms", "mean ms"))
+            for name, stats in rows[:limit]:
+                lines.append("%-32s %8d %10.2f %10.4f" % (
+                    name[:32], stats[count_name], stats["total_ms"], stats["mean_ms"]))
+            lines.append("")
+
+        if summary["errors"]:
+            lines.append("recent action errors")
+            lines += summary["errors"]
+
+        return "\n".join(lines)
+
+
+    def dump(self, filename=METRICS_FILE):
+        """Writes the figures to a JSON file.
+
+        :param filename: The file to write to.
+
+        :type filename: String
+
+        :rtype: None
+        :returns: None
+
+        """
+        try:
+            with open(filename, "w") as metrics_file:
+                json.dump(self.summary(), metrics_file, indent=4, sort_keys=True)
+            logger.info("Wrote event metrics to " + filename)
+        except (IOError, OSError) as e:
+            logger.warning("Unable to write event metrics to " + filename + ": " + str(e))
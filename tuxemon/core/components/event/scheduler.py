@@ -0,0 +1,331 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.event.scheduler Runs event actions over several frames.
+#
+#
+
+import logging
+import sys
+import threading
+import traceback
+
+from core.components import profiler
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.event.scheduler successfully imported")
+
+
+class Wait(object):
+    """Yielded by an action to pause it for a number of seconds of game time.
+
+    :param seconds: How long to wait.
+
+    :type seconds: Float
+
+    **Examples:**
+
+    >>> def shake_screen(self, game, action):
+    ...     game.state_dict["WORLD"].shake = True
+    ...     yield scheduler.Wait(0.5)
+    ...     game.state_dict["WORLD"].shake = False
+
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.until = None
+
+
+    def start(self, scheduler, game):
+        self.until = scheduler.time + self.seconds
+
+
+    def ready(self, scheduler, game):
+        return scheduler.time >= self.until
+
+
+    def result(self):
+        return None
+
+
+
+class WaitForDialog(object):
+    """Yielded by an action to pause it until the player closes the dialog window.
+
+    **Examples:**
+
+    >>> def greet(self, game, action):
+    ...     game.state.dialog_window.text = "Hello!"
+    ...     game.state.dialog_window.visible = True
+    ...     yield scheduler.WaitForDialog()
+
+    """
+    def start(self, scheduler, game):
+        pass
+
+
+    def ready(self, scheduler, game):
+        dialog_window = getattr(game.state, "dialog_window", None)
+        return dialog_window is None or not dialog_window.visible
+
+
+    def result(self):
+        return None
+
+
+
+class Load(object):
+    """Yielded by an action to run a function on a background thread, such as loading
+    images or a database from disk. The action is resumed with the function's return value
+    once it is done, or the function's exception is raised inside the action.
+
+    Functions run this way must not touch the display, so images should be converted with
+    convert_alpha after the action is resumed.
+
+    :param function: The function to run.
+    :param args: The arguments to pass to it.
+
+    :type function: Function
+    :type args: Tuple
+
+    **Examples:**
+
+    >>> def show_map(self, game, action):
+    ...     image = yield scheduler.Load(pygame.image.load, "resources/gfx/map.png")
+    ...     game.state.map_image = image.convert_alpha()
+
+    """
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+        self.done = threading.Event()
+        self.value = None
+        self.exc_info = None
+
+
+    def start(self, scheduler, game):
+        thread = threading.Thread(target=self.run, name="ActionLoad")
+        thread.daemon = True
+        thread.start()
+
+
+    def run(self):
+        try:
+            self.value = self.function(*self.args)
+        except Exception:
+            self.exc_info = sys.exc_info()
+        finally:
+            self.done.set()
+
+
+    def ready(self, scheduler, game):
+        return self.done.is_set()
+
+
+    def result(self):
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.value
+
+
+
+class Task(object):
+    """A running list of actions.
+
+    :param generator: The generator that runs the actions.
+    :param key: What started the actions, such as a map event.
+
+    :type generator: Generator
+    :type key: Object
+
+    """
+    def __init__(self, generator, key):
+        self.generator = generator
+        self.key = key
+        self.instruction = None
+
+
+
+class ActionScheduler(object):
+    """Resumes event actions that run over more than one frame.
+
+    Actions are plugin methods, and an action that needs more than one frame is written as a
+    generator. Each time it yields, the scheduler puts it aside until it can carry on. It can
+    yield None to carry on as soon as there is time, or one of the instructions in this
+    module to wait for something: :class:`Wait`, :class:`WaitForDialog` or :class:`Load`.
+
+    Each frame the scheduler resumes waiting actions until it has used up its time budget,
+    so a long sequence of actions is spread over several frames instead of making one frame
+    late.
+
+    :param budget: The most time in seconds to spend resuming actions each frame. At least
+        one action is always resumed, so every sequence makes progress.
+
+    :type budget: Float
+
+    **Examples:**
+
+    >>> scheduler = ActionScheduler()
+    >>> scheduler.start(game, run_actions(), key=event)
+    >>> scheduler.running(event)
+    True
+    >>> scheduler.update(game, 1 / 60.)
+
+    """
+    def __init__(self, budget=0.004):
+        self.budget = budget
+
+        # The game time in seconds, which Wait instructions count against.
+        self.time = 0.0
+
+        # Running tasks in the order they were started.
+        self.tasks = []
+
+
+    def start(self, game, generator, key=None):
+        """Runs a generator up to its first yield, then keeps it to be resumed in later
+        frames. Actions that don't yield are finished before this returns.
+
+        :param game: The main game object that contains all the game's variables.
+        :param generator: The generator to run.
+        :param key: What started the generator. See :meth:`running`.
+
+        :type game: core.tools.Control
+        :type generator: Generator
+        :type key: Object
+
+        :rtype: Boolean
+        :returns: True if the generator is still running.
+
+        """
+        task = Task(generator, key)
+        if self.step(game, task):
+            self.tasks.append(task)
+            return True
+        return False
+
+
+    def running(self, key):
+        """Checks whether the actions started with a given key are still running. Keys are
+        compared by identity, since this is checked for every event on every frame and
+        comparing whole event dictionaries would be slow.
+
+        :param key: The same object that was passed to :meth:`start`.
+
+        :type key: Object
+
+        :rtype: Boolean
+        :returns: True if they are running.
+
+        """
+        for task in self.tasks:
+            if task.key is key:
+                return True
+        return False
+
+
+    def clear(self):
+        """Stops every running action without resuming it again.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        for task in self.tasks:
+            task.generator.close()
+        self.tasks = []
+
+
+    def update(self, game, time_delta):
+        """Resumes the actions that are ready to carry on, until they have all yielded or
+        the frame's budget is used up.
+
+        :param game: The main game object that contains all the game's variables.
+        :param time_delta: The game time in seconds since the last frame.
+
+        :type game: core.tools.Control
+        :type time_delta: Float
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.time += time_delta
+        start = profiler.timer()
+
+        resumed = True
+        while resumed:
+            resumed = False
+            for task in list(self.tasks):
+                if task.instruction is not None and \
+                        not task.instruction.ready(self, game):
+                    continue
+
+                resumed = True
+                if not self.step(game, task):
+                    self.tasks.remove(task)
+
+                if profiler.timer() - start >= self.budget:
+                    return
+
+
+    def step(self, game, task):
+        """Resumes a task until it yields again.
+
+        :param game: The main game object that contains all the game's variables.
+        :param task: The task to resume.
+
+        :type game: core.tools.Control
+        :type task: core.components.event.scheduler.Task
+
+        :rtype: Boolean
+        :returns: True if the task is still running.
+
+        """
+        instruction = task.instruction
+        task.instruction = None
+
+        try:
+            try:
+                value = instruction.result() if instruction is not None else None
+            except Exception:
+                task.instruction = task.generator.throw(*sys.exc_info())
+            else:
+                task.instruction = task.generator.send(value)
+        except StopIteration:
+            return False
+        except Exception, message:
+            logger.error("Error running actions: %s" % message)
+            traceback.print_exc()
+            return False
+
+        if task.instruction is not None:
+            task.instruction.start(self, game)
+        return True
@@ -46,8 +46,7 @@ logger = logging.getLogger(__name__)
 logger.debug("core.item successfully imported")
 
 # Load the monster database
-items = db.JSONDatabase()
-items.load("item")
+items = db.get_database()
 
 
 class Item(object):
@@ -29,11 +29,21 @@
 #
 #
 
+import array
 import logging
 import pygame
 import os
 import sys
 
+from core.components import map_compiler
+
+# NumPy makes the tile grid faster to slice, but is not available on every platform we
+# support. Fall back to the standard library's array module when it can't be imported.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # PyTMX LOVES to change their API without notice. Here we try and handle that.
 try:
     from pytmx import load_pygame
@@ -63,8 +73,22 @@ class Map(object):
 
         # Collision tiles in tmx object format
         self.collisions = []
+
+        # The set of (x, y) tile positions the player can't walk through.
+        self.collision_map = set()
         
         self.events = []
+
+        # Tile surfaces indexed by gid, and the gids of each tile layer as a flat array in
+        # column order (x * height + y).
+        self.images = []
+        self.layers = []
+
+        # Tile surfaces scaled to the size they are drawn at, so that each tileset image is
+        # only scaled once no matter how many times it is placed.
+        # >>> self.scaled_tiles
+        # {(12, (80, 80)): <Surface(80x80x32 SW)>}
+        self.scaled_tiles = {}
         
         # Initialize the map
         self.load(filename)
@@ -139,9 +163,22 @@ class Map(object):
          'y': 0}
 
         """
+
+        self.filename = filename
+
+        # Use the compiled version of the map if it is up to date with the tmx file and its
+        # tilesets. Otherwise load it normally and compile it for next time.
+        compiled = map_compiler.load(filename)
+        if compiled:
+            self.size = compiled['size']
+            self.tile_size = compiled['tile_size']
+            self.events = compiled['events']
+            self.collision_map = compiled['collision_map']
+            self.images = compiled['images']
+            self.layers = compiled['layers']
+            return
         
         # Load the tmx map data using the pytmx library.
-        self.filename = filename
         #self.data = pytmx.TiledMap(filename)
         self.data = load_pygame(filename, pixelalpha=True)
         
@@ -189,89 +226,73 @@ class Map(object):
                 
                 self.events.append({'conds':conds, 'acts':acts})
 
+        self.images = self.data.images
+
+        # PyTMX recently changed some of their attribute names.
+        # This ensures we get the tile layers regardless of the version of PyTMX.
+        try:
+            tile_layers = [layer for layer in self.data.layers if hasattr(layer, 'data')]
+        except AttributeError:
+            tile_layers = list(self.data.tilelayers)
+
+        # Store the gids of each layer in column order, dropping any that have no image.
+        width, height = self.size
+        for layer in tile_layers:
+            gids = array.array('H', [0]) * (width * height)
+            for y, row in enumerate(layer.data):
+                for x, gid in enumerate(row):
+                    if gid and self.images[gid]:
+                        gids[x * height + y] = gid
+            self.layers.append(gids)
+
+        self.collision_map = self.load_collisions()
+
+        map_compiler.compile(self)
+
 
     def loadfile(self, tile_size):
-        """Loads the tile and collision data from the map file and returns a list of tiles with
-        their position and pygame surface, a set of collision tile coordinates, and the size of
-        the map itself. The list of tile surfaces is used to draw the map in the main game. The 
-        list of collision tile coordinates is used for collision detection.
+        """Loads the tile and collision data from the map file and returns a grid of tiles, a
+        set of collision tile coordinates, and the size of the map itself. The tile grid is used
+        to draw the map in the main game. The list of collision tile coordinates is used for
+        collision detection.
         
         :param tile_size: An [x, y] size of each tile in pixels AFTER scaling. This is used for
-            scaling and positioning.
+            scaling and positioning. Tile images that are a different size are scaled to it
+            once per gid.
         
         :type tile_size: List
     
-        :rtype: List
-        :returns: A multi-dimensional list of tiles in dictionary format; a set of collision
+        :rtype: Tuple
+        :returns: A core.components.map.TileGrid of the map's tiles; a set of collision
             coordinates; the map size.
 
         **Examples:**
 
-        The list of tiles is structured in a way where you can access an individual tile by
-        index number. For example, to get a tile located at (2, 1), you can access the tile's
-        details using:
-
-        >>> x = 2
-        >>> y = 1
-        >>> layer = 0
-        >>> tiles[x][y][layer]
-
-        Here is an example of what the the tiles list data structure actually looks like:
-
-        >>> tiles, collisions, mapsize =  map.loadfile([24, 24])
-        >>> tiles
-            [
-              [
-                [], 
-                [], 
-                [], 
-                [], 
-                [], 
-                [], 
-                [], 
-                [], 
-                [], 
-                [], 
-                []
-              ],
-              [ [],
-                [{'layer': 1,
-                'name': '6,0',
-                'position': (80, 80),
-                'surface': <Surface(16x16x32 SW)>,
-                'tile_pos': [1, 1],
-                'tileset': 'resources/gfx/tileset.png'}],
-                [{'layer': 1,
-                'name': '7,0',
-                'position': (80, 160),
-                'surface': <Surface(16x16x32 SW)>,
-                'tile_pos': [1, 2],
-                'tileset': 'resources/gfx/tileset.png'}],
-                [{'layer': 1,
-                'name': '8,0',
-                'position': (80, 240),
-                'surface': <Surface(16x16x32 SW)>,
-                'tile_pos': [1, 3],
-                'tileset': 'resources/gfx/tileset.png'}],
-                [{'layer': 1,
-                'name': '9,0',
-                'position': (80, 320),
-                'surface': <Surface(16x16x32 SW)>,
-                'tile_pos': [1, 4],
-                'tileset': 'resources/gfx/tileset.png'}],
-                [{'layer': 1,
-                'name': '9,0',
-                'position': (80, 400),
-                'surface': <Surface(16x16x32 SW)>,
-                'tile_pos': [1, 5],
-                'tileset': 'resources/gfx/tileset.png'},            
-                {'layer': 3,
-                'name': '10,0',
-                'position': (80, 400),
-                'surface': <Surface(16x16x32 SW)>,
-                'tile_pos': [1, 5],
-                'tileset': 'resources/gfx/tileset.png'}],
-        ...
+        The tile grid stores a single gid for every tile on each layer, and a table of
+        surfaces indexed by gid. For example, to get the surface of the tile located at (2, 1)
+        on the first layer:
+
+        >>> tiles, collisions, mapsize =  map.loadfile([80, 80])
+        >>> gid = tiles.get_gid(0, 2, 1)
+        >>> tiles.surfaces[gid]
+        <Surface(16x16x32 SW)>
+
+        The grid can still be accessed like the old multi-dimensional list of tiles, which
+        builds the tile dictionaries for a single position on demand:
+
+        >>> tiles[1][5]
+        [{'gid': 12,
+          'layer': 1,
+          'name': '1,5',
+          'position': (80, 400),
+          'surface': <Surface(16x16x32 SW)>,
+          'tile_pos': (1, 5)},
+         {'gid': 40,
+          'layer': 3,
+          'name': '1,5',
+          'position': (80, 400),
+          'surface': <Surface(16x16x32 SW)>,
+          'tile_pos': (1, 5)}]
 
 
         The collision map is a set of (x,y) coordinates that the player cannot walk
@@ -290,62 +311,33 @@ class Map(object):
 
         """ 
 
-        # Create a list of all of the tiles in the map
-        tiles = []
+        # Store one gid per tile for each layer, and a single surface for each gid.
+        surfaces = [self.scaled_tile(gid, tile_size)
+                    for gid in range(len(self.images))]
+        tiles = TileGrid(self.size, len(self.layers), tile_size, surfaces)
 
-        # Loop through all tiles in our map file and get the pygame surface associated with it.
-        for x in range(0, self.data.width):
-            
-            # Create a list of tile for the y-axis
-            y_list = []
-
-            for y in range(0, self.data.height):
-                
-                layer_list = []
-
-                # Get the number of tile layers.
-                num_of_layers = 0
-
-                # PyTMX recently changed some of their attribute names.
-                # This ensures we get the number of layers regardless of
-                # the version of PyTMX.
-                try:
-                    for layer in self.data.layers:
-                        if hasattr(layer, 'data'):
-                            num_of_layers += 1
-                except AttributeError:
-                    for layer in self.data.tilelayers:
-                        num_of_layers += 1
-
-                # Get all the map tiles for each layer
-                for layer in range(0, num_of_layers):
-
-                    # PyTMX recently changed their method names. This
-                    # ensures the map will load regardless of the PyTMX
-                    # version.
-                    try:
-                        surface = self.data.getTileImage(x, y, layer)
-                    except AttributeError:
-                        surface = self.data.get_tile_image(x, y, layer)
-                    
-                    # Create a tile based on the image
-                    if surface:
-                        tile = {'tile_pos': (x, y),
-                                'position': (x * tile_size[0], y * tile_size[1]),
-                                'layer': layer + 1,
-                                'name': str(x) + "," + str(y),
-                                'surface': surface
-                                }
-                        
-                        layer_list.append(tile)
-                        
-                y_list.append(layer_list)
-                
-            tiles.append(y_list)
+        for layer_number, gids in enumerate(self.layers):
+            tiles.load_layer(layer_number, gids)
 
         # Get the dimensions of the map
         mapsize = self.size
 
+        # Copy the collision tiles so that changing them doesn't change the map.
+        collision_map = set(self.collision_map)
+
+        return tiles, collision_map, mapsize
+
+
+    def load_collisions(self):
+        """Converts the collision regions of the map file into the set of individual tile
+        coordinates that the player cannot walk through.
+
+        :param: None
+
+        :rtype: Set
+        :returns: A set of (x, y) tile coordinates.
+
+        """
         # Create a list of all tile positions that we cannot walk through
         collision_map = set()
 
@@ -382,7 +374,38 @@ class Map(object):
                     collision_tile = (a + x, b + y)
                     collision_map.add(collision_tile)
 
-        return tiles, collision_map, mapsize
+        return collision_map
+
+
+    def scaled_tile(self, gid, size):
+        """Returns the image of a tile scaled to the given size. Scaled images are cached by
+        gid and size, so every tile placed with the same gid shares a single surface.
+
+        :param gid: The gid of the tile image in the map's tilesets.
+        :param size: An [x, y] size in pixels to scale the image to.
+
+        :type gid: Integer
+        :type size: List
+
+        :rtype: pygame.Surface or None
+        :returns: The scaled surface, or None if there is no image for this gid.
+
+        **Examples:**
+
+        >>> map.scaled_tile(12, [80, 80])
+        <Surface(80x80x32 SW)>
+
+        """
+        size = (int(size[0]), int(size[1]))
+        key = (gid, size)
+
+        if key not in self.scaled_tiles:
+            surface = self.images[gid]
+            if surface and surface.get_size() != size:
+                surface = pygame.transform.scale(surface, size)
+            self.scaled_tiles[key] = surface
+
+        return self.scaled_tiles[key]
 
     def round_to_divisible(self, x, base=16):
         """Rounds a number to a divisible base. This is used to round collision areas that aren't
@@ -409,6 +432,278 @@ class Map(object):
         return int(base * round(float(x)/base))
 
 
+
+class TileGrid(object):
+    """A compact grid of map tiles. Each layer is stored as a single array of tile gids, and
+    every placed tile with the same gid shares one surface from the surface table. Pixel
+    positions are calculated when they are needed instead of being stored with each tile.
+
+    If NumPy is available, each layer is a two-dimensional uint16 array indexed by [x, y], so
+    that slicing out the visible part of the map is a cheap view. Otherwise each layer is a
+    flat array.array of unsigned shorts in column order.
+
+    :param size: The [width, height] of the map in tiles.
+    :param layer_count: The number of tile layers in the map.
+    :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+    :param surfaces: A list of tile surfaces indexed by gid. Gid 0 is an empty tile.
+
+    :type size: Tuple
+    :type layer_count: Integer
+    :type tile_size: List
+    :type surfaces: List
+
+    **Examples:**
+
+    >>> grid = TileGrid((11, 9), 4, [80, 80], tmx_data.images)
+    >>> grid.set_gid(0, 2, 1, 12)
+    >>> grid.get_gid(0, 2, 1)
+    12
+    >>> grid.position(2, 1)
+    (160, 80)
+
+    """
+    def __init__(self, size, layer_count, tile_size, surfaces):
+        self.size = (int(size[0]), int(size[1]))
+        self.tile_size = tile_size
+        self.surfaces = list(surfaces)
+        self.layers = [self.create_layer() for i in range(layer_count)]
+
+
+    def create_layer(self):
+        """Creates an empty layer of gids the size of the map.
+
+        :param: None
+
+        :rtype: numpy.ndarray or array.array
+        :returns: A layer with every gid set to 0.
+
+        """
+        width, height = self.size
+        if numpy:
+            return numpy.zeros((width, height), dtype=numpy.uint16)
+        else:
+            return array.array('H', [0]) * (width * height)
+
+
+    def load_layer(self, layer, gids):
+        """Replaces every gid of a layer with the gids from a flat array in column order.
+
+        :param layer: The index of the layer, starting at 0.
+        :param gids: The gids of the whole layer, indexed by x * height + y.
+
+        :type layer: Integer
+        :type gids: array.array
+
+        :rtype: None
+        :returns: None
+
+        """
+        if numpy:
+            self.layers[layer] = numpy.frombuffer(
+                gids, dtype=numpy.uint16).reshape(self.size).copy()
+        else:
+            self.layers[layer] = array.array('H', gids)
+
+
+    def get_gid(self, layer, x, y):
+        """Returns the gid of the tile at a given position on a layer.
+
+        :param layer: The index of the layer, starting at 0.
+        :param x: The x position of the tile.
+        :param y: The y position of the tile.
+
+        :type layer: Integer
+        :type x: Integer
+        :type y: Integer
+
+        :rtype: Integer
+        :returns: The gid of the tile, or 0 if there is no tile there.
+
+        """
+        if numpy:
+            return int(self.layers[layer][x, y])
+        else:
+            return self.layers[layer][x * self.size[1] + y]
+
+
+    def set_gid(self, layer, x, y, gid):
+        """Sets the gid of the tile at a given position on a layer.
+
+        :param layer: The index of the layer, starting at 0.
+        :param x: The x position of the tile.
+        :param y: The y position of the tile.
+        :param gid: The gid of the tile's surface in the surface table.
+
+        :type layer: Integer
+        :type x: Integer
+        :type y: Integer
+        :type gid: Integer
+
+        :rtype: None
+        :returns: None
+
+        """
+        if numpy:
+            self.layers[layer][x, y] = gid
+        else:
+            self.layers[layer][x * self.size[1] + y] = gid
+
+
+    def add_surface(self, surface):
+        """Adds a surface to the surface table so that tiles can be set to it.
+
+        :param surface: The pygame surface of the tile.
+
+        :type surface: pygame.Surface
+
+        :rtype: Integer
+        :returns: The new gid of the surface.
+
+        """
+        self.surfaces.append(surface)
+        return len(self.surfaces) - 1
+
+
+    def copy(self):
+        """Returns a copy of the grid whose gids and surface table can be changed without
+        changing this grid. The tile surfaces themselves are shared.
+
+        :param: None
+
+        :rtype: core.components.map.TileGrid
+        :returns: The copied grid.
+
+        """
+        grid = TileGrid(self.size, 0, self.tile_size, self.surfaces)
+        if numpy:
+            grid.layers = [layer.copy() for layer in self.layers]
+        else:
+            grid.layers = [array.array('H', layer) for layer in self.layers]
+        return grid
+
+
+    def region(self, first_x, first_y, last_x, last_y):
+        """Returns the gids of a rectangular part of the map for every layer. With NumPy
+        these are views into the layers, so nothing is copied.
+
+        :param first_x: The left-most x position of the region.
+        :param first_y: The top-most y position of the region.
+        :param last_x: The x position just past the right edge of the region.
+        :param last_y: The y position just past the bottom edge of the region.
+
+        :type first_x: Integer
+        :type first_y: Integer
+        :type last_x: Integer
+        :type last_y: Integer
+
+        :rtype: List
+        :returns: A list with the gids of the region for each layer, indexed by [x][y]
+            relative to the region's top-left corner.
+
+        """
+        if numpy:
+            return [layer[first_x:last_x, first_y:last_y] for layer in self.layers]
+
+        height = self.size[1]
+        return [[layer[x * height + first_y:x * height + last_y]
+                 for x in xrange(first_x, last_x)]
+                for layer in self.layers]
+
+
+    def position(self, x, y):
+        """Returns the pixel position of a tile relative to the top-left corner of the map.
+
+        :param x: The x position of the tile.
+        :param y: The y position of the tile.
+
+        :type x: Integer
+        :type y: Integer
+
+        :rtype: Tuple
+        :returns: The (x, y) pixel position of the tile.
+
+        """
+        return (x * self.tile_size[0], y * self.tile_size[1])
+
+
+    def tiles_at(self, x, y):
+        """Returns the tiles on every layer at a given position in the old dictionary format.
+        The dictionaries are created on demand, so changing them does not change the map.
+
+        :param x: The x position of the tile.
+        :param y: The y position of the tile.
+
+        :type x: Integer
+        :type y: Integer
+
+        :rtype: List
+        :returns: A list of tile dictionaries, one for each layer with a tile at this
+            position.
+
+        """
+        tiles = []
+        for layer in range(len(self.layers)):
+            gid = self.get_gid(layer, x, y)
+            if gid:
+                tiles.append({'tile_pos': (x, y),
+                              'position': self.position(x, y),
+                              'layer': layer + 1,
+                              'name': str(x) + "," + str(y),
+                              'gid': gid,
+                              'surface': self.surfaces[gid]})
+        return tiles
+
+
+    def __len__(self):
+        return self.size[0]
+
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.size[0]
+        if not 0 <= x < self.size[0]:
+            raise IndexError("tile grid index out of range")
+        return TileColumn(self, x)
+
+
+    def __iter__(self):
+        for x in xrange(self.size[0]):
+            yield TileColumn(self, x)
+
+
+class TileColumn(object):
+    """A single column of a core.components.map.TileGrid. This allows the grid to be
+    accessed like the old multi-dimensional list of tiles with tiles[x][y].
+
+    :param grid: The tile grid this column belongs to.
+    :param x: The x position of this column.
+
+    :type grid: core.components.map.TileGrid
+    :type x: Integer
+
+    """
+    def __init__(self, grid, x):
+        self.grid = grid
+        self.x = x
+
+
+    def __len__(self):
+        return self.grid.size[1]
+
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.grid.size[1]
+        if not 0 <= y < self.grid.size[1]:
+            raise IndexError("tile grid index out of range")
+        return self.grid.tiles_at(self.x, y)
+
+
+    def __iter__(self):
+        for y in xrange(self.grid.size[1]):
+            yield self.grid.tiles_at(self.x, y)
+
+
 class Tile(object):
     """A class to create tile objects. Tile objects are used to keep track of tile properties such
     as the layer it's on, its position, surface, and other properties.
@@ -0,0 +1,404 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.map_cache Cache of loaded maps.
+#
+#
+
+import collections
+import logging
+import os
+import Queue
+import threading
+
+from core.components import map
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.map_cache successfully imported")
+
+# Event actions that load another map.
+TELEPORT_ACTIONS = ("teleport", "transition_teleport")
+
+
+class CachedMap(object):
+    """A map that has been parsed and loaded at a given tile size. Everything in it is shared
+    between the world, the event engine and any later visit to the same map, so it should be
+    treated as read-only.
+
+    :param map: The parsed map.
+    :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+
+    :type map: core.components.map.Map
+    :type tile_size: List
+
+    """
+    def __init__(self, map, tile_size):
+        self.map = map
+        self.tile_size = (int(tile_size[0]), int(tile_size[1]))
+        self.events = map.events
+
+        # The events with their arguments parsed by the event engine. This is filled in by
+        # the main thread the first time the map is used.
+        self.compiled_events = None
+        self.tiles, self.collision_map, self.map_size = map.loadfile(tile_size)
+        self.size = self.estimate_size()
+
+
+    def estimate_size(self):
+        """Estimates how much memory the map's tile images and tile grid use.
+
+        :param: None
+
+        :rtype: Integer
+        :returns: The approximate size of the map in bytes.
+
+        """
+        surfaces = {}
+        for surface in self.map.images:
+            if surface:
+                surfaces[id(surface)] = surface
+        for surface in self.map.scaled_tiles.values():
+            if surface:
+                surfaces[id(surface)] = surface
+
+        size = 0
+        for surface in surfaces.values():
+            size += surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+        # Each layer stores an unsigned short per tile.
+        size += self.map_size[0] * self.map_size[1] * len(self.tiles.layers) * 2
+
+        return size
+
+
+
+class MapCache(object):
+    """Keeps recently loaded maps in memory so that going back to a map doesn't parse its
+    file again. Maps are keyed by their filename and modification time, so a map that is
+    edited on disk is loaded fresh. When the maps in the cache use more memory than the
+    budget allows, the least recently used maps are dropped.
+
+    The cache may be used from more than one thread. Maps are parsed outside of the lock so
+    that loading one map doesn't block lookups of another. A thread that asks for a map that
+    is already being parsed waits for that parse to finish.
+
+    :param budget: The maximum number of bytes of maps to keep in memory. The most recently
+        used map is always kept, even if it is larger than the budget.
+
+    :type budget: Integer
+
+    **Examples:**
+
+    >>> cache = MapCache(32 * 1024 * 1024)
+    >>> cached = cache.get("resources/maps/pallet_town-room.tmx", [80, 80])
+    >>> cached.tiles, cached.collision_map, cached.map_size
+
+    """
+    def __init__(self, budget):
+        self.budget = budget
+        self.lock = threading.RLock()
+
+        # Cached maps, ordered from least to most recently used.
+        # >>> self.maps
+        # OrderedDict([(('resources/maps/test.tmx', 1420070400.0, (80, 80)), <CachedMap>)])
+        self.maps = collections.OrderedDict()
+        self.total_size = 0
+
+        # Events that are set when a map that is being parsed has finished loading.
+        self.loading = {}
+
+
+    def key(self, filename, tile_size):
+        """Returns the cache key of a map file at a given tile size.
+
+        :param filename: The path to the tmx map file.
+        :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+
+        :type filename: String
+        :type tile_size: List
+
+        :rtype: Tuple
+        :returns: A (filename, mtime, tile_size) tuple.
+
+        """
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            mtime = None
+
+        return (filename, mtime, (int(tile_size[0]), int(tile_size[1])))
+
+
+    def get(self, filename, tile_size):
+        """Returns a loaded map from the cache, parsing and loading the map file first if it
+        isn't cached or has changed on disk.
+
+        :param filename: The path to the tmx map file.
+        :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+
+        :type filename: String
+        :type tile_size: List
+
+        :rtype: core.components.map_cache.CachedMap
+        :returns: The loaded map.
+
+        """
+        key = self.key(filename, tile_size)
+
+        while True:
+            with self.lock:
+                cached = self.maps.pop(key, None)
+                if cached is not None:
+                    self.maps[key] = cached
+                    logger.debug("Using cached map " + filename)
+                    return cached
+
+                # If another thread is already parsing this map, wait for it to finish
+                # instead of parsing it twice.
+                loading = self.loading.get(key)
+                if loading is None:
+                    loading = self.loading[key] = threading.Event()
+                    break
+
+            loading.wait()
+
+        try:
+            logger.debug("Loading map " + filename)
+            cached = CachedMap(map.Map(filename), tile_size)
+
+            with self.lock:
+                self.maps[key] = cached
+                self.total_size += cached.size
+
+                # Forget older versions of this map that have changed on disk.
+                for old_key in list(self.maps.keys()):
+                    if old_key[0] == filename and old_key[1] != key[1]:
+                        self.remove(old_key)
+
+                self.evict()
+        finally:
+            with self.lock:
+                del self.loading[key]
+            loading.set()
+
+        return cached
+
+
+    def contains(self, filename, tile_size):
+        """Checks whether an up to date copy of a map is in the cache.
+
+        :param filename: The path to the tmx map file.
+        :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+
+        :type filename: String
+        :type tile_size: List
+
+        :rtype: Boolean
+        :returns: True if the map is cached.
+
+        """
+        key = self.key(filename, tile_size)
+        with self.lock:
+            return key in self.maps
+
+
+    def remove(self, key):
+        """Removes a single map from the cache.
+
+        :param key: The cache key of the map to remove.
+
+        :type key: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        with self.lock:
+            cached = self.maps.pop(key, None)
+            if cached is not None:
+                self.total_size -= cached.size
+
+
+    def evict(self):
+        """Drops the least recently used maps until the cache fits within its budget.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        with self.lock:
+            while self.total_size > self.budget and len(self.maps) > 1:
+                key, cached = self.maps.popitem(last=False)
+                self.total_size -= cached.size
+                logger.debug("Evicted map " + key[0] + " from the map cache")
+
+
+    def clear(self):
+        """Removes every map from the cache.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        with self.lock:
+            self.maps.clear()
+            self.total_size = 0
+
+
+
+class MapPrefetcher(object):
+    """Loads the maps that the current map teleports to on a background thread, so that they
+    are already in the map cache by the time the player walks through a door.
+
+    Each time a map is loaded, :meth:`prefetch` replaces whatever is still waiting in the
+    queue with the new map's teleport destinations. Maps that are already being parsed when
+    the queue is cancelled are still finished and cached.
+
+    :param cache: The map cache to load maps into.
+    :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+    :param maxsize: The largest number of maps that can wait in the queue.
+    :param map_dir: The directory that teleport actions load their maps from.
+
+    :type cache: core.components.map_cache.MapCache
+    :type tile_size: List
+    :type maxsize: Integer
+    :type map_dir: String
+
+    **Examples:**
+
+    >>> prefetcher = MapPrefetcher(prepare.MAP_CACHE, prepare.TILE_SIZE)
+    >>> prefetcher.prefetch(world.current_map)
+
+    """
+    def __init__(self, cache, tile_size, maxsize=8, map_dir="resources/maps/"):
+        self.cache = cache
+        self.tile_size = tile_size
+        self.map_dir = map_dir
+
+        # Maps waiting to be loaded, as (generation, filename) tuples. Anything queued
+        # before the last call to cancel has an old generation and is skipped.
+        self.queue = Queue.Queue(maxsize)
+        self.generation = 0
+        self.thread = None
+
+
+    def destinations(self, current_map):
+        """Returns the files of every map the given map can teleport to.
+
+        :param current_map: The map to look for teleport actions in.
+
+        :type current_map: core.components.map.Map
+
+        :rtype: List
+        :returns: A list of map file paths in the order they appear in the map's events.
+
+        """
+        filenames = []
+        for event in current_map.events:
+            for act in event['acts']:
+                if act[0] not in TELEPORT_ACTIONS or len(act) < 2:
+                    continue
+
+                filename = self.map_dir + act[1].split(",")[0].strip()
+                if filename != current_map.filename and filename not in filenames:
+                    filenames.append(filename)
+
+        return filenames
+
+
+    def prefetch(self, current_map):
+        """Cancels any maps still waiting to be loaded and queues up the teleport
+        destinations of the given map instead.
+
+        :param current_map: The map that was just loaded.
+
+        :type current_map: core.components.map.Map
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.cancel()
+
+        for filename in self.destinations(current_map):
+            try:
+                self.queue.put_nowait((self.generation, filename))
+            except Queue.Full:
+                logger.debug("Map prefetch queue is full, skipping " + filename)
+                break
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="MapPrefetcher")
+            self.thread.daemon = True
+            self.thread.start()
+
+
+    def cancel(self):
+        """Throws away every map that is waiting to be loaded.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.generation += 1
+
+        while True:
+            try:
+                self.queue.get_nowait()
+            except Queue.Empty:
+                break
+            self.queue.task_done()
+
+
+    def run(self):
+        """Loads queued maps into the cache until the program exits. This runs on the
+        prefetcher's worker thread.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        while True:
+            generation, filename = self.queue.get()
+            try:
+                if generation == self.generation and \
+                        not self.cache.contains(filename, self.tile_size):
+                    logger.debug("Prefetching map " + filename)
+                    self.cache.get(filename, self.tile_size)
+            except Exception as e:
+                logger.warning("Unable to prefetch map " + filename + ": " + str(e))
+            finally:
+                self.queue.task_done()
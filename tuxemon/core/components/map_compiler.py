@@ -0,0 +1,458 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.map_compiler Compiled map files.
+#
+#
+"""Compiles tmx maps into a compact binary file that can be loaded without parsing any XML.
+
+A compiled map is stored next to its tmx file with a ".tmxc" extension. It holds the gids of
+every tile layer, the collision tiles, the map's events and, for every gid, which tileset
+image and tile it was cut from. Loading it only has to read that one file and the tileset
+images. The compiled file is thrown away and rebuilt whenever the tmx file, an external
+tileset or a tileset image is newer than the copy it was compiled from.
+
+To compile every map ahead of time, or to compare how long maps take to load with and
+without their compiled files, run this module from the game's directory:
+
+    python -m core.components.map_compiler compile
+    python -m core.components.map_compiler benchmark
+
+"""
+
+import array
+import glob
+import logging
+import marshal
+import os
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+
+import pygame
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.map_compiler successfully imported")
+
+# Compiled files start with this header. The version must be increased whenever the layout
+# of the compiled data changes so that old files are rebuilt.
+MAGIC = "TUXMAP"
+VERSION = 1
+
+# The extension added to a tmx filename for its compiled file.
+EXTENSION = "c"
+
+# Tiles with fewer opaque pixels than this are kept with per-pixel alpha. This matches how
+# PyTMX converts tile images.
+ALPHA_THRESHOLD = 127
+
+# The bits Tiled uses to flip a tile when PyTMX gives us flags as an integer.
+FLIPPED_HORIZONTALLY = 1 << 31
+FLIPPED_VERTICALLY = 1 << 30
+FLIPPED_DIAGONALLY = 1 << 29
+
+
+def compiled_filename(filename):
+    """Returns the path of the compiled file for a tmx map.
+
+    :param filename: The path to the tmx map file.
+
+    :type filename: String
+
+    :rtype: String
+    :returns: The path to the compiled map file.
+
+    **Examples:**
+
+    >>> compiled_filename("resources/maps/test.tmx")
+    'resources/maps/test.tmxc'
+
+    """
+    return filename + EXTENSION
+
+
+def dependencies(filename, tilesets):
+    """Returns every file a map was built from along with its modification time. If any of
+    them change, the map needs to be compiled again.
+
+    :param filename: The path to the tmx map file.
+    :param tilesets: The tilesets of the map, as loaded by PyTMX.
+
+    :type filename: String
+    :type tilesets: List
+
+    :rtype: List
+    :returns: A list of (path, mtime) tuples.
+
+    """
+    directory = os.path.dirname(filename)
+    paths = [filename]
+
+    # External tilesets are not kept by PyTMX after they are loaded, so look them up in
+    # the map file itself.
+    for element in ElementTree.parse(filename).getroot().findall("tileset"):
+        source = element.get("source")
+        if source:
+            paths.append(os.path.join(directory, source))
+
+    for tileset in tilesets:
+        paths.append(os.path.join(directory, tileset["source"]))
+
+    return [(path, os.path.getmtime(path)) for path in paths]
+
+
+def tile_flags(flags):
+    """Converts the flip flags PyTMX gives each gid into a tuple. Older versions of PyTMX use
+    the raw bits from the map file, newer ones use a named tuple.
+
+    :param flags: The flags of a tile from PyTMX.
+
+    :type flags: Integer or pytmx.TileFlags
+
+    :rtype: Tuple
+    :returns: A (flipped_horizontally, flipped_vertically, flipped_diagonally) tuple.
+
+    """
+    if hasattr(flags, "flipped_horizontally"):
+        return (bool(flags.flipped_horizontally),
+                bool(flags.flipped_vertically),
+                bool(flags.flipped_diagonally))
+
+    flags = flags or 0
+    return (bool(flags & FLIPPED_HORIZONTALLY),
+            bool(flags & FLIPPED_VERTICALLY),
+            bool(flags & FLIPPED_DIAGONALLY))
+
+
+def compile(map):
+    """Writes the compiled file for a map that was just loaded from its tmx file. Failing to
+    write it is not an error, the map will just be loaded from the tmx file again next time.
+
+    :param map: A map loaded with PyTMX.
+
+    :type map: core.components.map.Map
+
+    :rtype: Boolean
+    :returns: True if the compiled file was written.
+
+    **Examples:**
+
+    >>> compile(Map("resources/maps/test.tmx"))
+    True
+
+    """
+    filename = compiled_filename(map.filename)
+
+    try:
+        data = compile_data(map)
+        temporary = filename + ".tmp"
+        with open(temporary, "wb") as compiled_file:
+            compiled_file.write(MAGIC)
+            marshal.dump(data, compiled_file)
+
+        # Windows won't rename over an existing file.
+        if os.name == "nt" and os.path.exists(filename):
+            os.remove(filename)
+        os.rename(temporary, filename)
+    except (IOError, OSError, ValueError) as e:
+        logger.warning("Unable to compile map " + map.filename + ": " + str(e))
+        return False
+
+    logger.debug("Compiled map " + map.filename)
+    return True
+
+
+def compile_data(map):
+    """Builds the data that is stored in a map's compiled file.
+
+    :param map: A map loaded with PyTMX.
+
+    :type map: core.components.map.Map
+
+    :rtype: Dictionary
+    :returns: The compiled map data, made only of types that marshal can store.
+
+    """
+    tilesets = []
+    for tileset in sorted(map.data.tilesets, key=lambda t: t.firstgid):
+        colorkey = getattr(tileset, "trans", None)
+        tilesets.append({"source": tileset.source,
+                         "firstgid": tileset.firstgid,
+                         "tilewidth": tileset.tilewidth,
+                         "tileheight": tileset.tileheight,
+                         "margin": tileset.margin,
+                         "spacing": tileset.spacing,
+                         "colorkey": str(colorkey) if colorkey else None})
+
+    # PyTMX gives each combination of a Tiled gid and flip flags its own gid. Work out which
+    # tileset and tile each of our gids was cut from.
+    tiles = [None] * len(map.images)
+    for tiled_gid, gids in map.data.gidmap.items():
+        index = None
+        for i, tileset in enumerate(tilesets):
+            if tileset["firstgid"] <= tiled_gid:
+                index = i
+        if index is None:
+            continue
+
+        for gid, flags in gids:
+            if 0 < gid < len(tiles) and map.images[gid]:
+                tiles[gid] = (index, tiled_gid - tilesets[index]["firstgid"]) + \
+                    tile_flags(flags)
+
+    return {"version": VERSION,
+            "dependencies": dependencies(map.filename, tilesets),
+            "size": tuple(map.size),
+            "tile_size": tuple(map.tile_size),
+            "tilesets": tilesets,
+            "tiles": tiles,
+            "layers": [gids.tostring() for gids in map.layers],
+            "collision_map": sorted(map.collision_map),
+            "events": map.events}
+
+
+def read(filename):
+    """Reads a map's compiled file if it exists and is up to date.
+
+    :param filename: The path to the tmx map file.
+
+    :type filename: String
+
+    :rtype: Dictionary or None
+    :returns: The compiled map data, or None if the map needs to be compiled.
+
+    """
+    try:
+        with open(compiled_filename(filename), "rb") as compiled_file:
+            contents = compiled_file.read()
+    except IOError:
+        return None
+
+    if not contents.startswith(MAGIC):
+        return None
+
+    try:
+        data = marshal.loads(contents[len(MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        logger.warning("Compiled map for " + filename + " is damaged")
+        return None
+
+    if not isinstance(data, dict) or data.get("version") != VERSION:
+        return None
+
+    for path, mtime in data["dependencies"]:
+        try:
+            if os.path.getmtime(path) != mtime:
+                return None
+        except OSError:
+            return None
+
+    return data
+
+
+def load(filename):
+    """Loads a map from its compiled file.
+
+    :param filename: The path to the tmx map file.
+
+    :type filename: String
+
+    :rtype: Dictionary or None
+    :returns: A dictionary with the map's size, tile_size, events, collision_map, images and
+        layers, or None if there is no up to date compiled file.
+
+    **Examples:**
+
+    >>> compiled = load("resources/maps/test.tmx")
+    >>> compiled['size']
+    (20, 20)
+
+    """
+    data = read(filename)
+    if data is None:
+        return None
+
+    try:
+        images = load_images(filename, data["tilesets"], data["tiles"])
+    except (pygame.error, IOError) as e:
+        logger.warning("Unable to load compiled map " + filename + ": " + str(e))
+        return None
+
+    layers = []
+    for layer in data["layers"]:
+        gids = array.array('H')
+        gids.fromstring(layer)
+        layers.append(gids)
+
+    logger.debug("Loaded compiled map " + filename)
+    return {"size": data["size"],
+            "tile_size": data["tile_size"],
+            "events": data["events"],
+            "collision_map": set(data["collision_map"]),
+            "images": images,
+            "layers": layers}
+
+
+def load_images(filename, tilesets, tiles):
+    """Cuts the tile images out of the tileset images the same way PyTMX does.
+
+    :param filename: The path to the tmx map file. Tileset images are relative to it.
+    :param tilesets: The tilesets of the compiled map.
+    :param tiles: The (tileset, tile id, flipped_horizontally, flipped_vertically,
+        flipped_diagonally) of each gid.
+
+    :type filename: String
+    :type tilesets: List
+    :type tiles: List
+
+    :rtype: List
+    :returns: A list of tile surfaces indexed by gid.
+
+    """
+    directory = os.path.dirname(filename)
+    sheets = {}
+    images = [None] * len(tiles)
+
+    for gid, tile in enumerate(tiles):
+        if tile is None:
+            continue
+
+        index, tile_id, flip_x, flip_y, flip_diagonal = tile
+        tileset = tilesets[index]
+        if index not in sheets:
+            sheets[index] = pygame.image.load(os.path.join(directory, tileset["source"]))
+        sheet = sheets[index]
+
+        # Tiles are numbered left to right, then top to bottom.
+        step_x = tileset["tilewidth"] + tileset["spacing"]
+        step_y = tileset["tileheight"] + tileset["spacing"]
+        width, height = sheet.get_size()
+        columns = len(range(tileset["margin"], width + tileset["margin"] - step_x + 1, step_x))
+        rows = len(range(tileset["margin"], height + tileset["margin"] - step_y + 1, step_y))
+        if not columns or tile_id >= columns * rows:
+            continue
+
+        rect = (tileset["margin"] + (tile_id % columns) * step_x,
+                tileset["margin"] + (tile_id // columns) * step_y,
+                tileset["tilewidth"], tileset["tileheight"])
+        image = sheet.subsurface(rect)
+
+        if flip_diagonal:
+            image = pygame.transform.flip(pygame.transform.rotate(image, 270), 1, 0)
+        if flip_x or flip_y:
+            image = pygame.transform.flip(image, flip_x, flip_y)
+
+        colorkey = tileset["colorkey"]
+        if colorkey:
+            colorkey = pygame.Color("#" + colorkey)
+        images[gid] = convert(image, colorkey)
+
+    return images
+
+
+def convert(image, colorkey=None):
+    """Converts a tile image to the fastest format to draw, keeping per-pixel alpha only for
+    tiles that have transparent pixels.
+
+    :param image: The tile image to convert.
+    :param colorkey: The color to treat as transparent, if the tileset has one.
+
+    :type image: pygame.Surface
+    :type colorkey: pygame.Color
+
+    :rtype: pygame.Surface
+    :returns: The converted tile image.
+
+    """
+    width, height = image.get_size()
+    try:
+        opaque = pygame.mask.from_surface(image, ALPHA_THRESHOLD).count()
+    except Exception:
+        return image.convert_alpha()
+
+    if opaque == width * height:
+        return image.convert()
+    elif colorkey:
+        image = image.convert()
+        image.set_colorkey(colorkey, pygame.RLEACCEL)
+        return image
+    else:
+        return image.convert_alpha()
+
+
+def benchmark(filenames):
+    """Times how long each map takes to load from its tmx file and from its compiled file.
+
+    :param filenames: The paths of the tmx map files to load.
+
+    :type filenames: List
+
+    :rtype: None
+    :returns: None
+
+    """
+    from core.components import map
+
+    print "%-40s %10s %10s %8s" % ("Map", "Cold (ms)", "Warm (ms)", "Speedup")
+    for filename in filenames:
+        if os.path.exists(compiled_filename(filename)):
+            os.remove(compiled_filename(filename))
+
+        start = time.time()
+        map.Map(filename)
+        cold = time.time() - start
+
+        start = time.time()
+        map.Map(filename)
+        warm = time.time() - start
+
+        print "%-40s %10.1f %10.1f %7.1fx" % (
+            os.path.basename(filename), cold * 1000, warm * 1000, cold / max(warm, 0.000001))
+
+
+if __name__ == "__main__":
+    # Tile images need a display to be converted, but nothing has to be shown.
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "benchmark"
+    filenames = sys.argv[2:] or sorted(glob.glob("resources/maps/*.tmx"))
+
+    if command == "compile":
+        from core.components import map
+        for filename in filenames:
+            if read(filename) is None:
+                map.Map(filename)
+                print "Compiled " + filename
+            else:
+                print "Up to date " + filename
+    elif command == "benchmark":
+        benchmark(filenames)
+    else:
+        print "Usage: python -m core.components.map_compiler [compile|benchmark] [maps...]"
@@ -0,0 +1,335 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.map_renderer Pre-baked map layer chunks.
+#
+#
+
+import logging
+import pygame
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.map_renderer successfully imported")
+
+# The number of tiles along each side of a chunk.
+CHUNK_SIZE = 8
+
+# Tiles on this layer are drawn above the player's body, but below the
+# player's head. Tiles on any layer above it are drawn over everything.
+MEDIUM_LAYER = 4
+
+
+class MapRenderer(object):
+    """Bakes the tiles of a loaded map into fixed-size chunk surfaces so that each frame
+    only has to blit the handful of chunks that intersect the screen instead of every
+    visible tile.
+
+    The ground layers (1-3) are baked together onto opaque chunks. Every layer from
+    layer 4 up gets its own set of transparent chunks so that it can be drawn above the
+    player exactly as if its tiles were blitted one at a time. Chunks are baked the first
+    time they come on screen, so only the parts of the map the player has seen use any
+    memory. A chunk is rebuilt when one of its tiles is changed through :meth:`set_tile`
+    or :meth:`invalidate`.
+
+    The tile grid usually comes from the map cache and is shared with later visits to the
+    same map, so the renderer copies it before the first call to :meth:`set_tile` changes
+    anything.
+
+    :param tiles: The grid of tiles returned by core.components.map.Map.loadfile, after
+        scaling.
+    :param map_size: The [width, height] of the map in tiles.
+    :param tile_size: An [x, y] size of each tile in pixels AFTER scaling.
+    :param chunk_size: The number of tiles along each side of a chunk.
+
+    :type tiles: core.components.map.TileGrid
+    :type map_size: Tuple
+    :type tile_size: List
+    :type chunk_size: Integer
+
+    **Examples:**
+
+    >>> renderer = MapRenderer(tiles, map_size, tile_size)
+    >>> renderer.draw_ground(screen, (global_x, global_y))
+
+    """
+    def __init__(self, tiles, map_size, tile_size, chunk_size=CHUNK_SIZE):
+        self.tiles = tiles
+        self.map_size = map_size
+        self.tile_size = tile_size
+        self.chunk_size = chunk_size
+
+        # Whether self.tiles is our own copy that can be changed.
+        self.tiles_copied = False
+
+        # The size of a full chunk in pixels and the number of chunks across the map.
+        self.chunk_pixels = (tile_size[0] * chunk_size, tile_size[1] * chunk_size)
+        self.chunk_count = (int((map_size[0] + chunk_size - 1) / chunk_size),
+                            int((map_size[1] + chunk_size - 1) / chunk_size))
+
+        # The layers that get their own chunks. Layer 0 holds the combined ground layers,
+        # and every layer from MEDIUM_LAYER up is kept separate.
+        self.layers = [0] + range(MEDIUM_LAYER, len(tiles.layers) + 1)
+
+        # Baked chunk surfaces by layer.
+        # >>> self.chunks
+        # {0: {(0, 0): <Surface(640x640x32 SW)>}, 4: {(1, 0): <Surface(640x640x32 SW)>}}
+        self.chunks = dict((layer, {}) for layer in self.layers)
+
+        # Chunks that have been baked and are up to date.
+        self.baked = set()
+
+
+    def bake(self):
+        """Builds the chunk surfaces for the whole map up front, instead of as each chunk
+        comes on screen.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        for chunk_x in xrange(self.chunk_count[0]):
+            for chunk_y in xrange(self.chunk_count[1]):
+                if (chunk_x, chunk_y) not in self.baked:
+                    self.bake_chunk((chunk_x, chunk_y))
+
+        logger.debug("Baked " + str(sum(len(c) for c in self.chunks.values())) +
+                     " map chunks")
+
+
+    def bake_chunk(self, chunk):
+        """Builds the surfaces of every layer for a single chunk. Chunks on layers that
+        have no tiles in this part of the map are not allocated.
+
+        :param chunk: The (x, y) position of the chunk in chunks.
+
+        :type chunk: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        for layer_chunks in self.chunks.values():
+            layer_chunks.pop(chunk, None)
+        self.baked.add(chunk)
+
+        first_x = chunk[0] * self.chunk_size
+        first_y = chunk[1] * self.chunk_size
+        last_x = min(first_x + self.chunk_size, self.map_size[0])
+        last_y = min(first_y + self.chunk_size, self.map_size[1])
+        size = ((last_x - first_x) * self.tile_size[0],
+                (last_y - first_y) * self.tile_size[1])
+
+        # Get the gids of this part of the map for every layer.
+        region = self.tiles.region(first_x, first_y, last_x, last_y)
+        surfaces = self.tiles.surfaces
+
+        # Tiles are blitted in the same order the per-tile drawing used: column by
+        # column, then row by row, then layer by layer.
+        for x in xrange(last_x - first_x):
+            for y in xrange(last_y - first_y):
+                for index, gids in enumerate(region):
+                    gid = gids[x][y]
+                    if not gid:
+                        continue
+
+                    # Layers are numbered from 1 in the map file.
+                    if index + 1 < MEDIUM_LAYER:
+                        layer = 0
+                    else:
+                        layer = index + 1
+
+                    layer_chunks = self.chunks[layer]
+                    if chunk not in layer_chunks:
+                        # The ground is drawn onto a black screen, so an opaque black
+                        # chunk gives the same pixels. Upper layers need transparency so
+                        # the player can be seen through them.
+                        if layer == 0:
+                            surface = pygame.Surface(size).convert()
+                            surface.fill((0, 0, 0))
+                        else:
+                            surface = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+                            surface.fill((0, 0, 0, 0))
+                        layer_chunks[chunk] = surface
+
+                    layer_chunks[chunk].blit(
+                        surfaces[gid], (x * self.tile_size[0], y * self.tile_size[1]))
+
+
+    def set_tile(self, tile_pos, layer, gid):
+        """Replaces the tile at a given position and marks its chunk to be rebuilt. The
+        change only applies to this renderer; the map's shared tile grid is copied first.
+
+        :param tile_pos: The (x, y) position of the tile on the map.
+        :param layer: The index of the layer, starting at 0.
+        :param gid: The gid of the new tile's surface, or 0 to remove the tile.
+
+        :type tile_pos: Tuple
+        :type layer: Integer
+        :type gid: Integer
+
+        :rtype: None
+        :returns: None
+
+        """
+        if not self.tiles_copied:
+            self.tiles = self.tiles.copy()
+            self.tiles_copied = True
+
+        self.tiles.set_gid(layer, tile_pos[0], tile_pos[1], gid)
+        self.invalidate(tile_pos)
+
+
+    def invalidate(self, tile_pos):
+        """Marks the chunk containing the given tile position to be rebuilt the next time
+        it is drawn.
+
+        :param tile_pos: The (x, y) position of the tile on the map.
+
+        :type tile_pos: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.baked.discard((int(tile_pos[0] / self.chunk_size),
+                            int(tile_pos[1] / self.chunk_size)))
+
+
+    def visible_chunks(self, screen, offset):
+        """Returns the chunks that overlap the screen and the screen position to draw each
+        of them at.
+
+        :param screen: The pygame surface to draw to.
+        :param offset: The (global_x, global_y) offset of the map on the screen.
+
+        :type screen: pygame.Surface
+        :type offset: Tuple
+
+        :rtype: List
+        :returns: A list of ((chunk_x, chunk_y), position) tuples.
+
+        """
+        offset_x = int(offset[0])
+        offset_y = int(offset[1])
+        width, height = screen.get_size()
+
+        first_x = max(0, -offset_x // self.chunk_pixels[0])
+        first_y = max(0, -offset_y // self.chunk_pixels[1])
+        last_x = min(self.chunk_count[0] - 1, (width - offset_x - 1) // self.chunk_pixels[0])
+        last_y = min(self.chunk_count[1] - 1, (height - offset_y - 1) // self.chunk_pixels[1])
+
+        visible = []
+        for chunk_x in xrange(first_x, last_x + 1):
+            for chunk_y in xrange(first_y, last_y + 1):
+                visible.append(((chunk_x, chunk_y),
+                                (chunk_x * self.chunk_pixels[0] + offset_x,
+                                 chunk_y * self.chunk_pixels[1] + offset_y)))
+
+        return visible
+
+
+    def draw_layer(self, screen, offset, layer):
+        """Draws all visible chunks of a single layer to the screen, baking any of them
+        that are new or have had tiles change since they were last drawn.
+
+        :param screen: The pygame surface to draw to.
+        :param offset: The (global_x, global_y) offset of the map on the screen.
+        :param layer: The layer to draw. Layer 0 is the combined ground layers.
+
+        :type screen: pygame.Surface
+        :type offset: Tuple
+        :type layer: Integer
+
+        :rtype: None
+        :returns: None
+
+        """
+        # Maps with fewer than four layers have nothing to draw above the ground.
+        if layer not in self.chunks:
+            return
+
+        chunks = self.chunks[layer]
+        for chunk, position in self.visible_chunks(screen, offset):
+            if chunk not in self.baked:
+                self.bake_chunk(chunk)
+
+            surface = chunks.get(chunk)
+            if surface is not None:
+                screen.blit(surface, position)
+
+
+    def draw_ground(self, screen, offset):
+        """Draws the ground layers (1-3) that appear beneath the player.
+
+        :param screen: The pygame surface to draw to.
+        :param offset: The (global_x, global_y) offset of the map on the screen.
+
+        :type screen: pygame.Surface
+        :type offset: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.draw_layer(screen, offset, 0)
+
+
+    def draw_medium(self, screen, offset):
+        """Draws layer 4, which appears above the player's body but below the player's head.
+
+        :param screen: The pygame surface to draw to.
+        :param offset: The (global_x, global_y) offset of the map on the screen.
+
+        :type screen: pygame.Surface
+        :type offset: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.draw_layer(screen, offset, MEDIUM_LAYER)
+
+
+    def draw_high(self, screen, offset):
+        """Draws every layer above layer 4 over the player and NPCs, lowest layer first.
+
+        :param screen: The pygame surface to draw to.
+        :param offset: The (global_x, global_y) offset of the map on the screen.
+
+        :type screen: pygame.Surface
+        :type offset: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        for layer in self.layers:
+            if layer > MEDIUM_LAYER:
+                self.draw_layer(screen, offset, layer)
@@ -351,6 +351,8 @@ class Menu(UserInterface):
 
         """
         
+        self.track_dirty(self.dirty_signature(draw_borders, fill_background))
+
         # Draw the background box
         if fill_background:
             # If a background image was specified, draw that. Otherwise, fill it in with the menu
@@ -388,6 +390,51 @@ class Menu(UserInterface):
                  self.pos_y + self.size_y ))
 
         
+    def dirty_signature(self, draw_borders, fill_background):
+        """Returns a value that changes whenever the menu would be drawn differently. This
+        is used to decide whether the menu's area of the screen needs to be updated. Menus
+        that draw content which isn't described by their attributes should override this and
+        return None so they are redrawn every frame.
+
+        :param draw_borders: Whether or not the borders are being drawn.
+        :param fill_background: Whether or not the background is being filled.
+
+        :type draw_borders: Boolean
+        :type fill_background: Boolean
+
+        :rtype: Tuple
+        :returns: A tuple describing how the menu looks.
+
+        """
+        # Surfaces are compared by identity. Keeping them in the signature, rather than
+        # their ids, means a replaced image can't be mistaken for the one it replaced.
+        return (self.pos_x, self.pos_y, self.size_x, self.size_y, draw_borders,
+                fill_background, self.color, self.background,
+                tuple(sorted(self.border.items())))
+
+
+    def track_dirty(self, signature):
+        """Reports the area of the screen covered by this menu and its borders, so the
+        display is only updated when the menu changes.
+
+        :param signature: A value describing what was drawn. See
+            :meth:`dirty_signature`.
+
+        :type signature: Tuple
+
+        :rtype: None
+        :returns: None
+
+        """
+        left = self.border["left"].get_width()
+        top = self.border["top"].get_height()
+        rect = (self.pos_x - left, self.pos_y - top,
+                self.size_x + left + self.border["right"].get_width(),
+                self.size_y + top + self.border["bottom"].get_height())
+
+        prepare.DIRTY_RECTS.track(self, rect, signature)
+
+
     def draw_text(self, text=None, pos_x=None, pos_y=None, justify="left", align=None, font_size=None, font_color=None):
         """Draws text to the current menu object. If the text exceeds the window size, it will
         autowrap. To place text on a new line, put TWO newline characters (\\n)  in your text.
@@ -436,6 +483,9 @@ class Menu(UserInterface):
             pos_y = pos_y + self.pos_y
         if text == None:
             text = self.text
+
+        self.track_dirty(("text", text, pos_x, pos_y, justify, align, font_size,
+                          font_color, self.font_color, self.font))
             
         # Set up our font that we're going to use, including size, color, etc.
         font = self.font
@@ -798,6 +848,9 @@ class Menu(UserInterface):
         if self.selected_menu_item > len(self.menu_items) - 1:
             self.selected_menu_item = len(self.menu_items) - 1
 
+        self.track_dirty(("items", list(textlist), columns, pos_x, pos_y, align,
+                          autoline_spacing, paging, self.selected_menu_item,
+                          tuple(self.menu_icons), self.font))
         
         # Do nothing if the text list is empty
         if not textlist:
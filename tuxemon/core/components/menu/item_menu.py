@@ -111,6 +111,12 @@ class ItemMenu(Menu):
             (self.backpack['surface'].get_height() * 1.2)
         
         
+    def dirty_signature(self, draw_borders, fill_background):
+        # The item list and description come from the player's inventory, so always
+        # update this menu.
+        return None
+
+
     def draw(self, draw_borders=True, fill_background=False):
         
         # We can call the draw function from our parent "Menu" class, and also draw
@@ -127,6 +127,12 @@ class MonsterMenu(Menu):
 
         self.selected_monster = None
 
+    def dirty_signature(self, draw_borders, fill_background):
+        # Monster slots and sprites come from the player's party, so always update
+        # this menu.
+        return None
+
+
     def draw(self, draw_borders=False, fill_background=False):
         
         # We can call the draw function from our parent "Menu" class, and also draw
@@ -21,6 +21,11 @@ class SaveMenu(Menu):
         self.first_run = True
 
 
+    def dirty_signature(self, draw_borders, fill_background):
+        # Save slots are read from disk while drawing, so always update this menu.
+        return None
+
+
     def draw(self):
 
         # We can call the draw function from our parent "Menu" class, and also draw
@@ -31,22 +31,47 @@
 
 import logging
 import pygame
-import os
 import sys
 import pprint
 import random
+import threading
 from . import pyganim
+from . import battle
 from . import db
 from . import fusion
+from . import resources
+from . import sprite_cache
 
 # Create a logger for optional handling of debug messages.
 logger = logging.getLogger(__name__)
 logger.debug("components.monster successfully imported")
 
 # Load the monster database
-monsters = db.JSONDatabase()
-monsters.load("monster")
-monsters.load("technique")
+monsters = db.get_database()
+
+
+def species_field(field, default, sprite=None):
+    """Returns a read-only property of a Monster that comes from its species record.
+
+    :param field: The field of the monster database record.
+    :param default: The value to use when the monster has no species.
+    :param sprite: For the sprite paths, the name of the sprite in the record's "sprites".
+
+    :type field: String
+    :type default: Object
+    :type sprite: String
+
+    :rtype: property
+    :returns: The property.
+
+    """
+    def get(self):
+        if self.species is None:
+            return default
+        if sprite:
+            return self.species[field][sprite]
+        return self.species[field]
+    return property(get, doc="The %s of the monster's species." % (sprite or field))
 
 
 # class definition for first active tuxemon to use in combat:
@@ -54,42 +79,62 @@ class Monster(object):
     """A class for a Tuxemon monster object. This class acts as a skeleton for
     a Tuxemon, fetching its details from a database.
 
+    Monsters keep their own state in slots instead of a __dict__, since the player can
+    keep a great many of them. The base data that every monster of the same kind shares,
+    such as the stat modifiers, moveset and sprite paths, is read from the monster's
+    species record in the database instead of being copied. The fusion body and the
+    sprite images are only created when the monster is fused or drawn.
+
     :param: None
 
     **Example:**
 
-    >>> bulbatux = Monster()
-    >>> bulbatux.load_from_db("Bulbatux")
-    >>> pprint.pprint(bulbatux.__dict__)
-        {'attack': 10,
-         'attack_modifier': [u'1', u'1.1', u'1.2'],
-         'body': <core.components.fusion.Body instance at 0x1607638>,
-         'defense': u'1,1.1,1.2',
-         'defense_modifier': [u'1', u'1.1', u'1.2'],
-         'hp': 30,
-         'hp_modifier': [u'0.9', u'1', u'1.1'],
+    >>> bamboon = Monster()
+    >>> bamboon.load_from_db("Bamboon")
+    >>> pprint.pprint(bamboon.__getstate__())
+        {'attack': 60,
+         'current_hp': 50,
+         'defense': 7,
+         'experience_give_modifier': 2,
+         'experience_required_modifier': 25,
+         'hp': 50,
          'level': 0,
          'monster_id': 1,
-         'moves': [<__main__.Technique instance at 0x160b4d0>],
-         'name': u'Bulbatux',
-         'special_attack': 9,
-         'special_attack_modifier': [u'1', u'1.1', u'1.2'],
-         'special_defense': 8,
-         'special_defense_modifier': [u'1', u'1.1', u'1.2'],
-         'speed': 7,
-         'speed_modifier': [u'1', u'1.1', u'1.2'],
-         'status': 'Normal',
-         'type1': u'grass',
-         'type2': u'poison',
-         'experience_give_modifier': 3,
-         'experience_required_modifier': 55}
-    
+         'moves': [<core.components.monster.Technique object at 0x7f0e3c1c8d50>, ...],
+         'name': u'Bamboon',
+         'species': 1,
+         ...}
+    >>> bamboon.hp_modifier
+    (0.9, 1.0, 1.1)
+
     """
+    __slots__ = ("name", "monster_id", "species", "level", "hp", "current_hp", "attack",
+                 "defense", "speed", "special_attack", "special_defense", "moves",
+                 "experience_give_modifier", "experience_required_modifier",
+                 "total_experience", "type1", "type2", "status", "status_damage",
+                 "status_turn", "state", "_body", "_sprites")
+
+    hp_modifier = species_field("hp_mod", (0, 0, 0))
+    attack_modifier = species_field("attack_mod", (0, 0, 0))
+    defense_modifier = species_field("defense_mod", (0, 0, 0))
+    speed_modifier = species_field("speed_mod", (0, 0, 0))
+    special_attack_modifier = species_field("special_attack_mod", (0, 0, 0))
+    special_defense_modifier = species_field("special_defense_mod", (0, 0, 0))
+    weight = species_field("weight", 0)
+
+    # The techniques this kind of monster can learn, with the level they are learned at.
+    moveset = species_field("moveset", ())
+
+    # The paths of the monster's sprite images.
+    front_battle_sprite = species_field("sprites", "", "battle1")
+    back_battle_sprite = species_field("sprites", "", "battle2")
+    menu_sprite = species_field("sprites", "", "menu1")
 
     def __init__(self):
 
         self.name = ""          # The display name of the Tuxemon
         self.monster_id = 0
+        self.species = None     # The monster's record in the monster database.
         self.level = 0
         self.hp = 0
         self.current_hp = 0
@@ -99,14 +144,7 @@ class Monster(object):
         self.special_attack = 0
         self.special_defense = 0
         self.moves = []         # A list of technique objects. Used in combat.
-        self.moveset = []       # A list of possible technique objects.
-
-        self.hp_modifier = [0,0,0]
-        self.attack_modifier = [0,0,0]
-        self.defense_modifier = [0,0,0]
-        self.speed_modifier = [0,0,0]
-        self.special_attack_modifier = [0,0,0]
-        self.special_defense_modifier = [0,0,0]
+
         self.experience_give_modifier = 0
         self.experience_required_modifier = 0
         self.total_experience = 0
@@ -117,23 +155,62 @@ class Monster(object):
         self.status = "Normal"
         self.status_damage = 0
         self.status_turn = 0
-        
-        self.weight = 0
 
         # The tuxemon's state is used for various animations, etc. For example
         # a tuxemon's state might be "attacking" or "fainting" so we know when
         # to play the animations for those states.
         self.state = ""
 
-        # A fusion body object that contains the monster's face and body
-        # sprites, as well as color scheme.
-        self.body = fusion.Body()
-        
-        # Set up our sprites.
-        self.sprites = {}
-        self.front_battle_sprite = ""
-        self.back_battle_sprite  = ""
-        self.menu_sprite = ""
+        # The fusion body and sprite images, which are created when first used.
+        self._body = None
+        self._sprites = None
+
+
+    @property
+    def body(self):
+        """A fusion body object that contains the monster's face and body sprites, as well
+        as color scheme. It is created the first time it is used."""
+        if self._body is None:
+            self._body = fusion.Body()
+        return self._body
+
+
+    @body.setter
+    def body(self, body):
+        self._body = body
+
+
+    @property
+    def sprites(self):
+        """The monster's sprite images by name, filled in by :meth:`load_sprites`."""
+        if self._sprites is None:
+            self._sprites = {}
+        return self._sprites
+
+
+    @sprites.setter
+    def sprites(self, sprites):
+        self._sprites = sprites
+
+
+    def __getstate__(self):
+        """Returns the monster's state for pickling. The species is stored by its id and
+        the sprite images are left out, since they are loaded again when needed."""
+        state = {}
+        for name in self.__slots__:
+            if name != "_sprites" and hasattr(self, name):
+                state[name] = getattr(self, name)
+        if self.species is not None:
+            state["species"] = self.species["id"]
+        return state
+
+
+    def __setstate__(self, state):
+        self._sprites = None
+        for name, value in state.items():
+            setattr(self, name, value)
+        if self.species is not None:
+            self.species = monsters.database['monster'][self.species]
 
 
     def load_from_db(self, name):
@@ -150,14 +227,15 @@ class Monster(object):
         
         **Examples:**
 
-        >>> bulbatux = Monster()
-        >>> bulbatux.load_from_db("Bulbatux")
+        >>> bamboon = Monster()
+        >>> bamboon.load_from_db("Bamboon")
 
         """
 
         # Look up the monster by name and set the attributes in this instance
         results = monsters.lookup(name)
 
+        self.species            = results
         self.name               = results["name"]
         self.monster_id         = results["id"]
         self.hp                 = results["hp_base"]
@@ -168,12 +246,6 @@ class Monster(object):
         self.special_attack     = results["special_attack_base"]
         self.special_defense    = results["special_defense_base"]
 
-        self.hp_modifier        = results["hp_mod"]
-        self.attack_modifier    = results["attack_mod"]
-        self.defense_modifier   = results["defense_mod"]
-        self.speed_modifier     = results["speed_mod"]
-        self.special_attack_modifier = results["special_attack_mod"]
-        self.special_defense_modifier = results["special_defense_mod"]
         self.experience_give_modifier = results["exp_give_mod"]
         self.experience_required_modifier = results["exp_req_mod"]
 
@@ -182,25 +254,17 @@ class Monster(object):
             self.type2          = results["types"][1]
         else:
             self.type2          = None
-        
-        self.weight             = results['weight']
-                
-        # Look up the moves that this monster can learn AND LEARN THEM.
-        for move in results["moveset"]:
-            self.moveset.append(move)
+
+        # Learn the moves that this monster can learn.
+        for move in self.moveset:
             if move['level_learned'] >= self.level:
                 technique = Technique(id=move['technique_id'])
                 self.learn(technique)
 
-        # Look up the monster's sprite image paths
-        self.front_battle_sprite = results['sprites']['battle1']
-        self.back_battle_sprite = results['sprites']['battle2']
-        self.menu_sprite = results['sprites']['menu1']
-
 
     def load_sprite_from_db(self):
-        """Looks up the path to the monster's battle sprites so they can be
-        loaded as pygame surfaces.
+        """Looks up the monster's species by its monster_id, which gives the path to the
+        monster's battle sprites so they can be loaded as pygame surfaces.
 
         :param: None
 
@@ -209,12 +273,7 @@ class Monster(object):
 
         """
 
-        # Look up the monster's sprite image paths
-        results = monsters.lookup_sprite(self.monster_id)
-
-        self.front_battle_sprite = results["sprite_battle1"]
-        self.back_battle_sprite = results["sprite_battle2"]
-        self.menu_sprite = results["sprite_menu1"]
+        self.species = monsters.database['monster'][self.monster_id]
 
 
     def learn(self, technique):
@@ -302,7 +361,8 @@ class Monster(object):
         self.total_experience = self.experience_required_modifier * self.level ** 3
 
     def load_sprites(self, scale):
-        """Loads the monster's sprite images as Pygame surfaces.
+        """Loads the monster's sprite images as Pygame surfaces. The images come from
+        the shared sprite cache, so monsters of the same kind share one copy of each.
 
         :param scale: Amount to scale the sprite when loading the image.
         :type scale: Integer
@@ -319,44 +379,156 @@ class Monster(object):
         if len(self.sprites):
             return True
 
-        self.sprites["front"] = pygame.image.load(self.front_battle_sprite).convert_alpha()
-        self.sprites["back"] = pygame.image.load(self.back_battle_sprite).convert_alpha()
-        self.sprites["menu"] = pygame.image.load(self.menu_sprite).convert_alpha()
-
-        for key, value in self.sprites.items():
-            self.sprites[key] = pygame.transform.scale(value, (value.get_width() * scale,
-                                                               value.get_height() * scale))
+        self.sprites["front"] = sprite_cache.cache.load(self.front_battle_sprite, scale)
+        self.sprites["back"] = sprite_cache.cache.load(self.back_battle_sprite, scale)
+        self.sprites["menu"] = sprite_cache.cache.load(self.menu_sprite, scale)
 
         return False
 
 
+class TechniqueData(object):
+    """The definition of a technique from the technique database. Every monster that knows
+    a technique shares the same definition, which is built once per technique id by
+    :func:`technique_data` and can't be changed.
+
+    **Example:**
+
+    >>> technique_data(name="Poison Sting")
+    <TechniqueData 2 Poison Sting>
+
+    """
+    __slots__ = ("tech_id", "name", "category", "type1", "type2", "power", "effect",
+                 "animation", "images", "sfx")
+
+    def __init__(self, tech_id, name, category, type1, type2, power, effect, animation,
+                 images, sfx):
+        for field, value in zip(self.__slots__, (tech_id, name, category, type1, type2,
+                                                 power, effect, animation, images, sfx)):
+            object.__setattr__(self, field, value)
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Technique definitions are shared and can't be changed")
+
+
+    def __delattr__(self, name):
+        raise AttributeError("Technique definitions are shared and can't be changed")
+
+
+    def __reduce__(self):
+        # Only the id is saved, so unpickling gives back the shared definition.
+        if self is DEFAULT_TECHNIQUE:
+            return "DEFAULT_TECHNIQUE"
+        return (technique_data, (None, self.tech_id))
+
+
+    def __repr__(self):
+        return "<TechniqueData %s %s>" % (self.tech_id, self.name)
+
+
+    @classmethod
+    def from_record(cls, results):
+        """Builds a technique definition from its technique database record.
+
+        :param results: The technique's record.
+        :type results: Dictionary
+
+        :rtype: core.components.monster.TechniqueData
+        :returns: The technique definition.
+
+        """
+        types = results["types"]
+        animation = results["animation"]
+
+        # The animation sprites that will be used for this technique
+        images = resources.index.frames(resources.TECHNIQUE_ANIMATIONS, animation)
+
+        # The sound effect for this technique
+        sfx_directory = "resources/sounds/technique/"
+
+        return cls(results["id"], results["name"], results["category"], types[0],
+                   types[1] if len(types) > 1 else None, results["power"],
+                   tuple(results["effects"]), animation, images,
+                   sfx_directory + results["sfx"])
+
+
+# The definition a Technique has before one is loaded.
+DEFAULT_TECHNIQUE = TechniqueData(0, "Pound", "attack", "Normal", None, 1, (), None, (),
+                                  None)
+
+# Technique definitions that have been built, by technique id.
+TECHNIQUES = {}
+TECHNIQUES_LOCK = threading.Lock()
+
+
+def technique_data(name=None, id=None):
+    """Returns the shared definition of a technique, building it from the technique
+    database the first time it is needed.
+
+    :param name: The name of the technique.
+    :param id: The id of the technique, used if no name is given.
+
+    :type name: String
+    :type id: Integer
+
+    :rtype: core.components.monster.TechniqueData
+    :returns: The technique definition.
+
+    """
+    if name:
+        results = monsters.lookup(name, table="technique")
+    else:
+        results = monsters.database['technique'][id]
+
+    data = TECHNIQUES.get(results["id"])
+    if data is None:
+        with TECHNIQUES_LOCK:
+            data = TECHNIQUES.get(results["id"])
+            if data is None:
+                data = TECHNIQUES[results["id"]] = TechniqueData.from_record(results)
+    return data
+
+
+def shared(field):
+    """Returns a read-only property of a Technique that comes from its definition."""
+    return property(lambda self: getattr(self.data, field),
+                    doc="The %s of the technique's definition." % field)
+
+
+
 class Technique(object):
     """A technique object is a particular skill that tuxemon monsters can use
     in battle.
 
+    The technique's name, power, effects, animation and so on come from its
+    :class:`TechniqueData`, which is shared by every monster that knows the technique.
+    Only the state of this monster's copy of the technique is kept here.
+
     **Example:**
 
     >>> poison_tech = Technique("Poison Sting")
-    >>> pprint.pprint(poison_tech.__dict__)
-        {'category': u'special',
-         'effect': [u'poison', u'damage'],
-         'name': u'Poison Sting',
-         'power': 40,
-         'tech_id': 2,
-         'type1': u'Poison',
-         'type2': None}
+    >>> poison_tech.data
+    <TechniqueData 2 Poison Sting>
+    >>> poison_tech.power, poison_tech.effect
+    (40, (u'damage', u'poison'))
 
     """
+    tech_id = shared("tech_id")
+    name = shared("name")
+    category = shared("category")
+    type1 = shared("type1")
+    type2 = shared("type2")
+    power = shared("power")
+    effect = shared("effect")
+    animation = shared("animation")
+    images = shared("images")
+    sfx = shared("sfx")
+
+    __slots__ = ("data",)
 
     def __init__(self, name=None, id=None):
 
-        self.name = "Pound"
-        self.tech_id = 0
-        self.category = "attack"
-        self.type1 = "Normal"
-        self.type2 = None
-        self.power = 1
-        self.effect = []
+        self.data = DEFAULT_TECHNIQUE
 
         # If a name of the technique was provided, autoload it.
         if name or id:
@@ -364,8 +536,8 @@ class Technique(object):
 
 
     def load(self, name, id):
-        """Loads and sets this technique's attributes from the technique
-        database. The technique is looked up in the database by name or id.
+        """Sets this technique's definition from the technique database. The technique is
+        looked up in the database by name or id.
 
         :param name: The name of the technique to look up in the monster
             database.
@@ -379,40 +551,27 @@ class Technique(object):
         
         **Examples:**
 
-        >>> 
+        >>> technique = Technique()
+        >>> technique.load(None, 2)
+        >>> technique.name
+        u'Poison Sting'
 
         """
 
-        if name:
-            results = monsters.lookup(name, table="technique")
-        elif id:
-            results = monsters.database['technique'][id]
+        self.data = technique_data(name, id)
 
-        self.name = results["name"]
-        self.tech_id = results["id"]
-        self.category = results["category"]
 
-        self.type1 = results["types"][0]
-        if len(results['types']) > 1:
-            self.type2 = results["types"][1]
-        else:
-            self.type2 = None
-
-        self.power = results["power"]
-        self.effect = results["effects"]
+    def __getstate__(self):
+        """Returns the technique's state for pickling."""
+        return {"data": self.data}
 
-        # Load the animation sprites that will be used for this technique
-        self.animation = results["animation"]
-        self.images = []
-        animation_dir = "resources/animations/technique/"
-        directory = sorted(os.listdir(animation_dir))
-        for image in directory:
-            if self.animation and image.startswith(self.animation):
-                self.images.append(animation_dir + image)
 
-        # Load the sound effect for this technique
-        sfx_directory = "resources/sounds/technique/"
-        self.sfx = sfx_directory + results["sfx"]
+    def __setstate__(self, state):
+        # Saves from before definitions were shared kept every field of the technique.
+        if "data" in state:
+            self.data = state["data"]
+        else:
+            self.data = technique_data(state["name"])
 
 
     def use(self, user, target):
@@ -468,20 +627,15 @@ class Technique(object):
         # ((2 * user.level / 7) * user.attack * self.power) / target.defense) / 50) +2) * stab_bonus) * type_modifiers/10) * random.randrange(217, 255))/255
 
         if self.category == "physical":
-            level_modifier = ((2 * user.level) / 7.)
-            attack_modifier = user.attack * self.power
-
-            damage = ((level_modifier * attack_modifier) / float(target.defense)) / 50.
-            target.current_hp -= int(damage)
+            damage = battle.damage(user.level, self.power, user.attack, target.defense)
+            target.current_hp -= damage
 
         elif self.category == "special":
-            level_modifier = ((2 * user.level) / 7.)
-            attack_modifier = user.special_attack * self.power
-
-            damage = ((level_modifier * attack_modifier) / float(target.special_defense)) / 50.
-            target.current_hp -= int(damage)
+            damage = battle.damage(user.level, self.power, user.special_attack,
+                                   target.special_defense)
+            target.current_hp -= damage
 
-        print self.name, "Damage:", int(damage)
+        logger.debug("%s damage: %i", self.name, damage)
 
 
     def poison(self, user, target):
@@ -506,18 +660,91 @@ class Technique(object):
                 target.status_turn = 0
             target.status_damage = self.power
 
+def footprint(value, seen=None):
+    """Adds up the memory used by an object and everything it owns, such as a monster and
+    its moves. Objects shared with other monsters, like database records, technique
+    definitions, strings and numbers, are not counted.
+
+    :param value: The object to measure.
+    :param seen: The ids of objects that have already been counted.
+
+    :type value: Object
+    :type seen: Set
+
+    :rtype: Integer
+    :returns: The size in bytes.
+
+    **Examples:**
+
+    >>> bamboon = Monster()
+    >>> bamboon.load_from_db("Bamboon")
+    >>> footprint(bamboon)
+    1024
+
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen or value is None or \
+            isinstance(value, (basestring, int, long, float, db.Record, TechniqueData, type)):
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        children = value.keys() + value.values()
+    elif isinstance(value, (list, tuple, set)):
+        children = list(value)
+    else:
+        children = []
+        if hasattr(value, "__dict__"):
+            children.append(value.__dict__)
+        for name in getattr(type(value), "__slots__", ()):
+            children.append(getattr(value, name, None))
+
+    for child in children:
+        size += footprint(child, seen)
+    return size
+
+
+def measure_memory(count=1000):
+    """Creates a number of monsters, as if they were kept in storage, and measures how
+    much memory each one uses.
+
+    :param count: How many monsters to create.
+
+    :type count: Integer
+
+    :rtype: Tuple
+    :returns: The bytes used per monster before and after its fusion body and sprite
+        dictionary are created.
+
+    """
+    stored = []
+    for index in range(count):
+        tuxemon = Monster()
+        tuxemon.load_from_db("Bamboon")
+        stored.append(tuxemon)
+
+    compact = sum(footprint(tuxemon) for tuxemon in stored) / count
+    for tuxemon in stored:
+        tuxemon.body
+        tuxemon.sprites
+    displayed = sum(footprint(tuxemon) for tuxemon in stored) / count
+    return compact, displayed
+
+
 if __name__ == "__main__":
     mytuxemon = Monster()
-    mytuxemon.load_from_db("Bulbatux")
+    mytuxemon.load_from_db("Bamboon")
     mytuxemon.level = 5
     othertux = Monster()
-    othertux.load_from_db("Bulbatux")
+    othertux.load_from_db("Bamboon")
     othertux.level = 5
 
     pound_tech = Technique("Pound")
     poison_tech = Technique("Poison Sting")
 
-    pprint.pprint(poison_tech.__dict__)
+    pprint.pprint(poison_tech.data)
 
     #pound_tech.load("Pound")
 
@@ -530,7 +757,12 @@ if __name__ == "__main__":
 
     print ""
     print "MyTux"
-    pprint.pprint(mytuxemon.__dict__)
+    pprint.pprint(mytuxemon.__getstate__())
     print ""
     print "OtherTux"
-    pprint.pprint(othertux.__dict__)
+    pprint.pprint(othertux.__getstate__())
+
+    compact, displayed = measure_memory()
+    print ""
+    print "Memory per stored monster: %d bytes" % compact
+    print "With its fusion body and sprites created: %d bytes" % displayed
@@ -158,18 +158,8 @@ class Player(object):
         
         """
 
-        # Create a temporary set of tile coordinates for NPCs. We'll use this to check for
-        # collisions.
-        npc_positions = set()
-        
-        # Get all the NPC's tile positions so we can check for collisions.
-        for npc in game.npcs:
-            npc_pos_x = int(round(npc.tile_pos[0]))
-            npc_pos_y = int(round(npc.tile_pos[1]))
-            npc_positions.add( (npc_pos_x, npc_pos_y) )
-        
-        # Combine our map collision tiles with our npc collision positions
-        collision_set = game.collision_map.union(npc_positions)
+        # The map's collision grid also holds the tiles that NPCs are standing on.
+        collision_set = game.collision_map
             
         # Round the player's tile position to an integer value. We test for collisions based on
         # an integer value.
@@ -385,10 +375,11 @@ class Player(object):
 
         :param player_pos: An (x, y) list of the player's current tile position. Must be an
             integer.
-        :param collision_set: A set() object of (x, y) coordinates that are collidable.
+        :param collision_set: A set() object or core.components.collision.CollisionGrid of
+            (x, y) coordinates that are collidable.
         
         :type player_pos: List
-        :type collision_set: Set
+        :type collision_set: Set or core.components.collision.CollisionGrid
 
         :rtype: List
         :returns: A list indicating what tiles relative to the player are collision tiles.
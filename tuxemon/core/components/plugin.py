@@ -30,7 +30,9 @@
 #
 
 from yapsy.PluginManager import PluginManager
-from pprint import pformat, pprint
+from pprint import pformat
+import imp
+import json
 import logging
 import os
 import inspect
@@ -46,6 +48,63 @@ log_hdlr.setFormatter(logging.Formatter("%(asctime)s - %(name)s - "
                                         "%(levelname)s - %(message)s"))
 plugin_logger.addHandler(log_hdlr)
 
+# The file in each plugin folder that lists the folder's plugin methods, and the version of
+# its format. Manifests with a different version are rebuilt.
+MANIFEST = "plugin_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def depends_on(*inputs):
+    """A decorator for event condition methods that declares which parts of the game their
+    result depends on. The event engine only checks a declared condition again when one of
+    its inputs has changed, and reuses its last result otherwise. Conditions without a
+    declaration are checked every time, so only declare conditions that have no side
+    effects.
+
+    :param inputs: The names of the inputs the condition reads. See
+        core.components.event.INPUTS for the available names. A condition with no inputs
+        always returns the same result.
+    :type inputs: String
+
+    :rtype: Function
+    :returns: A decorator that marks the condition method.
+
+    **Example**
+
+    >>> class Player(IPlugin):
+    ...     @plugin.depends_on("player_tile")
+    ...     def player_at(self, game, condition):
+    ...         ...
+    """
+    def decorator(method):
+        method.inputs = frozenset(inputs)
+        method.side_effect_free = True
+        return method
+    return decorator
+
+
+def side_effect_free(method):
+    """A decorator for event condition methods that only read the game and never change it.
+    The event engine may check these conditions in a different order than the map lists
+    them, so that cheap conditions that often fail are checked first. Conditions declared
+    with :func:`depends_on` are side effect free already.
+
+    :param method: The condition method.
+    :type method: Function
+
+    :rtype: Function
+    :returns: The same method, marked as side effect free.
+
+    **Example**
+
+    >>> class Npc(IPlugin):
+    ...     @plugin.side_effect_free
+    ...     def facing_npc(self, game, condition):
+    ...         ...
+    """
+    method.side_effect_free = True
+    return method
+
 
 def load_directory(plugin_folder):
     """Loads and imports a directory of plugins.
@@ -78,17 +137,205 @@ def get_available_methods(plugin_manager):
     >>> plugins = core.components.plugin.load_directory("core/components/menu")
     {'player_facing': <module 'player_facing' from 'core/components/event/player_facing.pyc'>}
     >>> core.components.plugin.get_available_methods(plugins)
-    {'do_nothing': {'method': <function do_nothing at 0x7f20e1bec398>,
-                    'module': 'player_facing'},
-     'player_facing': {'method': <function player_facing at 0x7f20e1bec320>,
-                       'module': 'player_facing'}}
+    {'do_nothing': {'inputs': None,
+                    'method': <function do_nothing at 0x7f20e1bec398>,
+                    'module': 'player_facing',
+                    'side_effect_free': False,
+                    'signature': None},
+     'player_facing': {'inputs': frozenset(['facing']),
+                       'method': <function player_facing at 0x7f20e1bec320>,
+                       'module': 'player_facing',
+                       'side_effect_free': True,
+                       'signature': <core.components.event.arguments.Signature object>}}
     """
     methods = {}
     for plugin in plugin_manager.getAllPlugins():
         items = inspect.getmembers(plugin.plugin_object, predicate=inspect.ismethod)
-        pprint(items)
         for method in items:
-            methods[method[0]] = {"method": method[1], "module": plugin.name}
+            methods[method[0]] = method_details(method[1], plugin.name)
 
-    pprint(methods)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Available plugin methods:\n" + pformat(methods))
     return methods
+
+
+def method_details(method, module):
+    """Returns what the rest of the game needs to know about a plugin method.
+
+    :param method: The bound plugin method.
+    :param module: The name of the plugin it belongs to.
+    :type method: Method
+    :type module: String
+
+    :rtype: Dictionary
+    :returns: The method and the details declared with the decorators in this module.
+
+    """
+    return {"method": method, "module": module,
+            "inputs": getattr(method, "inputs", None),
+            "signature": getattr(method, "signature", None),
+            "side_effect_free": getattr(method, "side_effect_free", False)}
+
+
+def plugin_files(plugin_folder):
+    """Returns the modification times of the files in a plugin folder that the folder's
+    manifest depends on.
+
+    :param plugin_folder: The folder to look for plugin files.
+    :type plugin_folder: String
+
+    :rtype: Dictionary
+    :returns: The modification time of each plugin description and module file by name.
+
+    """
+    files = {}
+    for name in os.listdir(plugin_folder):
+        if name.endswith(".yapsy-plugin") or name.endswith(".py"):
+            files[name] = os.path.getmtime(os.path.join(plugin_folder, name))
+    return files
+
+
+def load_methods(plugin_folder):
+    """Gets the available methods of a directory of plugins, using the folder's manifest
+    when it is up to date. The manifest lists which plugin module and class each method is
+    found in, so the plugins don't have to be discovered and imported at startup. Each
+    plugin module is imported the first time one of its methods is used.
+
+    If a plugin file has been added, removed or changed since the manifest was written,
+    the plugins are loaded with :func:`load_directory` and the manifest is written again.
+
+    :param plugin_folder: The folder to look for plugin files.
+    :type plugin_folder: String
+
+    :rtype: core.components.plugin.MethodRegistry
+    :returns: The plugin methods by name, in the format of :func:`get_available_methods`.
+
+    **Example**
+
+    >>> methods = core.components.plugin.load_methods("core/components/event/conditions")
+    >>> "player_facing" in methods
+    True
+    >>> methods["player_facing"]["module"]
+    'Player'
+    """
+    files = plugin_files(plugin_folder)
+    manifest_path = os.path.join(plugin_folder, MANIFEST)
+
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("version") == MANIFEST_VERSION and manifest.get("files") == files:
+            logger.debug("Using plugin manifest " + manifest_path)
+            return MethodRegistry(plugin_folder, manifest["methods"])
+    except (IOError, OSError, ValueError) as e:
+        logger.debug("Unable to read plugin manifest " + manifest_path + ": " + str(e))
+
+    # The manifest is missing or out of date, so find the plugins the slow way.
+    plugin_manager = load_directory(plugin_folder)
+    methods = {}
+    entries = {}
+    for plugin in plugin_manager.getAllPlugins():
+        plugin_class = plugin.plugin_object.__class__
+        module_file = os.path.basename(plugin.path) + ".py"
+        items = inspect.getmembers(plugin.plugin_object, predicate=inspect.ismethod)
+        for name, method in items:
+            methods[name] = method_details(method, plugin.name)
+            entries[name] = {"module": plugin.name,
+                             "file": module_file,
+                             "class": plugin_class.__name__}
+
+    manifest = {"version": MANIFEST_VERSION, "files": files, "methods": entries}
+    try:
+        temporary = manifest_path + ".tmp"
+        with open(temporary, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+
+        # Windows won't rename over an existing file.
+        if os.name == "nt" and os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        os.rename(temporary, manifest_path)
+    except (IOError, OSError) as e:
+        logger.warning("Unable to write plugin manifest " + manifest_path + ": " + str(e))
+
+    return MethodRegistry(plugin_folder, entries, methods)
+
+
+
+class MethodRegistry(object):
+    """The methods of a folder of plugins, by name. Works like the dictionary returned by
+    :func:`get_available_methods`, except that a plugin's module is only imported when one
+    of its methods is first looked up.
+
+    :param plugin_folder: The folder the plugins are in.
+    :param entries: The manifest entry of each method, giving the plugin name, module file
+        and class that the method is found in.
+    :param methods: Method details that have already been loaded, by name.
+
+    :type plugin_folder: String
+    :type entries: Dictionary
+    :type methods: Dictionary
+
+    """
+    def __init__(self, plugin_folder, entries, methods=None):
+        self.plugin_folder = plugin_folder
+        self.entries = entries
+        self.methods = methods or {}
+
+        # Plugin objects that have been created, by module file.
+        self.plugin_objects = {}
+
+
+    def __contains__(self, name):
+        return name in self.entries
+
+
+    def __getitem__(self, name):
+        details = self.methods.get(name)
+        if details is None:
+            details = self.methods[name] = self.resolve(name)
+        return details
+
+
+    def __iter__(self):
+        return iter(self.entries)
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def get(self, name, default=None):
+        if name not in self.entries:
+            return default
+        return self[name]
+
+
+    def keys(self):
+        return list(self.entries)
+
+
+    def items(self):
+        return [(name, self[name]) for name in self.entries]
+
+
+    def resolve(self, name):
+        """Imports the plugin that a method belongs to and looks the method up.
+
+        :param name: The name of the method.
+        :type name: String
+
+        :rtype: Dictionary
+        :returns: The method's details, as in :func:`get_available_methods`.
+
+        """
+        entry = self.entries[name]
+        plugin_object = self.plugin_objects.get(entry["file"])
+        if plugin_object is None:
+            path = os.path.join(self.plugin_folder, entry["file"])
+            module_name = os.path.splitext(path)[0].replace(os.sep, "_").replace("/", "_")
+            logger.debug("Importing plugin " + path)
+            module = imp.load_source(module_name, path)
+            plugin_object = getattr(module, entry["class"])()
+            self.plugin_objects[entry["file"]] = plugin_object
+
+        return method_details(getattr(plugin_object, name), entry["module"])
@@ -0,0 +1,269 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# core.components.profiler Frame phase timing.
+#
+#
+
+import collections
+import logging
+import timeit
+
+import pygame
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.profiler successfully imported")
+
+# The most accurate timer available on this platform.
+timer = timeit.default_timer
+
+
+class Scope(object):
+    """Times the code inside a "with" block and records it under a phase name. Scopes are
+    created by :meth:`Profiler.scope`.
+
+    :param profiler: The profiler to record the time with.
+    :param name: The name of the phase being timed.
+
+    :type profiler: core.components.profiler.Profiler
+    :type name: String
+
+    """
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+
+    def __enter__(self):
+        self.start = timer()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.name, timer() - self.start)
+        return False
+
+
+
+class Profiler(object):
+    """Keeps rolling timing figures for each named phase of a frame, such as drawing the map
+    or checking event conditions, and can draw them over the game.
+
+    Only the last few frames of each phase are kept, so the figures follow what the game is
+    doing right now. All times are reported in milliseconds.
+
+    :param window: The number of most recent timings to keep for each phase.
+
+    :type window: Integer
+
+    **Examples:**
+
+    >>> profiler = Profiler()
+    >>> with profiler.scope("map_drawing"):
+    ...     world.map_drawing()
+    >>> profiler.stats("map_drawing")
+    {'count': 1, 'max': 2.1, 'mean': 2.1, 'min': 2.1, 'p95': 2.1}
+
+    """
+    def __init__(self, window=120):
+        self.window = window
+        self.enabled = True
+        self.visible = False
+
+        # Recent timings in seconds by phase name, in the order the phases first ran.
+        # >>> self.timings
+        # OrderedDict([('event_loop', deque([0.0002, 0.0001])), ...])
+        self.timings = collections.OrderedDict()
+
+        # The overlay is only redrawn a few times a second so it can be read.
+        self.font = None
+        self.overlay = None
+        self.overlay_time = 0.0
+        self.overlay_interval = 0.5
+        self.overlay_position = (4, 4)
+
+
+    def scope(self, name):
+        """Returns a context manager that times its block as the given phase.
+
+        :param name: The name of the phase.
+
+        :type name: String
+
+        :rtype: core.components.profiler.Scope
+        :returns: A scope to use in a "with" statement.
+
+        """
+        return Scope(self, name)
+
+
+    def record(self, name, seconds):
+        """Records how long a phase took this frame. Timings are ignored while the profiler
+        is disabled.
+
+        :param name: The name of the phase.
+        :param seconds: How long the phase took, in seconds.
+
+        :type name: String
+        :type seconds: Float
+
+        :rtype: None
+        :returns: None
+
+        """
+        if not self.enabled:
+            return
+
+        timings = self.timings.get(name)
+        if timings is None:
+            timings = self.timings[name] = collections.deque(maxlen=self.window)
+        timings.append(seconds)
+
+
+    def stats(self, name):
+        """Returns the rolling figures of a single phase.
+
+        :param name: The name of the phase.
+
+        :type name: String
+
+        :rtype: Dictionary or None
+        :returns: The count, min, mean, p95 and max of the phase in milliseconds, or None if
+            the phase hasn't run yet.
+
+        """
+        timings = self.timings.get(name)
+        if not timings:
+            return None
+
+        ordered = sorted(timings)
+        count = len(ordered)
+        return {'count': count,
+                'min': ordered[0] * 1000.,
+                'mean': sum(ordered) * 1000. / count,
+                'p95': ordered[min(count - 1, int(count * 0.95))] * 1000.,
+                'max': ordered[-1] * 1000.}
+
+
+    def summary(self):
+        """Returns the rolling figures of every phase.
+
+        :param: None
+
+        :rtype: collections.OrderedDict
+        :returns: The figures from :meth:`stats` by phase name, in the order the phases
+            first ran.
+
+        **Examples:**
+
+        >>> profiler.summary()["world.map_drawing"]["p95"] < 5.0
+        True
+
+        """
+        summary = collections.OrderedDict()
+        for name in self.timings:
+            summary[name] = self.stats(name)
+        return summary
+
+
+    def reset(self):
+        """Forgets every timing that has been recorded.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.timings.clear()
+        self.overlay = None
+
+
+    def toggle(self):
+        """Shows or hides the overlay.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        self.visible = not self.visible
+        self.overlay = None
+
+
+    def draw(self, screen):
+        """Draws a table of the phase figures in the top left corner of the screen.
+
+        :param screen: The pygame surface to draw to.
+
+        :type screen: pygame.Surface
+
+        :rtype: pygame.Rect
+        :returns: The area of the screen that was drawn to.
+
+        """
+        now = timer()
+        if self.overlay is None or now - self.overlay_time >= self.overlay_interval:
+            self.overlay = self.render()
+            self.overlay_time = now
+
+        return screen.blit(self.overlay, self.overlay_position)
+
+
+    def render(self):
+        """Renders the table of phase figures onto a new surface.
+
+        :param: None
+
+        :rtype: pygame.Surface
+        :returns: The rendered overlay.
+
+        """
+        if self.font is None:
+            # A fixed width font keeps the columns lined up.
+            self.font = pygame.font.SysFont("monospace", 14)
+
+        lines = ["%-28s %7s %7s %7s %7s" % ("phase (ms)", "min", "mean", "p95", "max")]
+        for name, stats in self.summary().items():
+            lines.append("%-28s %7.2f %7.2f %7.2f %7.2f" % (
+                name[:28], stats['min'], stats['mean'], stats['p95'], stats['max']))
+
+        rendered = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        line_height = self.font.get_linesize()
+        width = max(text.get_width() for text in rendered) + 8
+        height = line_height * len(rendered) + 8
+
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+        for index, text in enumerate(rendered):
+            overlay.blit(text, (4, 4 + index * line_height))
+
+        return overlay
+
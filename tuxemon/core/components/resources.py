@@ -0,0 +1,145 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+#
+# core.components.resources Index of resource files.
+#
+#
+
+import bisect
+import logging
+import os
+import threading
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.resources successfully imported")
+
+# Where the frames of technique animations are found.
+TECHNIQUE_ANIMATIONS = "resources/animations/technique/"
+
+
+class ResourceIndex(object):
+    """Lists the files in resource directories once and keeps the sorted listings, so
+    finding the frames of an animation doesn't have to read the directory again each time.
+
+    Resource directories don't change while the game is running. Call :meth:`scan` at
+    startup to list the directories up front, or let them be listed the first time they are
+    used.
+
+    **Examples:**
+
+    >>> index = ResourceIndex()
+    >>> index.frames("resources/animations/technique/", "spike")
+    ('resources/animations/technique/spikes01.png', ..., 'resources/animations/technique/spikes07.png')
+
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # The sorted filenames in each directory, and the frames found for each prefix.
+        # >>> self.listings
+        # {'resources/animations/technique/': ['spikes01.png', 'spikes02.png', ...]}
+        # >>> self.prefixes
+        # {('resources/animations/technique/', 'spike'): ('resources/...spikes01.png', ...)}
+        self.listings = {}
+        self.prefixes = {}
+
+
+    def scan(self, directory):
+        """Lists a directory, replacing any listing that was kept for it.
+
+        :param directory: The directory to list.
+
+        :type directory: String
+
+        :rtype: List
+        :returns: The sorted filenames in the directory.
+
+        """
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError as e:
+            logger.warning("Unable to list resource directory " + directory + ": " + str(e))
+            names = []
+
+        with self.lock:
+            self.listings[directory] = names
+            for key in [key for key in self.prefixes if key[0] == directory]:
+                del self.prefixes[key]
+        return names
+
+
+    def files(self, directory):
+        """Returns the sorted filenames in a directory, listing it the first time.
+
+        :param directory: The directory.
+
+        :type directory: String
+
+        :rtype: List
+        :returns: The filenames, which must not be changed.
+
+        """
+        names = self.listings.get(directory)
+        if names is None:
+            names = self.scan(directory)
+        return names
+
+
+    def frames(self, directory, prefix):
+        """Returns the paths of the files in a directory whose names start with a prefix,
+        such as the frames of an animation.
+
+        :param directory: The directory, ending with a slash.
+        :param prefix: The start of the filenames.
+
+        :type directory: String
+        :type prefix: String
+
+        :rtype: Tuple
+        :returns: The paths, sorted by filename.
+
+        """
+        key = (directory, prefix)
+        paths = self.prefixes.get(key)
+        if paths is None:
+            names = self.files(directory)
+            paths = []
+            if prefix:
+                for name in names[bisect.bisect_left(names, prefix):]:
+                    if not name.startswith(prefix):
+                        break
+                    paths.append(directory + name)
+            paths = tuple(paths)
+            self.prefixes[key] = paths
+        return paths
+
+
+
+# The index shared by the whole game.
+index = ResourceIndex()
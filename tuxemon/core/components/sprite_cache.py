@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+#
+# core.components.sprite_cache Shared sprite images.
+#
+#
+
+import logging
+import weakref
+
+import pygame
+
+# Create a logger for optional handling of debug messages.
+logger = logging.getLogger(__name__)
+logger.debug("components.sprite_cache successfully imported")
+
+
+class SpriteCache(object):
+    """Loads sprite images and shares them between everything that shows the same image at
+    the same scale, such as every Bigfin in a session.
+
+    The cache only holds weak references to the images. An image stays loaded while any
+    monster or user interface element still holds it, and is dropped as soon as the last
+    one lets go of it, so the cache never keeps images that nothing is showing.
+
+    Shared images must not be drawn on or changed. Copy one first if it needs changing.
+
+    **Examples:**
+
+    >>> front = cache.load("resources/gfx/sprites/battle/bigfin-front.png", 2)
+    >>> front is cache.load("resources/gfx/sprites/battle/bigfin-front.png", 2)
+    True
+
+    """
+    def __init__(self):
+        # The loaded images by (path, scale).
+        self.surfaces = weakref.WeakValueDictionary()
+
+        # How many images were found in the cache and how many had to be loaded.
+        self.hits = 0
+        self.misses = 0
+
+
+    def load(self, path, scale=1):
+        """Returns an image converted for the display and scaled, loading it if no one is
+        using it at that scale yet.
+
+        :param path: The path to the image file.
+        :param scale: How many times larger to make the image.
+
+        :type path: String
+        :type scale: Integer
+
+        :rtype: pygame.Surface
+        :returns: The shared image.
+
+        """
+        key = (path, scale)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = pygame.image.load(path).convert_alpha()
+        if scale != 1:
+            surface = pygame.transform.scale(
+                surface, (surface.get_width() * scale, surface.get_height() * scale))
+
+        self.surfaces[key] = surface
+        return surface
+
+
+    def __len__(self):
+        return len(self.surfaces)
+
+
+
+# The cache shared by the whole game.
+cache = SpriteCache()
@@ -176,6 +176,24 @@ class UserInterface(object):
             else:
                 pos = self.position
             self.animation.blit(self.screen, pos)
+            self.track_dirty(pos)
+
+
+    def track_dirty(self, position):
+        """Reports the area this element was drawn to so the display is only updated when
+        it moves or its animation frame changes.
+
+        :param position: The [x, y] position the element was drawn at.
+        :type position: List
+
+        """
+        # The frame itself goes in the signature rather than its id, which could be reused
+        # by a new frame once the old one is freed.
+        frame = self.animation.getCurrentFrame()
+        prepare.DIRTY_RECTS.track(
+            self,
+            (position[0], position[1], frame.get_width(), frame.get_height()),
+            (tuple(position), self.animation.state, frame))
 
 
     def play(self):
@@ -84,6 +84,7 @@ class Bar(UserInterface):
 
         if self.visible and self.value > 0:
             self.animation.blit(self.screen, self.position)
+            self.track_dirty(self.position)
 
 
     def __setattr__(self, key, value):
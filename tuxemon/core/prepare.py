@@ -38,6 +38,10 @@ import pygame as pg
 from . import tools
 from .components import config
 from .components import player
+from .components import dirty
+from .components import map_cache
+from .components import profiler
+from .components import resources
 
 # Import the android module. If we can't import it, set it to None - this
 # lets us test it, and check to see if we want android-specific behavior.
@@ -97,6 +101,10 @@ def init():
     # can be called externally. E.g. "prepare.SCREEN", etc.    
     global SCREEN
     global SCREEN_RECT
+    global DIRTY_RECTS
+    global MAP_CACHE
+    global MAP_PREFETCHER
+    global PROFILER
     global JOYSTICKS
     global player1
     global FONTS
@@ -110,6 +118,23 @@ def init():
     SCREEN = pg.display.set_mode(SCREEN_SIZE, CONFIG.fullscreen, 32)
     SCREEN_RECT = SCREEN.get_rect()
 
+    # Keep track of the areas of the screen that change each frame so we only
+    # need to update those parts of the display.
+    DIRTY_RECTS = dirty.DirtyRects(SCREEN_RECT)
+
+    # Keep recently visited maps loaded so we don't need to parse them again.
+    MAP_CACHE = map_cache.MapCache(CONFIG.map_cache_size * 1024 * 1024)
+
+    # Load the maps we can teleport to in the background before we need them.
+    MAP_PREFETCHER = map_cache.MapPrefetcher(MAP_CACHE, TILE_SIZE)
+
+    # Time each phase of the frame so we can see where the frame budget goes.
+    PROFILER = profiler.Profiler()
+
+    # List the technique animation frames now, so monsters learning techniques later
+    # never have to read the directory.
+    resources.index.scan(resources.TECHNIQUE_ANIMATIONS)
+
     # Disable the mouse cursor visibility
     pg.mouse.set_visible(False)
 
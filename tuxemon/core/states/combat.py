@@ -39,9 +39,11 @@ import time
 
 from core import prepare
 from core import tools
+from core.components import battle
 from core.components import map
 from core.components import eztext
 from core.components import save
+from core.components import sprite_cache
 from core.components.ui import bar
 from core.components.ui import UserInterface
 
@@ -63,6 +65,10 @@ class Combat(tools._State):
     :type game: core.tools.Control
 
     """
+    # Combat is drawn entirely from tracked UI elements, menus and party icons, so
+    # only the areas that change need to be updated.
+    partial_updates = True
+
     def __init__(self, game):
 
         # Initiate our common state properties.
@@ -74,6 +80,7 @@ class Combat(tools._State):
         self.game = game                # Provide access to the scene manager.
         
         self.combat_type = None         # Can be either "monster" or "trainer"
+        self.battle = None              # Resolves the rules of the battle being shown.
 
         self.current_players = {'player': {}, 'opponent': {}}
         # If we detected the players' health change, we need to animate it.
@@ -113,18 +120,14 @@ class Combat(tools._State):
                 (surface.get_width() * prepare.SCALE, surface.get_height() * prepare.SCALE))
 
         # Load all the party icons to show how many monsters each player has.
+        # They are scaled to the game's scale and shared through the sprite cache.
         self.party_icons = {}
-        self.party_icons['Normal'] = pygame.image.load(
-            'resources/gfx/ui/icons/party/party_icon01.png').convert_alpha()
-        self.party_icons['Ailment'] = pygame.image.load(
-            'resources/gfx/ui/icons/party/party_icon02.png').convert_alpha()
-        self.party_icons['FNT'] = pygame.image.load(
-            'resources/gfx/ui/icons/party/party_icon03.png').convert_alpha()
-            
-        # Scale all the party icons based on the game's scale
-        for icon, surface in self.party_icons.items():
-            self.party_icons[icon] = pygame.transform.scale(surface,
-                (surface.get_width() * prepare.SCALE, surface.get_height() * prepare.SCALE))
+        self.party_icons['Normal'] = sprite_cache.cache.load(
+            'resources/gfx/ui/icons/party/party_icon01.png', prepare.SCALE)
+        self.party_icons['Ailment'] = sprite_cache.cache.load(
+            'resources/gfx/ui/icons/party/party_icon02.png', prepare.SCALE)
+        self.party_icons['FNT'] = sprite_cache.cache.load(
+            'resources/gfx/ui/icons/party/party_icon03.png', prepare.SCALE)
         
         # Bottom info menu
         self.info_menu = menu.Menu(game.screen, prepare.SCREEN_SIZE, game)
@@ -467,6 +470,20 @@ class Combat(tools._State):
                 # The starting position of the party UI will be open.
                 ui[party_bg].position = list(ui[party_bg].open_position)
 
+        # The battle engine resolves turns, damage, status and fainting. This state shows the
+        # events it returns.
+        player_dict = self.current_players['player']
+        opponent_dict = self.current_players['opponent']
+        self.battle = battle.Battle(
+            battle.Side("player", player_dict['player'].monsters,
+                        inventory=player_dict['player'].inventory, experience=True),
+            battle.Side("opponent", opponent_dict['player'].monsters,
+                        inventory=opponent_dict['player'].inventory),
+            game)
+        player_dict['side'], opponent_dict['side'] = self.battle.sides
+        for player_dict in self.current_players.values():
+            player_dict['side'].monster = player_dict['monster']
+
         import pprint
         pprint.pprint(ui)
 
@@ -482,6 +499,7 @@ class Combat(tools._State):
         """
         self.players = []
         self.combat_type = None
+        self.battle = None
         self.current_players = {'player': {}, 'opponent': {}}
         self.current_players['player']['health_changed'] = False
         self.current_players['opponent']['health_changed'] = False
@@ -639,6 +657,10 @@ class Combat(tools._State):
                         party_icon_surface = self.party_icons['Ailment']
                         
                     game.screen.blit(party_icon_surface, party_icon_position)
+                    prepare.DIRTY_RECTS.track(
+                        (player_name, "party_icon", monster_number),
+                        (party_icon_position, party_icon_surface.get_size()),
+                        party_icon_surface)
                     
                     monster_number += 1
 
@@ -819,7 +841,7 @@ class Combat(tools._State):
 
                     event_engine = self.game.event_engine
                     #self.game.event_engine.action.fadeout_music(self.game, [None, 1000])
-                    event_engine.actions["fadeout_music"]["method"](self.game, [None, 1000])
+                    event_engine.execute_action([("fadeout_music", "1000")], self.game)
                     #self.game.event_engine.action.teleport(self.game, parameters)
                     self.next = "WORLD"
                     self.done = True
@@ -900,13 +922,33 @@ class Combat(tools._State):
             party_ui.move(party_ui.closed_position, 0.5)
             print "Closed position for " + player_name + ":", party_ui.closed_position
 
-        # Determine which monster goes first based on the speed of the monsters.
-        if players['player']['monster'].speed >= players['opponent']['monster'].speed:
-            self.turn_order.append(players['player'])
-            self.turn_order.append(players['opponent'])
-        else:
-            self.turn_order.append(players['opponent'])
-            self.turn_order.append(players['player'])
+        # Let the battle engine decide which monster goes first based on the speed of the
+        # monsters.
+        for player_name, player_dict in players.items():
+            player_dict['side'].action = self.battle_action(player_dict)
+        for side in self.battle.turn_order():
+            self.turn_order.append(players[side.name])
+
+
+    def battle_action(self, player):
+        """Converts the action a player has decided on into the battle engine's form.
+
+        :param player: The player object dictionary whose action to convert.
+
+        :type player: Dictionary
+
+        :rtype: Dictionary or None
+        :returns: The action for core.components.battle.Side.action.
+
+        """
+        action = player['action']
+        if not action:
+            return None
+
+        # The monster menu sets the monster to switch to before the action phase starts.
+        if 'switch' in action:
+            return {'switch': player['monster']}
+        return action
 
 
     def action_phase_update(self):
@@ -1008,34 +1050,19 @@ class Combat(tools._State):
                     sound = mixer.Sound("resources/sounds/monster/1/faint.ogg")
                     sound.play()
 
-                    # Award experience to player if opponent's monster fainted
-                    if player_name == "opponent":
-                        # Aliases to make referencing monsters more concise
-                        player_monster = players['player']['monster']
-                        opponent_monster = players['opponent']['monster']
-                        # Give player's monster experience for faint of opponent monster
-                        xp = (opponent_monster.experience_give_modifier * opponent_monster.level) ** 3
-                        player_monster.give_experience(xp)
-                        logger.info("Monster gained experience: %i" % xp)
-
-                    # Check to see if the player has any more remaining monsters in their
-                    # party that haven't fainted.
-                    alive_monster_found = False
-                    for monster in player['player'].monsters:
-                        if monster.status != "FNT":
-                            alive_monster_found = True
-
-                    if alive_monster_found:
+                    # The battle engine has already awarded any experience and decided
+                    # whether the battle is over.
+                    if not self.battle.over:
                         logger.warning("Let the player choose his next monster!")
 
                     else:
-                        if player_name == "player":
+                        if self.battle.winner is players['opponent']['side']:
                             logger.info("YOU LOST!")
                             self.info_menu.text = "YOU LOST!"
                             self.info_menu.elapsed_time = 0.0
                             self.state = "lost"
 
-                        elif player_name == "opponent":
+                        else:
                             logger.info("YOU WON!")
                             self.info_menu.text = "YOU WON!"
                             self.info_menu.elapsed_time = 0.0
@@ -1050,8 +1077,7 @@ class Combat(tools._State):
             position_y = "3"
             parameters = [None, mapname + "," + position_x + "," + position_y]
 
-            fadeout_music = self.game.event_engine.actions["fadeout_music"]["method"]
-            fadeout_music(self.game, [None, 1000])
+            self.game.event_engine.execute_action([("fadeout_music", "1000")], self.game)
             #teleport = self.game.event_engine.actions["teleport"]["method"]
             #teleport(self.game, parameters)
 
@@ -1114,137 +1140,15 @@ class Combat(tools._State):
 
         """
         
-        screen = self.game.screen
-        
-        # If the player selected a technique, use the selected technique on the opposing monster.
-        if 'technique' in player['action']:
-
-            # Get the monster's last hp value before the damage is done
-            player['monster_last_hp'] = player['monster'].current_hp
-            player['opponent']['monster_last_hp'] = player['opponent']['monster'].current_hp
-
-            # Get the move that the player decided to use.
-            selected_move = player['action']['technique']
-            player['monster'].moves[selected_move].use(
-                user=player['monster'], target=player['opponent']['monster'])
-
-            # Display a dialog showing that we used a move
-            self.info_menu.text = "%s used %s!" % (player['monster'].name, 
-                                                   player['monster'].moves[selected_move].name)
-            self.info_menu.elapsed_time = 0.0
-
-            logger.info("Using " + player['monster'].moves[selected_move].name)
-            logger.info("Level: " + str(player['monster'].level))
-            logger.info("")
-            logger.info("Player monster HP: " + str(player['monster'].current_hp))
-            logger.info("Opponent monster HP: " + str(player['opponent']['monster'].current_hp))
-                
-            # If using this technique kills either the player's monster OR the opponent's
-            # monster, set their status to FUCKING DEAD.
-            if player['opponent']['monster'].current_hp <= 0:
-                player['opponent']['monster'].current_hp = 0
-                player['opponent']['monster'].status = 'FNT'
-                player['opponent']['monster'].state = "fainting"
-
-            if player['monster'].current_hp <= 0:
-                player['monster'].current_hp = 0
-                player['monster'].status = 'FNT'
-                player['monster'].state = "fainting"
-
-            # Make a tackle animation when a technique is used.
-            if player is self.current_players['player']:
-                monster_sprite = self.ui['player_monster_sprite']
-                tackle_delta = (10 * prepare.SCALE)
-
-                # Play the animation of the technique
-                images = player['monster'].moves[selected_move].images
-                self.ui['player_technique'] = UserInterface(images,
-                                                            self.ui['opponent_monster_sprite'].position,
-                                                            self.game.screen,
-                                                            animation_speed=0.1)
-                self.ui['player_technique'].play()
-
-            else:
-                monster_sprite = self.ui['opponent_monster_sprite']
-                tackle_delta = -(10 * prepare.SCALE)
-
-                # Play the animation of the technique
-                images = player['monster'].moves[selected_move].images
-                self.ui['opponent_technique'] = UserInterface(images,
-                                                            self.ui['player_monster_sprite'].position,
-                                                            self.game.screen,
-                                                            animation_speed=0.1)
-                self.ui['opponent_technique'].play()
-
-            tackle_destination = (monster_sprite.position[0] + tackle_delta,
-                                  monster_sprite.position[1])
-            monster_sprite.shake_once(tackle_destination, duration=0.2)
-            monster_sprite.tackled = True
-
-            # Play the technique's sound effect.
-            sound = mixer.Sound(player['monster'].moves[selected_move].sfx)
-            sound.play()
-
-        # If the player selected to use an item, use the item.
-        elif 'item' in player['action']:
-
-            # Get the monster's last hp value before the item is used, so we can animate
-            # their health in the main update loop.
-            player['monster_last_hp'] = player['monster'].current_hp
-            player['opponent']['monster_last_hp'] = player['opponent']['monster'].current_hp
-
-            # Get the item object from the player's inventory that the player decided to use
-            # and USE IT. For now, just target the player's current monster.
-            item_name = player['action']['item']['name']
-            player['player'].inventory[item_name]['item'].use(player['monster'], 
-                self.game)
-
-            # Display a dialog showing that we used an item
-            self.info_menu.text = "%s used %s on %s!" % (player['player'].name, 
-                item_name, player['monster'].name)
-
-            # Set the info menu timer to zero, so the menu will display for a short period of
-            # time.
-            self.info_menu.elapsed_time = 0.0       
-
-            logger.info("Using item!")
+        # Get the monsters' last hp values before the action is carried out, so we can animate
+        # their health in the main update loop.
+        player['monster_last_hp'] = player['monster'].current_hp
+        player['opponent']['monster_last_hp'] = player['opponent']['monster'].current_hp
 
-        elif 'switch' in player['action']:
-            for player_name, player_dict in self.current_players.items():
-                if player_dict['player'] == self.current_players['player']['player']:
-                    
-                    # Display switch message
-                    self.info_menu.text = "Go %s!" % (player['monster'].name)
-                    
-                    # Load new Tuxemon sprite
-                    self.load_monster_sprite(self.ui, screen, prepare.SCREEN_SIZE, player_name, player_dict)
-                    
-                    # Set new Tuxemon hp, name, and level
-                    self.set_hp_ui(player_name, player_dict)
-                    
-                    # Set the info menu timer to zero, so the menu will display for a short period of
-                    # time.
-                    self.info_menu.elapsed_time = 0.0
-                    
-                    # We're not the other player, so stop here
-                    break
-                elif player_dict['player'] == self.current_players['opponent']['player']:
-                    
-                    # Display switch message
-                    self.info_menu.text = "%s sent out %s!" % (player_name, player['monster'].name)
-                    
-                    # Load new Tuxemon sprite
-                    self.load_monster_sprite(self.ui, screen, prepare.SCREEN_SIZE, player_name, player_dict)
-                    
-                    # Set new Tuxemon hp, name, and level
-                    self.set_hp_ui(player_name, player_dict)
-                    
-                    # Set the info menu timer to zero, so the menu will display for a short period of
-                    # time.
-                    self.info_menu.elapsed_time = 0.0
-                    
-                    # We're not the other player, so stop here
-                    break
+        # Let the battle engine carry out the action, then show what happened.
+        player['side'].action = self.battle_action(player)
+        for event in self.battle.perform_action(player['side']):
+            self.show_event(event)
 
         # Remove the player's current decision in preparation for the next turn.
         player['action'] = None
@@ -1288,25 +1192,108 @@ class Combat(tools._State):
         # Get the monster's hp before resolving damage from status effects.
         player['monster_last_hp'] = player['monster'].current_hp
 
-        # If the player's monster was poisoned, make the monster take poison damage.
-        if player['monster'].status == 'Poisoned':
+        # Let the battle engine resolve the status effects, then show what happened.
+        for event in self.battle.status_check(player['side']):
+            self.show_event(event)
+
+
+    def show_event(self, event):
+        """Shows something that happened in the battle, such as a technique being used or a
+        monster fainting, with dialog, animations and sound.
+
+        :param event: The event returned by the battle engine.
+
+        :type event: core.components.battle.Event
+
+        :rtype: None
+        :returns: None
+
+        """
+        player = self.current_players[event.side.name]
+        monster = event.monster
+
+        if event.kind == battle.TECHNIQUE:
+            technique = event.value
+
+            # Display a dialog showing that we used a move
+            self.info_menu.text = "%s used %s!" % (monster.name, technique.name)
+            self.info_menu.elapsed_time = 0.0
+
+            logger.info("Using " + technique.name)
+            logger.info("Level: " + str(monster.level))
+
+            # Make a tackle animation when a technique is used.
+            if player is self.current_players['player']:
+                monster_sprite = self.ui['player_monster_sprite']
+                target_sprite = self.ui['opponent_monster_sprite']
+                tackle_delta = (10 * prepare.SCALE)
+            else:
+                monster_sprite = self.ui['opponent_monster_sprite']
+                target_sprite = self.ui['player_monster_sprite']
+                tackle_delta = -(10 * prepare.SCALE)
+
+            # Play the animation of the technique
+            technique_ui = event.side.name + '_technique'
+            self.ui[technique_ui] = UserInterface(technique.images,
+                                                  target_sprite.position,
+                                                  self.game.screen,
+                                                  animation_speed=0.1)
+            self.ui[technique_ui].play()
 
-            # Only take poison damage if we've been poisoned for longer than 1 turn.
-            if player['monster'].status_turn >= 1:
-                logger.info("  This monster is taking poison damage this turn.")
-                self.info_menu.text = "%s took poison damage!" % player['monster'].name
-                self.info_menu.elapsed_time = 0.0
-                player['monster_last_hp'] = player['monster'].current_hp
-                player['monster'].current_hp -= 10
+            tackle_destination = (monster_sprite.position[0] + tackle_delta,
+                                  monster_sprite.position[1])
+            monster_sprite.shake_once(tackle_destination, duration=0.2)
+            monster_sprite.tackled = True
 
-            # Keep track of how many turns this monster has been poisoned.
-            player['monster'].status_turn += 1
+            # Play the technique's sound effect.
+            sound = mixer.Sound(technique.sfx)
+            sound.play()
 
-        # If the player's HP drops below zero due to status effects, set them fainting. 
-        # Then we can animate the monster fainting based on this variable.
-        if player['monster'].current_hp <= 0:
-            player['monster'].status = 'FNT'
-            player['monster'].state = "fainting"
+        elif event.kind == battle.ITEM:
+            # Display a dialog showing that we used an item
+            self.info_menu.text = "%s used %s on %s!" % (player['player'].name,
+                event.value, monster.name)
+
+            # Set the info menu timer to zero, so the menu will display for a short period of
+            # time.
+            self.info_menu.elapsed_time = 0.0
+
+            logger.info("Using item!")
+
+        elif event.kind == battle.SWITCH:
+            player['monster'] = monster
+
+            # Display switch message
+            if player is self.current_players['player']:
+                self.info_menu.text = "Go %s!" % monster.name
+            else:
+                self.info_menu.text = "%s sent out %s!" % (player['player'].name, monster.name)
+
+            # Load new Tuxemon sprite
+            self.load_monster_sprite(self.ui, self.game.screen, prepare.SCREEN_SIZE,
+                                     event.side.name, player)
+
+            # Set new Tuxemon hp, name, and level
+            self.set_hp_ui(event.side.name, player)
+
+            # Set the info menu timer to zero, so the menu will display for a short period of
+            # time.
+            self.info_menu.elapsed_time = 0.0
+
+        elif event.kind == battle.HP:
+            logger.info("%s HP: %i -> %i" % (monster.name, event.value[0], event.value[1]))
+
+        elif event.kind == battle.POISON:
+            logger.info("  This monster is taking poison damage this turn.")
+            self.info_menu.text = "%s took poison damage!" % monster.name
+            self.info_menu.elapsed_time = 0.0
+
+        # Set the monster fainting, so we can animate it fainting in the update loop.
+        elif event.kind == battle.FAINT:
+            monster.state = "fainting"
+
+        elif event.kind == battle.EXPERIENCE:
+            logger.info("Monster gained experience: %i" % event.value)
 
 
     def load_monster_sprite(self, ui, screen, screen_size, player_name, player_dict):
@@ -1336,8 +1323,11 @@ class Combat(tools._State):
             elif player_name == "opponent":
                 monster_sprite = player_dict['monster'].front_battle_sprite
 
+            # Monsters of the same kind share one scaled copy of each sprite.
+            surface = sprite_cache.cache.load(monster_sprite, prepare.SCALE)
+
             self.player_mon_sprite = player_name + '_monster_sprite'
-            ui[self.player_mon_sprite] = UserInterface(monster_sprite, (0, 0), screen)
+            ui[self.player_mon_sprite] = UserInterface(surface, (0, 0), screen, scale=False)
             
             if player_name == "player":
                 ui[self.player_mon_sprite].position = [
@@ -41,7 +41,8 @@ import pprint
 from .. import tools, prepare
 from ..components import screen
 from ..components import config
-from ..components import map
+from ..components import map_renderer
+from ..components import collision
 from ..components import pyganim
 from ..components import player
 from ..components import event
@@ -56,6 +57,9 @@ logger = logging.getLogger(__name__)
 
 class World(tools._State):
 
+    # The world reports everything it draws, so only changed areas are updated.
+    partial_updates = True
+
     def __init__(self, game):
         # Initiate our common state properties.
         tools._State.__init__(self)
@@ -95,43 +99,12 @@ class World(tools._State):
             int(math.ceil(self.resolution[1] / self.tile_size[1]) + 1)]
         # self.visible_tiles = [5, 5]
 
-        # Create a new map instance
-        self.current_map = map.Map("resources/maps/%s" % prepare.CONFIG.starting_map)
-        self.tiles, self.collision_map, self.map_size = \
-            self.current_map.loadfile(self.tile_size)
-
-        # Create an empty collision_rectmap list which contains rectangle
-        # objects that we can test collision with
-        self.collision_rectmap = []
-
-        # Get the events actions and conditions from the current map
-        self.game.events = self.current_map.events
-
-        # Scale the loaded tiles if enabled
-        if prepare.CONFIG.scaling == "1":
-            x_pos = 0   # Here we need to keep track of the x index in list
-
-            # Loop through each row in the map. Each row is a list of Tile
-            # objects in that row.
-            for row in self.tiles:
-                # Here we need to keep track of the y index of the list within
-                # the row
-                y_pos = 0
-
-                # Now loop through each tile in the row and scale it
-                # accordingly.
-                for column in row:
-                    if column:
-                        layer_pos = 0
-                        for tile in column:
-                            tile["surface"] = \
-                                pygame.transform.scale(
-                                    tile["surface"],
-                                    (self.tile_size[0], self.tile_size[1]))
-                            self.tiles[x_pos][y_pos][layer_pos] = tile
-                            layer_pos += 1
-                    y_pos += 1
-                x_pos += 1
+        # Load the starting map, its events and its tiles.
+        self.load_map(prepare.CONFIG.starting_map)
+
+        # The map renderer and camera position used to draw the last frame. If either
+        # changes, the whole screen needs to be updated.
+        self.map_view = None
 
         # Set the world's current state. This is used for various functions.
         self.state = "World"
@@ -392,11 +365,6 @@ class World(tools._State):
         # Get a copy of the event engine from core.tools.Control.
         self.event_engine = self.game.event_engine
 
-        # Set the currently loaded map. This is needed because the event
-        # engine loads event conditions and event actions from the currently
-        # loaded map. If we change maps, we need to update this.
-        self.event_engine.current_map = self.current_map
-
         ######################################################################
         #                       Fullscreen Animations                        #
         ######################################################################
@@ -530,13 +498,21 @@ class World(tools._State):
         self.player1.tile_pos = (float((self.player1.position[0] - self.global_x)) / float(
             self.tile_size[0]), (float((self.player1.position[1] - self.global_y)) / float(self.tile_size[1])) + 1)
 
-        # Handle world events
-        self.map_drawing()
-        self.player_movement()
-        self.high_map_drawing()
-        self.midscreen_animations()
-        self.draw_menus()
-        self.fullscreen_animations()
+        # Handle world events. Each phase is timed so we can see which one is
+        # taking up the frame.
+        profiler = prepare.PROFILER
+        with profiler.scope("world.map_drawing"):
+            self.map_drawing()
+        with profiler.scope("world.player_movement"):
+            self.player_movement()
+        with profiler.scope("world.high_map_drawing"):
+            self.high_map_drawing()
+        with profiler.scope("world.midscreen_animations"):
+            self.midscreen_animations()
+        with profiler.scope("world.draw_menus"):
+            self.draw_menus()
+        with profiler.scope("world.fullscreen_animations"):
+            self.fullscreen_animations()
 
 
     def get_event(self, event):
@@ -642,6 +618,53 @@ class World(tools._State):
     ####################################################
     #                   Map Drawing                    #
     ####################################################
+    def load_map(self, mapname):
+        """Loads a map file from the maps directory and makes it the current map. The map's
+        tiles are scaled to the world's tile size and baked into chunks for drawing.
+
+        :param mapname: The file name of the map to load, relative to resources/maps/.
+
+        :type mapname: String
+
+        :rtype: None
+        :returns: None
+
+        **Examples:**
+
+        >>> world.load_map("pallet_town-room.tmx")
+
+        """
+        # Revisiting a map uses the copy that is already loaded if it hasn't changed.
+        cached = prepare.MAP_CACHE.get("resources/maps/" + mapname, self.tile_size)
+        self.current_map = cached.map
+        self.tiles = cached.tiles
+        self.map_size = cached.map_size
+
+        # The cached map is shared, so each visit gets its own grid for NPCs to stand in.
+        self.collision_map = collision.CollisionGrid(self.map_size, cached.collision_map)
+
+        # Get the events actions and conditions from the current map. Their arguments are
+        # parsed the first time the map is used, so a broken event fails to load here
+        # instead of in the middle of the game.
+        if cached.compiled_events is None:
+            cached.compiled_events = self.game.event_engine.compile_events(cached.events)
+        self.game.events = cached.compiled_events
+
+        # Set the currently loaded map. This is needed because the event
+        # engine loads event conditions and event actions from the currently
+        # loaded map. It shares the world's map instead of parsing the file again.
+        self.game.event_engine.current_map = self.current_map
+
+        # Start loading the maps this one leads to, and stop loading the ones the last
+        # map led to.
+        prepare.MAP_PREFETCHER.prefetch(self.current_map)
+
+        # Draw the map layers from chunks that are baked as they come on screen, so a
+        # cached map isn't baked all over again on every visit.
+        self.map_renderer = map_renderer.MapRenderer(
+            self.tiles, self.map_size, self.tile_size)
+
+
     def map_drawing(self):
         """Draws the map tiles in a layered order.
 
@@ -652,45 +675,15 @@ class World(tools._State):
 
         """
 
-        # Reset the higher layer tiles so we can draw them over the player
-        self.highlayer_tiles = []
-        self.medlayer_tiles = []
-
-        starting_tile_x = - \
-            (self.global_x / self.tile_size[0])
-             # How many tiles over we have to draw the first tile
-        starting_tile_y = - \
-            (self.global_y / self.tile_size[
-             1])  # How many tiles down we have to draw the first tile
-        self.tile_buffer = 2  # This is how many tiles we should draw past the visible region
-
-        # Loop through the number of visible tiles and draw only the tiles that
-        # are visible
-        for row in xrange(starting_tile_x - self.tile_buffer, starting_tile_x + self.visible_tiles[0]):
-            if row > 0:
-
-                for column in xrange(starting_tile_y - self.tile_buffer, starting_tile_y + self.visible_tiles[1]):
-                    if row > 0:
-                        try:
-                            if self.tiles[row][column]:		# Check to see if a tile exists at this coordinates
-                                for tile in self.tiles[row][column]:
-                                    # Append the high level tiles to its own
-                                    # list to be drawn over the player. Tiles on layer 4 will be drawn
-                                    # above the player's body, but below the player's head.
-                                    if tile["layer"] == 4:
-                                        self.medlayer_tiles.append(tile)
-                                    elif tile["layer"] > 4:
-                                        self.highlayer_tiles.append(tile)
-                                    else:
-                                        self.screen.blit(tile["surface"],
-                                                        (tile[
-                                                            "position"][0] + self.global_x,
-                                                         tile["position"][1] + self.global_y))
-
-                        # If we try drawing a tile that is out of index range, that means we
-                        # reached the end of the list, so just break the loop
-                        except IndexError:
-                            break
+        # Draw the pre-baked ground layer chunks that overlap the screen. Tiles on layer 4
+        # and up are drawn later, over the player.
+        self.map_renderer.draw_ground(self.screen, (self.global_x, self.global_y))
+
+        # If the camera scrolled or we changed maps, everything on screen moved.
+        map_view = (self.global_x, self.global_y, self.map_renderer)
+        if map_view != self.map_view:
+            prepare.DIRTY_RECTS.invalidate()
+            self.map_view = map_view
 
         # We need to keep track of the global_x/y that we used to draw the bottom tiles so we use
         # the same values for the higher layer tiles. We have to do this because when we draw the
@@ -719,20 +712,6 @@ class World(tools._State):
         else:
             self.player1.moverate = self.player1.walkrate
 
-        # Check to see if the player is colliding with anything
-        self.collision_rectmap = []
-        for item in self.collision_map:
-            self.collision_rectmap.append(
-                pygame.Rect(
-                    (item[0] * self.tile_size[0]) + self.global_x,
-                    (item[1] * self.tile_size[0]) + self.global_y, self.tile_size[0], self.tile_size[1]))
-
-        # Add any NPC's to the collision rectangle map. We use this to see if
-        # the player is colliding or not
-        for npc in self.npcs:
-            self.collision_rectmap.append(
-                pygame.Rect(npc.position[0], npc.position[1], self.tile_size[0], self.tile_size[1]))
-
         # Set the global_x/y when the player moves around
         self.global_x, self.global_y = self.player1.move(
             self.screen, self.tile_size, self.time_passed_seconds, (self.global_x, self.global_y), self)
@@ -749,6 +728,11 @@ class World(tools._State):
             npc.tile_pos = (float((npc.position[0] - self.global_x)) / float(
                 self.tile_size[0]), (float((npc.position[1] - self.global_y)) / float(self.tile_size[1])) + 1)
 
+            # Keep the NPC's tile in the collision grid so nothing can walk into it. This
+            # only changes the grid when the NPC has moved onto a different tile.
+            self.collision_map.place(
+                npc, int(round(npc.tile_pos[0])), int(round(npc.tile_pos[1])))
+
             # If the NPC is not visible on the screen, don't draw him
             if self.screen_rect.colliderect(npc.rect):
                 npc.move(self.screen, self.tile_size, self.time_passed_seconds, (
@@ -760,25 +744,16 @@ class World(tools._State):
 
             # Draw the bottom part of the NPC.
             npc.draw(self.screen, "bottom")
+            self.track_character(npc)
 
         # Draw the bottom half of the player
         self.player1.draw(self.screen, "bottom")
+        self.track_character(self.player1)
 
         # Draw the medium level tiles. These tiles will appear above the player's body,
         # but below the player's head.
-        for tile in self.medlayer_tiles:
-
-            # Get the rectangle object of the tile that is going to be drawn so
-            # we can see if it is going to be outside the visible screen area
-            # or not
-            tile_rect = pygame.Rect(tile["surface"].get_width(), tile["surface"].get_height(), tile[
-                                    "position"][0] + self.global_x, tile["position"][1] + self.global_y)
-
-            # If any part of the tile overlaps with the screen, then draw it to
-            # the screen
-            if self.screen_rect.colliderect(tile_rect):
-                self.screen.blit(
-                    tile["surface"], (tile["position"][0] + self.orig_global_x, tile["position"][1] + self.orig_global_y))
+        self.map_renderer.draw_medium(
+            self.screen, (self.orig_global_x, self.orig_global_y))
 
         # Draw the top half of our NPCs above layer 4.
         for npc in self.npcs:
@@ -793,30 +768,29 @@ class World(tools._State):
         """
 
         # Draw the high level tiles
-        for tile in self.highlayer_tiles:
-
-            # Get the rectangle object of the tile that is going to be drawn so
-            # we can see if it is going to be outside the visible screen area
-            # or not
-            tile_rect = pygame.Rect(tile["surface"].get_width(), tile["surface"].get_height(), tile[
-                                    "position"][0] + self.global_x, tile["position"][1] + self.global_y)
-
-            # If any part of the tile overlaps with the screen, then draw it to
-            # the screen
-            if self.screen_rect.colliderect(tile_rect):
-                self.screen.blit(
-                    tile["surface"], (tile["position"][0] + self.orig_global_x, tile["position"][1] + self.orig_global_y))
+        self.map_renderer.draw_high(
+            self.screen, (self.orig_global_x, self.orig_global_y))
 
         # Draw any map animations over everything.
         for animation_name, animation in self.game.animations.items():
             position = self.get_pos_from_tilepos(animation["position"])
             position = (position[0] + self.global_x_diff, position[1] + self.global_y_diff)
             animation["animation"].blit(self.screen, position)
+            prepare.DIRTY_RECTS.track(
+                ("animation", animation_name),
+                (position, animation["animation"].getMaxSize()),
+                (position, animation["animation"].state,
+                 animation["animation"].currentFrameNum))
 
         # If we want to draw the collision map for debug purposes
         if prepare.CONFIG.collision_map == "1":
-            for item in self.collision_rectmap:
-                self.screen.blit(self.collision_tile, (item[0], item[1]))
+            prepare.DIRTY_RECTS.invalidate()
+            for item in self.collision_map.tiles():
+                self.screen.blit(self.collision_tile, (
+                    (item[0] * self.tile_size[0]) + self.global_x,
+                    (item[1] * self.tile_size[1]) + self.global_y))
+            for npc in self.npcs:
+                self.screen.blit(self.collision_tile, (npc.position[0], npc.position[1]))
 
             if self.player1.direction["up"]:
                 self.screen.blit(self.collision_tile, (
@@ -831,6 +805,29 @@ class World(tools._State):
                 self.screen.blit(self.collision_tile, (
                     self.player1.position[0] + self.tile_size[0], self.player1.position[1]))
 
+    def track_character(self, character):
+        """Reports the area of the screen a player or NPC was drawn to, so the display is
+        only updated when it moves, turns or animates.
+
+        :param character: The player or NPC that was drawn.
+
+        :type character: core.components.player.Player
+
+        :rtype: None
+        :returns: None
+
+        """
+        # Walking animations change frames on their own, so always update them.
+        if character.moving:
+            signature = None
+        else:
+            signature = (tuple(character.position), character.facing)
+
+        prepare.DIRTY_RECTS.track(
+            character,
+            (character.position, character.standing["front"].get_size()),
+            signature)
+
     ####################################################
     #                 Menu Functions                   #
     ####################################################
@@ -983,17 +980,11 @@ class World(tools._State):
                 self.cinema_state = "on"
 
             # Draw the cinema bars
-            self.screen.blit(
-                self.cinema_top['surface'], self.cinema_top['position'])
-            self.screen.blit(
-                self.cinema_bottom['surface'], self.cinema_bottom['position'])
+            self.draw_cinema_bars()
 
         elif self.cinema_state == "on":
             # Draw the cinema bars
-            self.screen.blit(
-                self.cinema_top['surface'], self.cinema_top['position'])
-            self.screen.blit(
-                self.cinema_bottom['surface'], self.cinema_bottom['position'])
+            self.draw_cinema_bars()
 
         elif self.cinema_state == "turning off":
 
@@ -1013,10 +1004,22 @@ class World(tools._State):
                 self.cinema_state = "off"
 
             # Draw the cinema bars
-            self.screen.blit(
-                self.cinema_top['surface'], self.cinema_top['position'])
-            self.screen.blit(
-                self.cinema_bottom['surface'], self.cinema_bottom['position'])
+            self.draw_cinema_bars()
+
+    def draw_cinema_bars(self):
+        """Draws the black cinema bars at the top and bottom of the screen.
+
+        :param: None
+
+        :rtype: None
+        :returns: None
+
+        """
+        for name, bar in (("top", self.cinema_top), ("bottom", self.cinema_bottom)):
+            self.screen.blit(bar['surface'], bar['position'])
+            prepare.DIRTY_RECTS.track(
+                ("cinema_bar", name), (bar['position'], bar['surface'].get_size()),
+                tuple(bar['position']))
 
     ####################################################
     #         Full Screen Animations Functions         #
@@ -1042,6 +1045,11 @@ class World(tools._State):
             # Stop player map movement
             self.menu_blocking = True
 
+        # Fullscreen transitions change every pixel on the screen.
+        if (self.battle_transition_in_progress or self.start_transition
+                or self.start_transition_back):
+            prepare.DIRTY_RECTS.invalidate()
+
         if self.battle_transition_in_progress:
             logger.info("Battle transition!")
 
@@ -1119,37 +1127,11 @@ class World(tools._State):
                 self.delayed_facing = None
 
             if "resources/maps/" + self.delayed_mapname != self.current_map.filename:
-                self.current_map = map.Map(
-                    "resources/maps/" + self.delayed_mapname)
-                self.event_engine.current_map = map.Map(
-                    "resources/maps/" + self.delayed_mapname)
-                self.tiles, self.collision_map, self.map_size = self.current_map.loadfile(
-                    self.tile_size)
-                self.game.events = self.current_map.events
+                self.load_map(self.delayed_mapname)
 
                 # Clear out any existing NPCs
                 self.npcs = []
 
-                # Scale the loaded tiles if enabled
-                if prepare.CONFIG.scaling == "1":
-                    x_pos = 0        # Here we need to keep track of the x index of the list
-                    # Loop through each row in the map. Each row is a list of
-                    # Tile objects in that row.
-                    for row in self.tiles:
-                        y_pos = 0       # Here we need to keep track of the y index of the list within the row
-                        # Now loop through each tile in the row and scale it
-                        # accordingly.
-                        for column in row:
-                            if column:
-                                layer_pos = 0
-                                for tile in column:
-                                    tile["surface"] = pygame.transform.scale(
-                                        tile["surface"], (self.tile_size[0], self.tile_size[1]))
-                                    self.tiles[x_pos][y_pos][layer_pos] = tile
-                                    layer_pos += 1
-                            y_pos += 1
-                        x_pos += 1
-
             self.delayed_teleport = False
 
         # Replace this SAVE_THIS_FUCKING_SCREEN with the value of the blit of
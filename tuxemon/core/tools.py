@@ -40,6 +40,7 @@ from .components import controller
 from .components import player
 from .components import cli
 from .components import event
+from .components import profiler
 from .components import rumble
 
 # Try and import networking if it is available.
@@ -95,6 +96,10 @@ class Control(object):
         self.clock = pg.time.Clock()
         self.fps = 60.0
         self.show_fps = True
+
+        # If set, every frame advances the game by this many seconds instead of
+        # the real time that passed. Used to make benchmark runs repeatable.
+        self.fixed_time_delta = None
         self.current_time = 0.0
         self.keys = pg.key.get_pressed()
         self.state_dict = {}
@@ -113,9 +118,16 @@ class Control(object):
         # Set up our game's event engine which executes actions based on
         # conditions defined in map files.
         self.event_engine = event.EventEngine()
+        self.event_engine.metrics.enabled = bool(self.config.event_metrics)
         self.event_conditions = {}
         self.event_actions = {}
-        self.event_persist = {}
+
+        # Keep track of the parts of the screen that change each frame.
+        from core import prepare
+        self.dirty_rects = prepare.DIRTY_RECTS
+
+        # Time each phase of the frame. F6 shows the timings over the game.
+        self.profiler = prepare.PROFILER
 
         # Set up a variable that will keep track of currently playing music.
         self.current_music = {"status": "stopped", "song": None}
@@ -238,6 +250,12 @@ class Control(object):
             self.exit = True
         elif self.state.done:
             self.flip_state()
+            self.dirty_rects.invalidate()
+
+        # States that don't report what they draw need the whole screen updated.
+        if not self.state.partial_updates:
+            self.dirty_rects.invalidate()
+
         self.state.update(self.screen, self.keys, self.current_time, dt)
         if self.config.controller_overlay == "1":
             self.controller.draw(self)
@@ -264,7 +282,8 @@ class Control(object):
 
     def event_loop(self):
         """Process all events and pass them down to current State.  The F5 key
-        globally turns on/off the display of FPS in the caption
+        globally turns on/off the display of FPS in the caption, and the F6 key
+        turns on/off the frame profiler overlay.
 
         :param None:
 
@@ -282,6 +301,7 @@ class Control(object):
 
             elif event.type == pg.KEYDOWN:
                 self.toggle_show_fps(event.key)
+                self.toggle_profiler(event.key)
 
             if self.config.controller_overlay == "1":
                 self.mouse_pos = pg.mouse.get_pos()
@@ -556,6 +576,24 @@ class Control(object):
                 pg.display.set_caption(self.caption)
 
 
+    def toggle_profiler(self, key):
+        """Press f6 to turn on/off the overlay showing how long each phase of
+        the frame takes.
+
+        :param key: A pygame key event from pygame.event.get()
+
+        :type key: PyGame Event
+
+        :rtype: None
+        :returns: None
+
+        """
+
+        if key == pg.K_F6:
+            self.profiler.toggle()
+            self.dirty_rects.invalidate()
+
+
     def main(self):
         """Initiates the main game loop. Since we are using Asteria networking
         to handle network events, we pass this core.tools.Control instance to
@@ -574,6 +612,9 @@ class Control(object):
         while not self.exit:
             self.main_loop()
 
+        if self.event_engine.metrics.enabled:
+            self.event_engine.metrics.dump()
+
 
     def main_loop(self):
         """Main loop for entire game. This method gets execute every frame
@@ -594,19 +635,41 @@ class Control(object):
                 android.wait_for_resume()
 
         # Get the amount of time that has passed since the last frame.
-        time_delta = self.clock.tick(self.fps)/1000.0
+        if self.fixed_time_delta:
+            self.clock.tick()
+            time_delta = self.fixed_time_delta
+        else:
+            time_delta = self.clock.tick(self.fps)/1000.0
         self.time_passed_seconds = time_delta
-        self.event_loop()
+        frame_start = profiler.timer()
+
+        with self.profiler.scope("event_loop"):
+            self.event_loop()
+
+        # Carry on with any event actions that take more than one frame.
+        with self.profiler.scope("actions"):
+            self.event_engine.update(self, time_delta)
 
         # Run our event engine which will check to see if game conditions
         # are met and run an action associated with that condition.
         self.event_data = {}
-        self.event_engine.check_conditions(self)
+        with self.profiler.scope("check_conditions"):
+            self.event_engine.check_conditions(self)
         logger.debug("Event Data:" + str(self.event_data))
 
-        # Draw and update our display
-        self.update(time_delta)
-        pg.display.update()
+        # Draw and update our display. Only the areas of the screen that changed
+        # this frame are sent to the display.
+        with self.profiler.scope("update"):
+            self.update(time_delta)
+        if self.profiler.visible:
+            self.dirty_rects.track("profiler", self.profiler.draw(self.screen))
+        with self.profiler.scope("display_update"):
+            dirty_rects = self.dirty_rects.end_frame()
+            if dirty_rects is None:
+                pg.display.update()
+            elif dirty_rects:
+                pg.display.update(dirty_rects)
+        self.profiler.record("frame", profiler.timer() - frame_start)
         if self.show_fps:
             fps = self.clock.get_fps()
             with_fps = "{} - {:.2f} FPS".format(self.caption, fps)
@@ -621,7 +684,14 @@ class _State(object):
     must be overloaded in the child class.  startup and cleanup need to be
     overloaded when there is data that must persist between States.
 
+    States that report everything they draw to prepare.DIRTY_RECTS can set
+    partial_updates to True so that only the changed parts of the screen are
+    updated each frame.
+
     """
+    # Whether this state reports the areas of the screen it changes.
+    partial_updates = False
+
     def __init__(self):
         self.start_time = 0.0
         self.current_time = 0.0
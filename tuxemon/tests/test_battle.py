@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Tuxemon
+# Copyright (C) 2014, William Edwards <shadowapex@gmail.com>,
+#                     Benjamin Bean <superman2k5@gmail.com>
+#
+# This file is part of Tuxemon.
+#
+# Tuxemon is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Tuxemon is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Tuxemon.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contributor(s):
+#
+# William Edwards <shadowapex@gmail.com>
+#
+#
+# tests.test_battle Compares the batch battle functions with the scalar ones.
+#
+#
+
+
+import random
+import unittest
+
+from core.components import battle
+
+
+class Fighter(object):
+    """The parts of a monster that Battle.status_check uses."""
+    __slots__ = ("current_hp", "status", "status_turn", "experience_give_modifier", "level")
+
+
+class BatchTest(unittest.TestCase):
+    """Checks that the batch functions give exactly the same results as the scalar paths for
+    a fixed set of random stats.
+
+    """
+    count = 20000
+    seed = 0
+
+    def setUp(self):
+        self.rand = random.Random(self.seed)
+
+
+    def random_hits(self):
+        """Returns the columns of random hits in the order batch_damage takes them."""
+        rand = self.rand
+        count = self.count
+        return ([rand.randint(0, 100) for index in range(count)],
+                [rand.randint(0, 250) for index in range(count)],
+                [rand.choice(("physical", "special", "status")) for index in range(count)],
+                [rand.randint(0, 999) for index in range(count)],
+                [rand.randint(1, 999) for index in range(count)],
+                [rand.randint(0, 999) for index in range(count)],
+                [rand.randint(1, 999) for index in range(count)])
+
+
+    def expected_damage(self, hits):
+        """Works out every hit with damage(), the way Technique.damage does."""
+        expected = []
+        for level, power, category, attack, defense, special_attack, special_defense \
+                in zip(*hits):
+            if category == "physical":
+                expected.append(battle.damage(level, power, attack, defense))
+            elif category == "special":
+                expected.append(battle.damage(level, power, special_attack, special_defense))
+            else:
+                expected.append(0)
+        return expected
+
+
+    def test_batch_damage(self):
+        hits = self.random_hits()
+        levels, powers, categories, attacks, defenses, special_attacks, special_defenses = hits
+        results = battle.batch_damage(levels, powers, battle.category_codes(categories),
+                                      attacks, defenses, special_attacks, special_defenses)
+
+        self.assertEqual([int(result) for result in results], self.expected_damage(hits))
+
+
+    def test_batch_damage_int32(self):
+        if battle.numpy is None:
+            raise unittest.SkipTest("NumPy is not installed")
+
+        # Batches larger than BATCH_CHUNK are worked on a chunk at a time.
+        self.count = battle.BATCH_CHUNK * 2 + 7
+        hits = self.random_hits()
+        arguments = [battle.numpy.asarray(column, dtype=battle.numpy.int32)
+                     for column in hits[:2] + hits[3:]]
+        arguments.insert(2, battle.category_codes(hits[2]))
+        results = battle.batch_damage(*arguments)
+
+        self.assertEqual(results.tolist(), self.expected_damage(hits))
+
+
+    def test_batch_poison(self):
+        rand = self.rand
+        current_hp = [rand.randint(1, 60) for index in range(self.count)]
+        status_turn = [rand.randint(0, 3) for index in range(self.count)]
+        poisoned = [rand.random() < 0.5 for index in range(self.count)]
+        hp_after, turns_after, fainted = battle.batch_poison(current_hp, status_turn, poisoned)
+
+        for index in range(self.count):
+            fighter = Fighter()
+            fighter.current_hp = current_hp[index]
+            fighter.status = "Poisoned" if poisoned[index] else "Normal"
+            fighter.status_turn = status_turn[index]
+            side = battle.Side("player", [fighter])
+            battle.Battle(side, battle.Side("opponent", [])).status_check(side)
+
+            self.assertEqual((fighter.current_hp, fighter.status_turn, fighter.status == "FNT"),
+                             (hp_after[index], turns_after[index], fainted[index]))